@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # Load environment variables
 load_dotenv()
@@ -55,6 +56,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',  # Statyki bez nginx: gzip/brotli + nazwy z hashem
+    'shop.instrumentation.PerformanceMiddleware',  # Server-Timing, /metrics, log wolnych żądań
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,14 +93,91 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'loopstore_db',
-        'USER': 'loopstore',
-        'PASSWORD': 'loopstore123',
-        'HOST': 'db',
-        'PORT': '5432',
+        'NAME': os.getenv('DB_NAME', 'loopstore_db'),
+        'USER': os.getenv('DB_USER', 'loopstore'),
+        'PASSWORD': os.getenv('DB_PASSWORD', 'loopstore123'),
+        'HOST': os.getenv('DB_HOST', 'db'),
+        'PORT': os.getenv('DB_PORT', '5432'),
+        # Połączenie żyje między żądaniami zamiast nowego handshake'u na każde; przed użyciem
+        # po przerwie Django sprawdza, czy nadal działa (restart bazy, timeout po stronie serwera)
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# PgBouncer w trybie transaction pooling: kolejne zapytania mogą trafić na inne połączenie serwera,
+# więc bez kursorów po stronie serwera (iterator() w eksportach), a pulą zarządza PgBouncer
+if os.getenv('DB_PGBOUNCER', 'False') == 'True':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '0'))
+
+
+# Cache: Redis (lub zgodny, np. Valkey) w produkcji przez REDIS_URL, pamięć procesu w dev i testach
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Alias cache'u dla odpowiedzi katalogu (shop.response_cache)
+SHOP_RESPONSE_CACHE_ALIAS = 'default'
+
+# Warianty zdjęć produktów generowane w tle przez pulę wątków (shop.images)
+SHOP_IMAGE_WORKERS = int(os.getenv('SHOP_IMAGE_WORKERS', '2'))
+
+# Pomiary żądań (shop.instrumentation): próg logu wolnych żądań z ich SQL-em, nagłówek Server-Timing,
+# token dla scrape'u /metrics (bez tokenu - tylko zalogowany admin), co ile sekund agregaty idą do cache'u
+SHOP_SLOW_REQUEST_MS = int(os.getenv('SHOP_SLOW_REQUEST_MS', '500'))
+SHOP_SERVER_TIMING = os.getenv('SHOP_SERVER_TIMING', 'True') == 'True'
+SHOP_METRICS_TOKEN = os.getenv('SHOP_METRICS_TOKEN', '')
+SHOP_METRICS_FLUSH_INTERVAL = int(os.getenv('SHOP_METRICS_FLUSH_INTERVAL', '5'))
+
+# Idempotency-Key przy składaniu zamówień (shop.idempotency): jak długo pamiętamy odpowiedź, po ilu sekundach
+# porzucone wykonanie może przejąć powtórka (dłużej niż timeout gunicorna), ile duplikat czeka na wynik
+SHOP_IDEMPOTENCY_TTL = int(os.getenv('SHOP_IDEMPOTENCY_TTL', str(60 * 60 * 24)))
+SHOP_IDEMPOTENCY_LEASE = int(os.getenv('SHOP_IDEMPOTENCY_LEASE', '60'))
+SHOP_IDEMPOTENCY_WAIT = int(os.getenv('SHOP_IDEMPOTENCY_WAIT', '10'))
+
+# Zadania w tle (shop.tasks, manage.py run_worker): dzierżawa pobranego zadania, odpytywanie kolejki,
+# opóźnienia ponowień; EAGER wykonuje zadania po COMMIT w procesie żądania (dev bez workera)
+SHOP_TASKS_EAGER = os.getenv('SHOP_TASKS_EAGER', 'False') == 'True'
+SHOP_TASKS_LEASE = int(os.getenv('SHOP_TASKS_LEASE', '300'))
+SHOP_TASKS_POLL_INTERVAL = float(os.getenv('SHOP_TASKS_POLL_INTERVAL', '1'))
+SHOP_TASKS_BACKOFF = int(os.getenv('SHOP_TASKS_BACKOFF', '10'))
+SHOP_TASKS_MAX_BACKOFF = int(os.getenv('SHOP_TASKS_MAX_BACKOFF', str(60 * 60)))
+SHOP_WORKER_THREADS = int(os.getenv('SHOP_WORKER_THREADS', '4'))
+
+# Outbox zdarzeń zamówień (shop.outbox): po ilu sekundach od zmiany rusza wysyłka (okno scalania),
+# wielkość paczki i ujścia; WebhookSink wysyła na SHOP_OUTBOX_WEBHOOK_URL, FileSink dopisuje do SHOP_OUTBOX_FILE
+SHOP_OUTBOX_DELAY = int(os.getenv('SHOP_OUTBOX_DELAY', '2'))
+SHOP_OUTBOX_BATCH_SIZE = int(os.getenv('SHOP_OUTBOX_BATCH_SIZE', '500'))
+SHOP_OUTBOX_SINKS = os.getenv('SHOP_OUTBOX_SINKS', 'shop.outbox.StatusEmailSink,shop.outbox.LogSink').split(',')
+SHOP_OUTBOX_WEBHOOK_URL = os.getenv('SHOP_OUTBOX_WEBHOOK_URL', '')
+SHOP_OUTBOX_WEBHOOK_SECRET = os.getenv('SHOP_OUTBOX_WEBHOOK_SECRET', '')
+SHOP_OUTBOX_FILE = os.getenv('SHOP_OUTBOX_FILE', str(BASE_DIR / 'order-events.jsonl'))
+
+# Tryb zaokrąglania kwot do groszy (nazwa z modułu decimal) w shop.pricing
+SHOP_PRICE_ROUNDING = os.getenv('SHOP_PRICE_ROUNDING', 'ROUND_HALF_UP')
+
+# Strefa, w której liczone są dni i godziny raportów sprzedaży (shop.analytics); zmiana wymaga rebuild_sales_rollups
+SHOP_ANALYTICS_TIME_ZONE = os.getenv('SHOP_ANALYTICS_TIME_ZONE', 'Europe/Warsaw')
+
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'Loopstore <orders@loopstore.local>')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -157,6 +237,21 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # collectstatic dokłada hash do nazw i gotowe pliki .gz/.br - whitenoise wysyła je z Cache-Control na rok
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Brak wpisu w manifeście (np. testy bez collectstatic) to zwykła nazwa zamiast wyjątku
+WHITENOISE_MANIFEST_STRICT = False
+
+# Media z pominięciem Django: prefiks location internal w nginx (X-Accel-Redirect), puste = FileResponse + sendfile
+SHOP_MEDIA_ACCEL_REDIRECT = os.getenv('SHOP_MEDIA_ACCEL_REDIRECT', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -164,6 +259,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = ['http://localhost:3000']
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 # Security Settings
 if not DEBUG:
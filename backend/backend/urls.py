@@ -16,19 +16,52 @@ Including another URLconf
 """
 # backend_web/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter # type: ignore
-from shop.views import ProductViewSet, home, OrderView
+from shop.views import (
+    ProductViewSet, CategoryViewSet, TagViewSet, home, OrderView, OrderExportView, FragmentCacheStatsView, OrderViewSet,
+    SalesAnalyticsView,
+)
 from django.conf import settings
-from django.conf.urls.static import static
+from shop.media import serve_media
+from shop.instrumentation import metrics
+from shop.async_views import (
+    AsyncProductListView, AsyncFeaturedProductsView, AsyncProductDetailView, AsyncCategoryListView, AsyncCategoryDetailView,
+)
 
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet)
+router.register(r'categories', CategoryViewSet)
+router.register(r'tags', TagViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)), # API dla aplikacji shop
     path('', home, name='home'),  # Strona główna
     path('api/orders/', OrderView.as_view(), name='orders'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('api/orders/export/', OrderExportView.as_view(), name='orders-export'),
+    # Akcje obsługi zamówień bez rejestracji w routerze (lista i tworzenie zostają w OrderView);
+    # kwargs akcji niosą jej permission_classes, tak jak przy trasach z routera
+    path(
+        'api/orders/bulk_update_status/',
+        OrderViewSet.as_view({'post': 'bulk_update_status'}, **OrderViewSet.bulk_update_status.kwargs),
+        name='orders-bulk-update-status',
+    ),
+    path(
+        'api/orders/<int:pk>/update_status/',
+        OrderViewSet.as_view({'post': 'update_status'}, **OrderViewSet.update_status.kwargs),
+        name='order-update-status',
+    ),
+    path('api/analytics/', SalesAnalyticsView.as_view(), name='sales-analytics'),
+    path('api/cache-stats/fragments/', FragmentCacheStatsView.as_view(), name='fragment-cache-stats'),
+    # Te same odczyty katalogu jako widoki async - pod ASGI (uvicorn) bez wątku na czekające połączenie
+    path('api/async/products/', AsyncProductListView.as_view(), name='async-product-list'),
+    path('api/async/products/featured/', AsyncFeaturedProductsView.as_view(), name='async-product-featured'),
+    path('api/async/products/<slug:slug>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+    path('api/async/categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('api/async/categories/<slug:slug>/', AsyncCategoryDetailView.as_view(), name='async-category-detail'),
+    path('metrics', metrics, name='metrics'),  # Format tekstowy Prometheusa
+    # Media także przy DEBUG=False: nagłówki cache, warunkowe GET, zakresy bajtów, sendfile
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
\ No newline at end of file
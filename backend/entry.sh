@@ -9,5 +9,8 @@ if [ ! -f "manage.py" ]; then
     django-admin startproject backend_web .
 fi
 
+# Statyki z hashem w nazwie i wersjami .gz/.br dla whitenoise (po montowaniu wolumenu, więc nie w obrazie)
+python manage.py collectstatic --noinput --verbosity 0
+
 # Wykonaj domyślną komendę
 exec "$@"
\ No newline at end of file
@@ -0,0 +1,49 @@
+# Konfiguracja produkcyjna: gunicorn -c gunicorn.conf.py backend.wsgi
+# (gunicorn czyta ten plik sam, jeśli leży w katalogu roboczym). Wszystko nadpisywalne zmiennymi GUNICORN_*.
+import os
+
+
+def available_cpus():
+    # Limit CPU kontenera (cgroup v2), a nie liczba rdzeni hosta - inaczej 2*N+1 na 64-rdzeniowej maszynie
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cpus = available_cpus()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Procesy dla CPU (serializacja, JSON), wątki na czas czekania na bazę i Redis
+workers = int(os.getenv('GUNICORN_WORKERS', cpus * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# gthread: keep-alive i wątki; dla backend.asgi: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+# Django i aplikacja ładowane raz w masterze - workery startują szybciej i dzielą pamięć (copy-on-write)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Restart workera co ~N żądań na wypadek wycieków pamięci; jitter, żeby nie restartowały się naraz
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+# Heartbeat workerów w tmpfs zamiast na dysku kontenera
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Przy preload master mógł otworzyć połączenia (np. check przy imporcie) - socket dzielony
+    # przez kilka procesów to pomieszane odpowiedzi, więc każdy worker zaczyna od zera
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        connection.close()
@@ -1,12 +1,31 @@
 from django.contrib import admin
-from .models import Product, Order
+from django.utils import timezone
+from .models import Product, Order, OrderItem, Job
 
 admin.site.register(Product)
 # admin.site.register(Order)
 
+class OrderItemInline(admin.TabularInline):
+	model = OrderItem
+	raw_id_fields = ('product',)
+	extra = 0
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+	inlines = [OrderItemInline]
 	list_display = ('id', 'name', 'email', 'address', 'created_at')
 	search_fields = ('name', 'email', 'address')
 	list_filter = ('created_at',)
-	ordering = ('-created_at',)
\ No newline at end of file
+	ordering = ('-created_at',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+	list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at')
+	list_filter = ('status', 'name')
+	ordering = ('run_at',)
+	actions = ['retry_jobs']
+
+	@admin.action(description='Retry selected jobs now')
+	def retry_jobs(self, request, queryset):
+		# Martwe zadania po naprawie przyczyny (np. konfiguracji SMTP) wracają do kolejki z pełną pulą prób
+		queryset.exclude(status='running').update(status='queued', attempts=0, run_at=timezone.now(), last_error='')
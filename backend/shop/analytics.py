@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncHour
+from .models import Order, OrderItem, Category, Product, SalesRollup, ProductSalesRollup, LINE_TOTAL
+
+ZERO = Decimal('0.00')
+CANCELLED = 'cancelled'
+TOTAL_FIELDS = ('orders', 'revenue', 'shipping', 'units')
+# Zakres godzinowej serii - dłuższe okresy tylko dziennie
+MAX_HOURLY_DAYS = 31
+MAX_RANGE_DAYS = 2 * 366
+REBUILD_CHUNK_DAYS = 7
+ROLLUP_UPDATE_BATCH = 200
+
+
+def analytics_tz():
+    return ZoneInfo(getattr(settings, 'SHOP_ANALYTICS_TIME_ZONE', settings.TIME_ZONE))
+
+
+def day_start(moment, tz):
+    return datetime.combine(moment.astimezone(tz).date(), time.min, tzinfo=tz)
+
+
+def counted(orders):
+    # Anulowane zamówienia nie są sprzedażą
+    return orders.exclude(status=CANCELLED)
+
+
+def empty_totals():
+    return {'orders': 0, 'revenue': ZERO, 'shipping': ZERO, 'units': 0}
+
+
+def sales_contributions(orders):
+    # Wkład zbioru zamówień w rollupy: dwa GROUP BY po godzinie (zamówienia, pozycje), dni sumowane z godzin.
+    # Zwraca ({(period, bucket): sumy}, {(dzień, product_id): {category_id, units, revenue}})
+    tz = analytics_tz()
+    totals = defaultdict(empty_totals)
+    products = defaultdict(lambda: {'category_id': None, 'units': 0, 'revenue': ZERO})
+
+    rows = orders.order_by().annotate(hour=TruncHour('created_at', tzinfo=tz)).values('hour').annotate(
+        count=Count('pk'),
+        revenue_sum=Coalesce(Sum('total_amount'), Value(ZERO)),
+        shipping_sum=Sum('shipping_cost'),
+    )
+    for row in rows:
+        for key in (('hour', row['hour']), ('day', day_start(row['hour'], tz))):
+            totals[key]['orders'] += row['count']
+            totals[key]['revenue'] += row['revenue_sum']
+            totals[key]['shipping'] += row['shipping_sum']
+
+    items = OrderItem.objects.filter(order__in=orders.values('pk')).order_by().annotate(
+        hour=TruncHour('order__created_at', tzinfo=tz),
+    ).values('hour', 'product_id', 'product__category_id').annotate(units_sum=Sum('quantity'), revenue_sum=Sum(LINE_TOTAL))
+    for row in items:
+        day = day_start(row['hour'], tz)
+        totals['hour', row['hour']]['units'] += row['units_sum']
+        totals['day', day]['units'] += row['units_sum']
+        product = products[day, row['product_id'] or 0]
+        product['category_id'] = row['product__category_id']
+        product['units'] += row['units_sum']
+        product['revenue'] += row['revenue_sum']
+    return totals, products
+
+
+def add_to_rollups(model, keys, deltas, sign, defaults=None):
+    # deltas: {klucz: {pole: przyrost}} - brakujące wiersze z ignore_conflicts, potem jeden UPDATE z CASE
+    # na paczkę kluczy, więc liczba zapytań nie rośnie z liczbą pozycji zamówienia
+    defaults = defaults or {}
+    model.objects.bulk_create(
+        [model(**dict(zip(keys, key)), **defaults.get(key, {})) for key in deltas], ignore_conflicts=True,
+    )
+    items = sorted(deltas.items())
+    for offset in range(0, len(items), ROLLUP_UPDATE_BATCH):
+        matches = [(Q(**dict(zip(keys, key))), values) for key, values in items[offset:offset + ROLLUP_UPDATE_BATCH]]
+        condition = Q()
+        for match, values in matches:
+            condition |= match
+        model.objects.filter(condition).update(**{
+            field: F(field) + Case(
+                *[When(match, then=Value(sign * values[field])) for match, values in matches],
+                output_field=model._meta.get_field(field),
+            )
+            for field in matches[0][1]
+        })
+
+
+def apply_sales(totals, products, sign=1):
+    # Jak shop.facets.apply_facet_deltas, tylko zbiorczo: klucze w stałej kolejności, więc równoległe
+    # zamówienia nie zakleszczą się na tych samych godzinach
+    add_to_rollups(SalesRollup, ('period', 'bucket'), totals, sign)
+    add_to_rollups(
+        ProductSalesRollup, ('bucket', 'product_id'),
+        {key: {'units': values['units'], 'revenue': values['revenue']} for key, values in products.items()}, sign,
+        {key: {'category_id': values['category_id']} for key, values in products.items()},
+    )
+
+
+def record_sales(orders, sign=1):
+    totals, products = sales_contributions(orders)
+    apply_sales(totals, products, sign)
+
+
+def record_order_sales(order):
+    # Po zapisie pozycji i update_total(), w transakcji zamówienia
+    record_sales(counted(Order.objects.filter(pk=order.pk)))
+
+
+def record_status_sales(transitions):
+    # transitions: (id, poprzedni status, nowy status); liczy się tylko wejście w anulowanie i wyjście z niego
+    cancelled = [pk for pk, previous, current in transitions if previous != CANCELLED and current == CANCELLED]
+    restored = [pk for pk, previous, current in transitions if previous == CANCELLED and current != CANCELLED]
+    if cancelled:
+        record_sales(Order.objects.filter(pk__in=cancelled), -1)
+    if restored:
+        record_sales(Order.objects.filter(pk__in=restored))
+
+
+def rebuild_sales_rollups(chunk_days=REBUILD_CHUNK_DAYS, progress=None):
+    # Przeliczenie z historii oknami po chunk_days dni (od północy do północy), każde okno w osobnej
+    # transakcji - pamięć i blokady nie rosną z historią zamówień
+    tz = analytics_tz()
+    bounds = Order.objects.order_by().aggregate(first=Min('created_at'), last=Max('created_at'))
+    with transaction.atomic():
+        if bounds['first'] is None:
+            SalesRollup.objects.all().delete()
+            ProductSalesRollup.objects.all().delete()
+            return 0
+        start, end = day_start(bounds['first'], tz), day_start(bounds['last'], tz) + timedelta(days=1)
+        # Rollupy spoza historii (np. po usunięciu najstarszych zamówień)
+        SalesRollup.objects.exclude(bucket__gte=start, bucket__lt=end).delete()
+        ProductSalesRollup.objects.exclude(bucket__gte=start, bucket__lt=end).delete()
+
+    windows = 0
+    window_start = start
+    while window_start < end:
+        window_end = datetime.combine(window_start.date() + timedelta(days=chunk_days), time.min, tzinfo=tz)
+        with transaction.atomic():
+            orders = counted(Order.objects.filter(created_at__gte=window_start, created_at__lt=window_end))
+            totals, products = sales_contributions(orders)
+            SalesRollup.objects.filter(bucket__gte=window_start, bucket__lt=window_end).delete()
+            ProductSalesRollup.objects.filter(bucket__gte=window_start, bucket__lt=window_end).delete()
+            SalesRollup.objects.bulk_create(
+                [SalesRollup(period=period, bucket=bucket, **values) for (period, bucket), values in totals.items()],
+                batch_size=1000,
+            )
+            ProductSalesRollup.objects.bulk_create(
+                [ProductSalesRollup(bucket=bucket, product_id=product_id, **values) for (bucket, product_id), values in products.items()],
+                batch_size=1000,
+            )
+        windows += 1
+        if progress:
+            progress(window_start, window_end, len(totals))
+        window_start = window_end
+    return windows
+
+
+def buckets(start, end, period, tz):
+    # Wszystkie kubełki zakresu - dni/godziny bez sprzedaży też są na wykresie (z zerami).
+    # Godziny liczone w UTC (arytmetyka na czasie lokalnym myli się przy zmianie czasu), dni od północy do północy
+    moment = start.astimezone(timezone.utc) if period == 'hour' else start
+    while moment < end:
+        yield moment.astimezone(tz)
+        if period == 'hour':
+            moment += timedelta(hours=1)
+        else:
+            moment = datetime.combine(moment.date() + timedelta(days=1), time.min, tzinfo=tz)
+
+
+def sales_report(date_from, date_to, period='day', limit=10):
+    # Zakres dat włącznie, w strefie SHOP_ANALYTICS_TIME_ZONE; wszystko z rollupów, bez skanu zamówień
+    tz = analytics_tz()
+    start = datetime.combine(date_from, time.min, tzinfo=tz)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz)
+
+    rows = SalesRollup.objects.filter(period=period, bucket__gte=start, bucket__lt=end).values_list('bucket', *TOTAL_FIELDS)
+    by_bucket = {bucket: dict(zip(TOTAL_FIELDS, values)) for bucket, *values in rows}
+    series, totals = [], empty_totals()
+    for bucket in buckets(start, end, period, tz):
+        values = by_bucket.get(bucket, empty_totals())
+        series.append({'bucket': bucket, **values})
+        for field in TOTAL_FIELDS:
+            totals[field] += values[field]
+
+    in_range = ProductSalesRollup.objects.filter(bucket__gte=start, bucket__lt=end).order_by()
+    top = list(
+        in_range.values('product_id').annotate(units_sum=Sum('units'), revenue_sum=Sum('revenue'))
+        .filter(units_sum__gt=0).order_by('-revenue_sum', 'product_id')[:limit]
+    )
+    names = dict(Product.objects.filter(pk__in=[row['product_id'] for row in top]).values_list('pk', 'name'))
+    categories = list(
+        in_range.values('category_id').annotate(units_sum=Sum('units'), revenue_sum=Sum('revenue'))
+        .filter(units_sum__gt=0).order_by('-revenue_sum')
+    )
+    category_names = dict(Category.objects.filter(pk__in=[row['category_id'] for row in categories]).values_list('pk', 'name'))
+
+    return {
+        'from': date_from,
+        'to': date_to,
+        'interval': period,
+        'time_zone': str(tz),
+        'totals': totals,
+        'series': series,
+        'top_products': [
+            {
+                'product_id': row['product_id'] or None,
+                'name': names.get(row['product_id']),
+                'units': row['units_sum'],
+                'revenue': row['revenue_sum'],
+            }
+            for row in top
+        ],
+        'categories': [
+            {
+                'category_id': row['category_id'],
+                'name': category_names.get(row['category_id']),
+                'units': row['units_sum'],
+                'revenue': row['revenue_sum'],
+            }
+            for row in categories
+        ],
+    }
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import instrumentation  # noqa: F401  # execute_wrapper na nowych połączeniach
+        from . import notifications, outbox  # noqa: F401  # rejestracja zadań dla run_worker
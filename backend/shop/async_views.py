@@ -0,0 +1,123 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.renderers import JSONRenderer # type: ignore
+from rest_framework.response import Response # type: ignore
+from .response_cache import acache_response, product_stock_key
+from .views import ProductViewSet, CategoryViewSet
+
+
+class AsyncCatalogueView(View):
+    # Odczyty katalogu jako widoki async (pod ASGI). Viewset DRF daje autoryzację, throttling,
+    # filtry, paginację i serializery - te same co w ścieżce synchronicznej, bez jego dispatch().
+    # Podklasy definiują async handle(request, **kwargs) z odpowiedzią dla GET
+    viewset_class = None
+    action = None
+    http_method_names = ['get', 'head', 'options']
+
+    def setup_viewset(self, request, kwargs):
+        viewset = self.viewset_class(action=self.action, action_map={'get': self.action, 'head': self.action}, args=(), kwargs=kwargs, format_kwarg=None)
+        # Browsable API renderuje formularze z zapytaniami - tu tylko JSON
+        viewset.renderer_classes = [JSONRenderer]
+        viewset.request = viewset.initialize_request(request, **kwargs)
+        viewset.headers = viewset.default_response_headers
+        return viewset
+
+    async def get(self, request, **kwargs):
+        self.viewset = viewset = self.setup_viewset(request, kwargs)
+        request = viewset.request
+        try:
+            # Sesja/użytkownik i liczniki throttlingu to zapytania - jeden skok do wątku na całość
+            await sync_to_async(viewset.initial)(request, **kwargs)
+            response = await self.handle(request, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        return self.render(viewset.finalize_response(request, response, **kwargs))
+
+    def render(self, response):
+        if not isinstance(response, Response):
+            return response
+        # Zwykły HttpResponse - inaczej handler ASGI wołałby render() jeszcze raz przez sync_to_async
+        rendered = HttpResponse(response.rendered_content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    async def base_queryset(self):
+        # get_queryset produktów szuka ścieżki kategorii dla ?category_tree= - zapytanie, więc w wątku
+        return await sync_to_async(self.viewset.get_queryset)()
+
+    async def get_queryset(self):
+        viewset = self.viewset
+        if not viewset.filter_backends:
+            return await self.base_queryset()
+        # django-filter waliduje parametry formularzem, a ModelChoiceFilter robi przy tym zapytania
+        return await sync_to_async(lambda: viewset.filter_queryset(viewset.get_queryset()))()
+
+    async def get_object(self, **lookup):
+        queryset = await self.get_queryset()
+        try:
+            instance = await queryset.aget(**lookup)
+        except ObjectDoesNotExist:
+            raise Http404
+        self.viewset.check_object_permissions(self.viewset.request, instance)
+        return instance
+
+    async def serialize(self, instance, **kwargs):
+        # Fragmenty produktów (cache, doczytanie braków, powiązane produkty) mogą pytać bazę
+        serializer = self.viewset.get_serializer(instance, **kwargs)
+        return await sync_to_async(lambda: serializer.data)()
+
+
+class AsyncProductListView(AsyncCatalogueView):
+    viewset_class = ProductViewSet
+    action = 'list'
+
+    async def fragment_page(self, queryset):
+        viewset = self.viewset
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(viewset.fragment_queryset(queryset), viewset.request, view=viewset)
+        return paginator.get_paginated_response(await self.serialize(page, many=True))
+
+    @acache_response
+    async def handle(self, request):
+        return await self.fragment_page(await self.get_queryset())
+
+
+class AsyncFeaturedProductsView(AsyncProductListView):
+    action = 'featured'
+
+    @acache_response
+    async def handle(self, request):
+        return await self.fragment_page((await self.base_queryset()).filter(is_featured=True))
+
+
+class AsyncProductDetailView(AsyncCatalogueView):
+    viewset_class = ProductViewSet
+    action = 'retrieve'
+
+    @acache_response(scope=product_stock_key)
+    async def handle(self, request, slug):
+        return Response(await self.serialize(await self.get_object(slug=slug)))
+
+
+class AsyncCategoryListView(AsyncCatalogueView):
+    viewset_class = CategoryViewSet
+    action = 'list'
+
+    @acache_response
+    async def handle(self, request):
+        queryset = await self.get_queryset()
+        # products_count z adnotacji, parent jako id - serializacja bez zapytań, w pętli zdarzeń
+        categories = [category async for category in queryset.aiterator()]
+        return Response(self.viewset.get_serializer(categories, many=True).data)
+
+
+class AsyncCategoryDetailView(AsyncCatalogueView):
+    viewset_class = CategoryViewSet
+    action = 'retrieve'
+
+    @acache_response
+    async def handle(self, request, slug):
+        return Response(self.viewset.get_serializer(await self.get_object(slug=slug)).data)
@@ -0,0 +1,305 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import chain, islice, product
+from .models import Product, Tag
+from .local_index import SharedIndex
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Limity pracy na zapytanie - dzięki nim czas odpowiedzi nie rośnie z rozmiarem katalogu
+MAX_PHRASE_SCAN = 256
+MAX_PREFIX_EXPANSIONS = 32
+MAX_FUZZY_CANDIDATES = 5
+MAX_PHRASE_VARIANTS = 8
+MAX_WORD_SCAN = 1024
+MAX_FALLBACK_EXPANSIONS = 4
+FUZZY_THRESHOLD = 0.5
+MAX_TEXT_LENGTH = 255
+
+# Kolejność typów w podpowiedziach: najpierw tagi i marki, potem konkretne produkty
+KIND_RANK = {'tag': 0, 'brand': 1, 'product': 2}
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def words(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def trigrams(word):
+    # Jak w pg_trgm: słowo dopełnione dwiema spacjami z przodu i jedną z tyłu
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.suggestions = {}       # sid -> [tekst, typ, licznik odwołań]
+        self.suggestion_ids = {}    # (typ, tekst kluczowy) -> sid
+        self.keys = {}              # sid -> słowa złączone spacją
+        self.sort_keys = {}         # sid -> stały klucz rankingu
+        # Sufiksy tekstu od początku każdego słowa, zakodowane jako sid << 8 | offset
+        self.phrases = []
+        self.word_sets = {}         # słowo -> set sid
+        self.vocabulary = []        # posortowane słowa do dopasowania po prefiksie
+        self.word_trigrams = defaultdict(set)
+        self.product_terms = {}
+        self.tag_terms = {}
+        self._next_id = 0
+        self._loading = False
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def _phrase(self, entry):
+        return self.keys[entry >> 8][entry & 255:]
+
+    def _offsets(self, key):
+        offset = 0
+        for word in key.split(' '):
+            yield offset
+            offset += len(word) + 1
+
+    def _acquire(self, text, kind):
+        text = text.strip()[:MAX_TEXT_LENGTH]
+        # Przycinamy klucz po normalizacji - NFKD potrafi go wydłużyć, a offset w phrases ma 8 bitów
+        key = ' '.join(words(text))[:MAX_TEXT_LENGTH].rstrip()
+        sid = self.suggestion_ids.get((kind, key))
+        if sid is not None:
+            self.suggestions[sid][2] += 1
+            return sid
+
+        sid = self._next_id
+        self._next_id += 1
+        self.suggestions[sid] = [text, kind, 1]
+        self.suggestion_ids[(kind, key)] = sid
+        self.keys[sid] = key
+        self.sort_keys[sid] = (KIND_RANK[kind], len(key), key, sid)
+        for offset in self._offsets(key):
+            if self._loading:
+                self.phrases.append(sid << 8 | offset)
+            else:
+                insort(self.phrases, sid << 8 | offset, key=self._phrase)
+        for word in set(key.split(' ')):
+            members = self.word_sets.get(word)
+            if members is None:
+                members = self.word_sets[word] = set()
+                if self._loading:
+                    self.vocabulary.append(word)
+                else:
+                    insort(self.vocabulary, word)
+                for trigram in trigrams(word):
+                    self.word_trigrams[trigram].add(word)
+            members.add(sid)
+        return sid
+
+    def _release(self, sid):
+        suggestion = self.suggestions[sid]
+        suggestion[2] -= 1
+        if suggestion[2] > 0:
+            return
+        key = self.keys[sid]
+        for offset in self._offsets(key):
+            entry = sid << 8 | offset
+            position = bisect_left(self.phrases, key[offset:], key=self._phrase)
+            while self.phrases[position] != entry:
+                position += 1
+            del self.phrases[position]
+        for word in set(key.split(' ')):
+            members = self.word_sets[word]
+            members.discard(sid)
+            if not members:
+                del self.word_sets[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+                for trigram in trigrams(word):
+                    self.word_trigrams[trigram].discard(word)
+                    if not self.word_trigrams[trigram]:
+                        del self.word_trigrams[trigram]
+        del self.suggestion_ids[(suggestion[1], key)]
+        del self.keys[sid]
+        del self.sort_keys[sid]
+        del self.suggestions[sid]
+
+    def bulk_load(self, products=(), tags=()):
+        # Przy pełnej budowie sortujemy raz na końcu zamiast insort dla każdego wpisu
+        with self.lock:
+            self._loading = True
+            try:
+                for product_id, name, brand in products:
+                    self.update_product(product_id, name, brand)
+                for tag_id, name in tags:
+                    self.update_tag(tag_id, name)
+            finally:
+                self._loading = False
+                self.phrases.sort(key=self._phrase)
+                self.vocabulary.sort()
+
+    def update_product(self, product_id, name, brand='', is_active=True):
+        with self.lock:
+            self.remove_product(product_id)
+            if not is_active:
+                return
+            terms = []
+            if words(name):
+                terms.append(self._acquire(name, 'product'))
+            if words(brand):
+                terms.append(self._acquire(brand, 'brand'))
+            self.product_terms[product_id] = terms
+
+    def remove_product(self, product_id):
+        with self.lock:
+            for sid in self.product_terms.pop(product_id, []):
+                self._release(sid)
+
+    def update_tag(self, tag_id, name):
+        with self.lock:
+            self.remove_tag(tag_id)
+            if words(name):
+                self.tag_terms[tag_id] = self._acquire(name, 'tag')
+
+    def remove_tag(self, tag_id):
+        with self.lock:
+            sid = self.tag_terms.pop(tag_id, None)
+            if sid is not None:
+                self._release(sid)
+
+    def _prefix_words(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + '\U0010ffff', lo=start, hi=min(start + MAX_PHRASE_SCAN, len(self.vocabulary)))
+        # Najpierw słowa występujące w największej liczbie podpowiedzi
+        return heapq.nlargest(MAX_PREFIX_EXPANSIONS, self.vocabulary[start:end], key=lambda word: len(self.word_sets[word]))
+
+    def _fuzzy_words(self, word):
+        query_trigrams = trigrams(word)
+        # Wspólne trigramy liczymy tylko dla słów ze słownika, które je zawierają
+        common = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate in self.word_trigrams.get(trigram, ()):
+                common[candidate] += 1
+        scored = []
+        for candidate, shared in common.items():
+            containment = shared / len(query_trigrams)
+            if containment >= FUZZY_THRESHOLD:
+                similarity = shared / (len(query_trigrams) + len(trigrams(candidate)) - shared)
+                scored.append((containment + similarity, candidate))
+        return [candidate for _, candidate in heapq.nlargest(MAX_FUZZY_CANDIDATES, scored)]
+
+    def _has_prefix(self, prefix):
+        position = bisect_left(self.vocabulary, prefix)
+        return position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix)
+
+    def _word_options(self, word, last):
+        # Ostatnie słowo jest dopiero wpisywane, więc wystarczy prefiks
+        if last:
+            if self._has_prefix(word):
+                return [word]
+        elif word in self.word_sets:
+            return [word]
+        return self._fuzzy_words(word)
+
+    def _scan_phrase(self, phrase, found):
+        # Zakres sufiksów zaczynających się od frazy wyznaczają dwa wyszukiwania binarne
+        start = bisect_left(self.phrases, phrase, key=self._phrase)
+        end = bisect_left(self.phrases, phrase + '\U0010ffff', lo=start, hi=min(start + MAX_PHRASE_SCAN, len(self.phrases)), key=self._phrase)
+        found.update(entry >> 8 for entry in self.phrases[start:end])
+
+    def _scan_words(self, options, found, limit):
+        # Słowa nie muszą stać obok siebie ("red dress" -> "Red Silk Dress")
+        groups = []
+        for position, words_for_position in enumerate(options):
+            expanded = set()
+            for word in words_for_position:
+                if position == len(options) - 1:
+                    expanded.update(self._prefix_words(word)[:MAX_FALLBACK_EXPANSIONS])
+                elif word in self.word_sets:
+                    expanded.add(word)
+            if not expanded:
+                return
+            groups.append([self.word_sets[word] for word in expanded])
+        groups.sort(key=lambda group: sum(len(members) for members in group))
+        driver, others = groups[0], groups[1:]
+        # Przecięcia na setach liczone w C, zawsze od ograniczonej puli kandydatów
+        candidates = set(islice(chain.from_iterable(driver), MAX_WORD_SCAN))
+        for group in others:
+            candidates = set().union(*(candidates & members for members in group))
+            if not candidates:
+                return
+        found.update(candidates)
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        query_words = words(query)
+        if not query_words:
+            return []
+        with self.lock:
+            options = []
+            for position, word in enumerate(query_words):
+                word_options = self._word_options(word, last=position == len(query_words) - 1)
+                if not word_options:
+                    return []
+                options.append(word_options)
+
+            found = set()
+            for variant in islice(product(*options), MAX_PHRASE_VARIANTS):
+                self._scan_phrase(' '.join(variant), found)
+            if len(found) < limit and len(query_words) > 1:
+                self._scan_words(options, found, limit)
+            best = heapq.nsmallest(limit, found, key=self.sort_keys.__getitem__)
+            return [self._as_result(sid) for sid in best]
+
+    def _as_result(self, sid):
+        text, kind, count = self.suggestions[sid]
+        return {'text': text, 'type': kind, 'count': count}
+
+
+def build_autocomplete_index():
+    index = TrigramIndex()
+    index.bulk_load(
+        Product.objects.active().values_list('id', 'name', 'brand').iterator(chunk_size=5000),
+        Tag.objects.values_list('id', 'name').iterator(chunk_size=5000),
+    )
+    return index
+
+
+def refresh_autocomplete_index(index, changes):
+    # Zmiany z innych procesów: bieżący stan z bazy, brak wiersza = obiekt usunięty
+    product_ids = {pk for kind, pk in changes if kind == 'product'}
+    tag_ids = {pk for kind, pk in changes if kind == 'tag'}
+    if product_ids:
+        rows = Product.objects.filter(pk__in=product_ids).values_list('id', 'name', 'brand', 'is_active')
+        for product_id, name, brand, is_active in rows:
+            index.update_product(product_id, name, brand, is_active)
+            product_ids.discard(product_id)
+        for product_id in product_ids:
+            index.remove_product(product_id)
+    if tag_ids:
+        for tag_id, name in Tag.objects.filter(pk__in=tag_ids).values_list('id', 'name'):
+            index.update_tag(tag_id, name)
+            tag_ids.discard(tag_id)
+        for tag_id in tag_ids:
+            index.remove_tag(tag_id)
+
+
+_autocomplete_index = SharedIndex('autocomplete', build_autocomplete_index, refresh_autocomplete_index)
+
+
+def get_autocomplete_index(build=True):
+    return _autocomplete_index.get(build)
+
+
+def autocomplete_changed(kind, ids):
+    # kind: 'product' albo 'tag' - pozostałe procesy doczytają te obiekty do swoich kopii
+    _autocomplete_index.changed(kind, ids)
+
+
+def reset_autocomplete_index():
+    _autocomplete_index.reset()
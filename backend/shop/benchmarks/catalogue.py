@@ -0,0 +1,168 @@
+import random
+import time
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.text import slugify
+from shop.analytics import rebuild_sales_rollups
+from shop.autocomplete import reset_autocomplete_index
+from shop.facets import rebuild_facet_counts
+from shop.category_tree import rebuild_category_paths
+from shop.models import Product, Category, Tag, Order, OrderItem
+from shop.related import invalidate_related_products
+from shop.response_cache import invalidate_catalogue
+from shop.search import reset_search_index, uses_postgres_search, SEARCH_CONFIG
+
+COLOURS = ['red', 'blue', 'green', 'black', 'white', 'beige', 'navy', 'olive', 'pink', 'grey', 'mustard', 'burgundy']
+MATERIALS = ['cotton', 'linen', 'denim', 'wool', 'silk', 'leather', 'corduroy', 'velvet', 'tweed', 'jersey']
+ITEMS = ['dress', 'shirt', 'skirt', 'jacket', 'coat', 'blouse', 'trousers', 'jeans', 'sweater', 'cardigan', 'scarf', 'bag']
+STYLES = ['vintage', 'oversized', 'cropped', 'patchwork', 'reworked', 'midi', 'maxi', 'wrap', 'boxy', 'pleated']
+BRANDS = [f'Brand {i}' for i in range(400)]
+CITIES = ['Warszawa', 'Kraków', 'Łódź', 'Wrocław', 'Poznań', 'Gdańsk', 'Szczecin', 'Lublin']
+SEED_BATCH_SIZE = 5000
+
+
+def random_name(rng):
+    words = [rng.choice(STYLES), rng.choice(COLOURS), rng.choice(MATERIALS), rng.choice(ITEMS)]
+    return ' '.join(words[rng.randint(0, 2):]).title() + f' {rng.randint(1, 999)}'
+
+
+def typo(rng, word):
+    if len(word) < 4:
+        return word
+    position = rng.randrange(1, len(word) - 1)
+    return word[:position] + word[position + 1:]
+
+
+def seed_taxonomy(categories, tags):
+    # Nazwy z numerem - kolejne seedowanie dokłada nowe zamiast kolidować z unikalnymi slugami
+    start = (Category.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    created = Category.objects.bulk_create([
+        Category(name=f'{ITEMS[i % len(ITEMS)].title()} {start + i}', slug=f'{ITEMS[i % len(ITEMS)]}-{start + i}')
+        for i in range(categories)
+    ])
+    # Dwa poziomy: co piąta kategoria jest korzeniem, reszta trafia pod jeden z nich
+    roots = created[::5]
+    children = [category for index, category in enumerate(created) if index % 5]
+    for index, category in enumerate(children):
+        category.parent_id = roots[index % len(roots)].pk
+    Category.objects.bulk_update(children, ['parent'], batch_size=500)
+    rebuild_category_paths()
+    start = (Tag.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    words = STYLES + MATERIALS + COLOURS
+    Tag.objects.bulk_create([
+        Tag(name=f'{words[i % len(words)]} {start + i}', slug=f'{words[i % len(words)]}-{start + i}')
+        for i in range(tags)
+    ])
+    return (
+        dict(Category.objects.order_by('-id').values_list('id', 'name')[:categories]),
+        dict(Tag.objects.order_by('-id').values_list('id', 'name')[:tags]),
+    )
+
+
+def seed_products(count, categories, tags, rng, batch_size=SEED_BATCH_SIZE, progress=None):
+    # bulk_create omija sygnały - search_document liczymy od razu, indeksy w pamięci kasujemy na końcu
+    category_ids, tag_ids = list(categories), list(tags)
+    start = (Product.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+    conditions = [value for value, _ in Product.CONDITION_CHOICES]
+    sizes = [value for value, _ in Product.SIZE_CHOICES]
+    created = 0
+    while created < count:
+        products, product_tags = [], []
+        for number in range(start + created, start + min(count, created + batch_size)):
+            name = random_name(rng)
+            category_id = rng.choice(category_ids) if category_ids else None
+            chosen_tags = rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, 3)))
+            brand, material = rng.choice(BRANDS), rng.choice(MATERIALS)
+            description = f'Upcycled {material} {name.lower()} in {rng.choice(COLOURS)}'
+            products.append(Product(
+                name=name,
+                slug=f'{slugify(name)}-{number}',
+                description=description,
+                price=Decimal(rng.randint(500, 50000)) / 100,
+                stock=rng.randint(0, 50),
+                category_id=category_id,
+                condition=rng.choice(conditions),
+                size=rng.choice(sizes),
+                brand=brand,
+                material=material,
+                is_active=rng.random() > 0.05,
+                is_featured=rng.random() < 0.02,
+                search_document=' '.join(
+                    [brand, material, categories.get(category_id, '')] + [tags[tag_id] for tag_id in chosen_tags] + [description]
+                ),
+            ))
+            product_tags.append(chosen_tags)
+        with transaction.atomic():
+            # PostgreSQL i SQLite >= 3.35 zwracają id z bulk_create (RETURNING)
+            products = Product.objects.bulk_create(products)
+            Product.tags.through.objects.bulk_create([
+                Product.tags.through(product_id=product.pk, tag_id=tag_id)
+                for product, chosen in zip(products, product_tags)
+                for tag_id in chosen
+            ])
+        created += len(products)
+        if progress:
+            progress(created)
+    if uses_postgres_search():
+        from django.contrib.postgres.search import SearchVector
+        Product.objects.filter(id__gte=start).update(
+            search_vector=SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('search_document', weight='B', config=SEARCH_CONFIG)
+        )
+    return start
+
+
+def seed_orders(count, rng, batch_size=SEED_BATCH_SIZE, progress=None):
+    products = list(Product.objects.filter(is_active=True).values_list('id', 'price')[:100000])
+    if not products:
+        return 0
+    statuses = [value for value, _ in Order.STATUS_CHOICES]
+    created = 0
+    while created < count:
+        orders, order_items = [], []
+        for _ in range(min(batch_size, count - created)):
+            lines = [(product_id, rng.randint(1, 3), price) for product_id, price in rng.sample(products, min(len(products), rng.randint(1, 4)))]
+            shipping_cost = Decimal('15.00')
+            orders.append(Order(
+                name=f'Customer {rng.randint(1, 10 ** 6)}',
+                email=f'customer{rng.randint(1, 10 ** 5)}@example.com',
+                address='ul. Testowa 1',
+                city=rng.choice(CITIES),
+                postal_code=f'{rng.randint(0, 99):02d}-{rng.randint(0, 999):03d}',
+                country='Poland',
+                status=rng.choice(statuses),
+                shipping_cost=shipping_cost,
+                total_amount=sum(quantity * price for _, quantity, price in lines) + shipping_cost,
+            ))
+            order_items.append(lines)
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(orders)
+            OrderItem.objects.bulk_create([
+                OrderItem(order_id=order.pk, product_id=product_id, quantity=quantity, unit_price=price)
+                for order, lines in zip(orders, order_items)
+                for product_id, quantity, price in lines
+            ], batch_size=batch_size)
+        created += len(orders)
+        if progress:
+            progress(created)
+    return created
+
+
+def seed_catalogue(products, categories=50, tags=200, orders=None, seed=42, progress=None):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    category_names, tag_names = seed_taxonomy(categories, tags)
+    seed_products(products, category_names, tag_names, rng, progress=progress and (lambda n: progress('products', n)))
+    orders = products // 10 if orders is None else orders
+    seed_orders(orders, rng, progress=progress and (lambda n: progress('orders', n)))
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    rebuild_facet_counts()
+    rebuild_sales_rollups()
+    reset_search_index()
+    reset_autocomplete_index()
+    invalidate_related_products(*category_names)
+    invalidate_catalogue()
+    return time.perf_counter() - started
@@ -0,0 +1,201 @@
+import http.client
+import json
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from importlib import import_module
+from urllib.parse import urlsplit
+import django
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+from rest_framework.views import APIView # type: ignore
+from shop.models import Product, Order
+from .scenarios import SCENARIOS
+from .stats import summarize
+
+BENCHMARK_USERNAME = 'benchmark'
+
+
+def benchmark_user():
+    user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+    return user
+
+
+@contextmanager
+def throttling_disabled():
+    # Limity anon/user (100 i 1000 dziennie) skończyłyby się w pierwszym scenariuszu.
+    # throttle_classes viewsetów to atrybut klasy z APIView, override_settings go nie zmienia
+    previous = APIView.throttle_classes
+    APIView.throttle_classes = []
+    try:
+        yield
+    finally:
+        APIView.throttle_classes = previous
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def run_in_process(data, scenarios, iterations, warmup=0, cold=False):
+    # Klient testowy Django w tym samym procesie: pełny stos middleware + liczba zapytań na żądanie
+    client = Client()
+    client.force_login(benchmark_user())
+    results = {}
+    with throttling_disabled(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name in scenarios:
+            build = SCENARIOS[name]
+            latencies, queries, errors, redirects = [], [], 0, 0
+            elapsed = 0.0
+            for iteration in range(warmup + iterations):
+                method, path, payload = build(data)
+                if cold:
+                    clear_caches()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    if method == 'POST':
+                        response = client.post(path, payload, content_type='application/json', secure=True)
+                    else:
+                        response = client.get(path, secure=True)
+                    duration = time.perf_counter() - started
+                if iteration < warmup:
+                    continue
+                elapsed += duration
+                if 300 <= response.status_code < 400:
+                    redirects += 1
+                    continue
+                if not 200 <= response.status_code < 300:
+                    errors += 1
+                    continue
+                latencies.append(duration * 1000)
+                queries.append(len(captured))
+            results[name] = summarize(latencies, elapsed, errors, queries, redirects)
+    return results
+
+
+def session_headers(user):
+    # Sesja zapisana wprost w bazie serwera + token CSRF (cookie == nagłówek) dla POST-ów
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    csrf_token = get_random_string(32)
+    return {
+        'Cookie': f'{settings.SESSION_COOKIE_NAME}={session.session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}',
+        'X-CSRFToken': csrf_token,
+        'Accept': 'application/json',
+    }
+
+
+def http_worker(base_url, next_request, headers, results):
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    client = connection_class(parts.netloc, timeout=30)
+    while True:
+        request = next_request()
+        if request is None:
+            break
+        method, path, payload = request
+        body = json.dumps(payload) if payload is not None else None
+        request_headers = dict(headers, **({'Content-Type': 'application/json'} if body else {}))
+        started = time.perf_counter()
+        try:
+            client.request(method, parts.path.rstrip('/') + path, body=body, headers=request_headers)
+            response = client.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            results.append((None, None))
+            client.close()
+            continue
+        results.append((response.status, (time.perf_counter() - started) * 1000))
+    client.close()
+
+
+def run_http(data, scenarios, iterations, base_url, concurrency, warmup=0):
+    # Sterownik współbieżny (jak locust, bez zależności): N wątków z keep-alive na działający serwer
+    headers = session_headers(benchmark_user())
+    results = {}
+    for name in scenarios:
+        build = SCENARIOS[name]
+        # Najpierw rozgrzewka, wynik liczymy z drugiego przebiegu
+        outcomes, elapsed = [], 0.0
+        for count, measured in ((warmup, False), (iterations, True)):
+            if count <= 0:
+                continue
+            lock = threading.Lock()
+            remaining = [count]
+
+            def next_request():
+                with lock:
+                    if remaining[0] <= 0:
+                        return None
+                    remaining[0] -= 1
+                    return build(data)
+
+            batch = []
+            workers = [
+                threading.Thread(target=http_worker, args=(base_url, next_request, headers, batch))
+                for _ in range(concurrency)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if measured:
+                outcomes, elapsed = batch, time.perf_counter() - started
+        # (status, ms), status None przy zerwanym połączeniu; sukces to tylko 2xx
+        latencies = [ms for status, ms in outcomes if status is not None and 200 <= status < 300]
+        redirects = sum(1 for status, _ in outcomes if status is not None and 300 <= status < 400)
+        results[name] = summarize(latencies, elapsed, len(outcomes) - len(latencies) - redirects, redirects=redirects)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**options):
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'products': Product.objects.count(),
+        'orders': Order.objects.count(),
+        **options,
+    }
+
+
+def compare(baseline, current):
+    # (scenariusz, metryka, przed, po, zmiana %) - dodatnia zmiana latencji/zapytań to regresja
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        metrics = [('rps', before['rps'], result['rps'])]
+        for key in ('p50', 'p95', 'p99'):
+            if before['latency_ms'] and result['latency_ms']:
+                metrics.append((f'{key} ms', before['latency_ms'][key], result['latency_ms'][key]))
+        if before['queries'] and result['queries']:
+            metrics.append(('queries', before['queries']['mean'], result['queries']['mean']))
+        for metric, old, new in metrics:
+            change = round((new - old) / old * 100, 1) if old and new is not None else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,78 @@
+from urllib.parse import urlencode
+from django.urls import reverse
+from shop.models import Product, Category
+from .catalogue import COLOURS, ITEMS, MATERIALS, STYLES, typo
+
+SAMPLE_SIZE = 2000
+
+
+class BenchmarkData:
+    # Losowa próbka istniejących id/slugów - scenariusze nie trafiają ciągle w ten sam wpis cache'u
+    def __init__(self, rng):
+        self.rng = rng
+        bounds = Product.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+        first, last = bounds.first(), bounds.last()
+        if first is None:
+            raise ValueError('No active products - seed the catalogue first')
+        candidates = {rng.randint(first, last) for _ in range(SAMPLE_SIZE * 2)}
+        self.products = list(
+            Product.objects.filter(pk__in=candidates, is_active=True).values_list('id', 'slug', 'price', 'stock')[:SAMPLE_SIZE]
+        )
+        # Zapas na kolejne zamówienia tego samego produktu w jednym przebiegu
+        self.in_stock = [product for product in self.products if product[3] >= 10]
+        self.category_ids = list(Category.objects.values_list('id', flat=True)[:200])
+
+
+def product_list(data):
+    ordering = data.rng.choice(['', 'price', '-price', 'name', '-created_at'])
+    return 'GET', reverse('product-list') + (f'?ordering={ordering}' if ordering else ''), None
+
+
+def product_filter(data):
+    low = data.rng.randint(5, 400)
+    params = {'min_price': low, 'max_price': low + data.rng.randint(20, 200), 'ordering': 'price'}
+    if data.category_ids:
+        params['category'] = data.rng.choice(data.category_ids)
+    if data.rng.random() < 0.5:
+        params['size'] = data.rng.choice([value for value, _ in Product.SIZE_CHOICES])
+    return 'GET', f"{reverse('product-list')}?{urlencode(params)}", None
+
+
+def product_search(data):
+    word = data.rng.choice(COLOURS + MATERIALS + ITEMS + STYLES)
+    kind = data.rng.random()
+    if kind < 0.5:
+        query = word
+    elif kind < 0.8:
+        query = f'{data.rng.choice(COLOURS)} {word}'
+    else:
+        query = word[:data.rng.randint(3, len(word))] if len(word) > 3 else typo(data.rng, word)
+    return 'GET', f"{reverse('product-search')}?{urlencode({'q': query})}", None
+
+
+def product_detail(data):
+    _, slug, _, _ = data.rng.choice(data.products)
+    return 'GET', reverse('product-detail', kwargs={'slug': slug}), None
+
+
+def order_create(data):
+    lines = data.rng.sample(data.in_stock, min(len(data.in_stock), data.rng.randint(1, 3)))
+    payload = {
+        'name': 'Benchmark Customer',
+        'email': 'benchmark@example.com',
+        'address': 'ul. Testowa 1',
+        'city': 'Warszawa',
+        'postal_code': '00-001',
+        'country': 'Poland',
+        'items': [{'product_id': product_id, 'quantity': 1, 'price': str(price)} for product_id, _, price, _ in lines],
+    }
+    return 'POST', reverse('orders'), payload
+
+
+SCENARIOS = {
+    'list': product_list,
+    'filter': product_filter,
+    'search': product_search,
+    'detail': product_detail,
+    'order_create': order_create,
+}
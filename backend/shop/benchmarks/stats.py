@@ -0,0 +1,32 @@
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, elapsed, errors, queries=None, redirects=0):
+    # Wynik jednego scenariusza w kształcie zapisywanym do JSON-a - porównywalny między commitami.
+    # latencies - tylko odpowiedzi 2xx; przekierowania liczone osobno, bez wpływu na req/s
+    latencies = sorted(latencies)
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'redirects': redirects,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': None,
+        'queries': None,
+    }
+    if latencies:
+        result['latency_ms'] = {
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'p50': round(percentile(latencies, 0.5), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2),
+        }
+    if queries:
+        queries = sorted(queries)
+        result['queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'p50': percentile(queries, 0.5),
+            'max': queries[-1],
+        }
+    return result
@@ -0,0 +1,219 @@
+import csv
+import json
+import sys
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+from django.utils.text import slugify
+from .models import Product
+from .autocomplete import get_autocomplete_index, autocomplete_changed
+from .related import invalidate_related_products
+from .response_cache import invalidate_catalogue
+from .search import update_search_documents
+
+# Kolumny wspólne dla importu i eksportu - plik z export_products da się wczytać z powrotem
+FIELDS = [
+    'slug', 'name', 'description', 'price', 'stock', 'category', 'tags',
+    'condition', 'size', 'brand', 'material', 'image', 'is_active', 'is_featured',
+]
+TAG_SEPARATOR = '|'
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+SLUG_RANGE_CHUNK = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def open_input(path):
+    if path == '-':
+        return nullcontext(sys.stdin)
+    return open(path, encoding='utf-8', newline='')
+
+
+def open_output(path):
+    if path == '-':
+        return nullcontext(sys.stdout)
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def read_rows(handle, fmt):
+    # Generator (numer linii, słownik) - plik nigdy nie jest wczytywany w całości
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, RowError(f'invalid JSON: {exc}')
+                continue
+            yield line_number, row if isinstance(row, dict) else RowError('expected a JSON object')
+    else:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def parse_bool(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'invalid boolean {value!r}')
+
+
+def parse_tags(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(TAG_SEPARATOR)
+    return [slugify(tag) for tag in value if slugify(tag)]
+
+
+def parse_row(row):
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise RowError('name is required')
+    try:
+        price = Decimal(str(row.get('price'))).quantize(Decimal('0.01'))
+        if price < 0:
+            raise InvalidOperation
+    except (InvalidOperation, TypeError, ValueError):
+        raise RowError(f"invalid price {row.get('price')!r}")
+    try:
+        stock = int(row.get('stock') or 0)
+    except (TypeError, ValueError):
+        raise RowError(f"invalid stock {row.get('stock')!r}")
+    condition = row.get('condition') or 'good'
+    if condition not in dict(Product.CONDITION_CHOICES):
+        raise RowError(f'invalid condition {condition!r}')
+    size = row.get('size') or 'M'
+    if size not in dict(Product.SIZE_CHOICES):
+        raise RowError(f'invalid size {size!r}')
+    return {
+        'slug': slugify(row.get('slug') or '')[:SLUG_MAX_LENGTH],
+        'name': name[:255],
+        'description': row.get('description') or '',
+        'price': price,
+        'stock': stock,
+        'category': slugify(row.get('category') or ''),
+        'tags': parse_tags(row.get('tags')),
+        'condition': condition,
+        'size': size,
+        'brand': (row.get('brand') or '')[:100],
+        'material': (row.get('material') or '')[:100],
+        'image': row.get('image') or '',
+        'is_active': parse_bool(row.get('is_active'), True),
+        'is_featured': parse_bool(row.get('is_featured'), False),
+    }
+
+
+class SlugCache:
+    # Kategorie i tagi po slugu: jedno zapytanie na paczkę nieznanych slugów, potem tylko słownik
+    def __init__(self, model, create_missing=False):
+        self.model = model
+        self.create_missing = create_missing
+        self.ids = {}
+
+    def resolve(self, slugs):
+        missing = {slug for slug in slugs if slug and slug not in self.ids}
+        if not missing:
+            return
+        self.ids.update(self.model.objects.filter(slug__in=missing).values_list('slug', 'pk'))
+        missing -= self.ids.keys()
+        if missing and self.create_missing:
+            # save() zamiast bulk_create - nowych kategorii/tagów jest niewiele, a sygnały są potrzebne
+            for slug in sorted(missing):
+                instance = self.model(name=slug.replace('-', ' ').title(), slug=slug)
+                instance.save()
+                self.ids[slug] = instance.pk
+
+    def get(self, slug):
+        if slug not in self.ids:
+            raise RowError(f'unknown {self.model._meta.model_name} {slug!r}')
+        return self.ids[slug]
+
+
+class SlugAllocator:
+    # Unikalne slugi dla całej paczki: baza ze slugify(name), przy kolizji kolejny sufiks -2, -3...
+    def __init__(self):
+        self.taken = set()
+        self.checked = set()
+
+    def reserve(self, slugs):
+        self.taken.update(slugs)
+
+    def allocate(self, names):
+        bases = [(slugify(name) or 'product')[:SLUG_MAX_LENGTH - 8] for name in names]
+        unchecked = set(bases) - self.checked
+        if unchecked:
+            conflicts = sorted(Product.objects.filter(slug__in=unchecked).values_list('slug', flat=True))
+            self.taken.update(conflicts)
+            # Zajęte sufiksy "baza-*" jako zakresy base- <= slug < base. złączone UNION ALL -
+            # każdy to krótki skan indeksu unikalnego, bez LIKE po całej tabeli
+            for start in range(0, len(conflicts), SLUG_RANGE_CHUNK):
+                ranges = [
+                    Product.objects.filter(slug__gte=f'{base}-', slug__lt=f'{base}.').order_by().values_list('slug', flat=True)
+                    for base in conflicts[start:start + SLUG_RANGE_CHUNK]
+                ]
+                self.taken.update(ranges[0].union(*ranges[1:], all=True))
+            self.checked.update(unchecked)
+
+        slugs = []
+        for base in bases:
+            slug, suffix = base, 1
+            while slug in self.taken:
+                suffix += 1
+                slug = f'{base}-{suffix}'
+            self.taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+
+def products_bulk_changed(product_ids, category_ids, reindex_ids=None):
+    # bulk_create/bulk_update omijają sygnały - to samo, co robią handlery z shop.signals, hurtem
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    reindex_ids = product_ids if reindex_ids is None else list(reindex_ids)
+    update_search_documents(reindex_ids)
+    autocomplete_changed('product', reindex_ids)
+    index = get_autocomplete_index(build=False)
+    if index is not None and reindex_ids:
+        rows = Product.objects.filter(pk__in=reindex_ids).values_list('pk', 'name', 'brand', 'is_active')
+        for product_id, name, brand, is_active in rows:
+            index.update_product(product_id, name, brand, is_active)
+    invalidate_related_products(*category_ids)
+    invalidate_catalogue()
+
+
+def export_row(product):
+    return {
+        'slug': product.slug,
+        'name': product.name,
+        'description': product.description,
+        'price': str(product.price),
+        'stock': product.stock,
+        'category': product.category.slug if product.category_id else '',
+        'tags': [tag.slug for tag in product.tags.all()],
+        'condition': product.condition,
+        'size': product.size,
+        'brand': product.brand,
+        'material': product.material,
+        'image': product.image.name if product.image else '',
+        'is_active': product.is_active,
+        'is_featured': product.is_featured,
+    }
@@ -0,0 +1,45 @@
+from .models import Category, category_path
+
+
+def rebuild_category_paths():
+    # Po bulk_create (seed) i w razie rozjechania ścieżek - liczy wszystko od korzeni w pamięci
+    rows = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def resolve(pk, visiting=()):
+        if pk not in paths:
+            parent_id = rows[pk]
+            # Rodzic z pętli (dane sprzed walidacji) - kategoria staje się korzeniem
+            parent_path = '' if parent_id is None or parent_id in visiting else resolve(parent_id, visiting + (pk,))
+            paths[pk] = category_path(parent_path, pk)
+        return paths[pk]
+
+    for pk in rows:
+        resolve(pk)
+    categories = [Category(pk=pk, path=path, depth=path.count('/') - 1) for pk, path in paths.items()]
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+    return len(categories)
+
+
+def category_tree():
+    # Całe drzewo jednym zapytaniem: wiersze po ścieżce (rodzic przed dziećmi), liczby poddrzew sumowane w górę
+    nodes, roots = {}, []
+    for category in Category.objects.with_products_count().order_by('path'):
+        node = {
+            'id': category.pk,
+            'name': category.name,
+            'slug': category.slug,
+            'depth': category.depth,
+            'products_count': category.products_count,
+            'subtree_products_count': category.products_count,
+            'children': [],
+        }
+        nodes[category.pk] = node
+        parent = nodes.get(category.parent_id)
+        (parent['children'] if parent is not None else roots).append(node)
+    for category_id in reversed(list(nodes)):
+        node = nodes[category_id]
+        node['children'].sort(key=lambda child: child['name'])
+        for child in node['children']:
+            node['subtree_products_count'] += child['subtree_products_count']
+    return sorted(roots, key=lambda node: node['name'])
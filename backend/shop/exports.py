@@ -0,0 +1,86 @@
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from django_filters import rest_framework as django_filters # type: ignore
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = 2000
+ORDER_EXPORT_FIELDS = [
+    'id', 'created_at', 'name', 'email', 'phone', 'address', 'city', 'postal_code', 'country',
+    'status', 'payment_status', 'shipping_status', 'total_amount', 'shipping_cost',
+    'tracking_number', 'notes',
+]
+ITEM_SEPARATOR = '|'
+
+
+class OrderExportFilter(django_filters.FilterSet):
+    status = django_filters.MultipleChoiceFilter(choices=Order.STATUS_CHOICES)
+    payment_status = django_filters.MultipleChoiceFilter(choices=Order.PAYMENT_STATUS_CHOICES)
+    shipping_status = django_filters.MultipleChoiceFilter(choices=Order.SHIPPING_STATUS_CHOICES)
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'payment_status', 'shipping_status', 'created_after', 'created_before']
+
+
+def iter_order_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # Krotki zamiast instancji modelu, kursor po stronie serwera (PostgreSQL) i pozycje
+    # dociągane jednym zapytaniem na paczkę - w pamięci jest najwyżej jedna paczka
+    rows = queryset.order_by('pk').values_list(*ORDER_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield with_items(chunk)
+            chunk = []
+    if chunk:
+        yield with_items(chunk)
+
+
+def with_items(chunk):
+    items = {}
+    rows = OrderItem.objects.filter(order_id__in=[row[0] for row in chunk]).order_by('order_id', 'id').values_list(
+        'order_id', 'product_id', 'quantity', 'unit_price'
+    )
+    for order_id, product_id, quantity, unit_price in rows:
+        items.setdefault(order_id, []).append((product_id, quantity, unit_price))
+    return [(row, items.get(row[0], [])) for row in chunk]
+
+
+def stream_ndjson(queryset):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in iter_order_chunks(queryset):
+        lines = []
+        for row, items in chunk:
+            order = dict(zip(ORDER_EXPORT_FIELDS, row))
+            order['items'] = [
+                {'product_id': product_id, 'quantity': quantity, 'price': unit_price}
+                for product_id, quantity, unit_price in items
+            ]
+            lines.append(encoder.encode(order))
+        # Jeden blok na paczkę zamiast jednego write na zamówienie
+        yield '\n'.join(lines) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_EXPORT_FIELDS + ['items'])
+    for chunk in iter_order_chunks(queryset):
+        yield ''.join(
+            writer.writerow([
+                value.isoformat() if hasattr(value, 'isoformat') else value for value in row
+            ] + [ITEM_SEPARATOR.join(f'{product_id}:{quantity}:{unit_price}' for product_id, quantity, unit_price in items)])
+            for row, items in chunk
+        )
+
+
+EXPORT_FORMATS = {
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'orders.ndjson'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8', 'orders.csv'),
+}
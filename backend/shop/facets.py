@@ -0,0 +1,126 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F
+from .models import Product, Category, Tag, FacetCount
+
+# Nazwy facetów = nazwy parametrów filtrów listy produktów
+FACETS = ('category', 'size', 'condition', 'brand', 'tags')
+TOTAL = ('total', '')
+# Parametry listy, które nie zawężają zbioru produktów - bez pozostałych liczby idą z tabeli FacetCount
+NON_FILTER_PARAMS = {'ordering', 'cursor', 'page', 'page_size', 'format'}
+Through = Product.tags.through
+
+
+def product_facets(product):
+    # Pary (facet, wartość) jednego produktu bez tagów; nieaktywny nie liczy się nigdzie
+    if not product.is_active:
+        return set()
+    values = {TOTAL, ('condition', product.condition), ('size', product.size)}
+    if product.category_id is not None:
+        values.add(('category', str(product.category_id)))
+    if product.brand:
+        values.add(('brand', product.brand))
+    return values
+
+
+def tag_facets(tag_ids):
+    return {('tags', str(tag_id)) for tag_id in tag_ids}
+
+
+def apply_facet_deltas(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=facet, value=value) for (facet, value), delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    # Stała kolejność wierszy - dwie transakcje nie zakleszczą się na tych samych licznikach
+    for (facet, value), delta in sorted(deltas.items()):
+        FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+
+
+def facets_changed(previous, current):
+    deltas = Counter(dict.fromkeys(current - previous, 1))
+    deltas.update(dict.fromkeys(previous - current, -1))
+    apply_facet_deltas(deltas)
+
+
+def count_facets(queryset):
+    # Liczby dla dowolnie przefiltrowanego zbioru - cztery zapytania z GROUP BY niezależnie od liczby wartości
+    queryset = queryset.order_by().select_related(None).prefetch_related(None)
+    if queryset.query.distinct or Through._meta.db_table in {join.table_name for join in queryset.query.alias_map.values()}:
+        # JOIN po tagach mnoży wiersze produktu - grupujemy po samych produktach z podzapytania
+        queryset = Product.objects.filter(pk__in=queryset.values('pk'))
+    counts = Counter()
+    # condition i size jednym GROUP BY po kolumnach indeksu (condition, size)
+    for row in queryset.values('condition', 'size').annotate(n=Count('pk')):
+        counts[TOTAL] += row['n']
+        counts['condition', row['condition']] += row['n']
+        counts['size', row['size']] += row['n']
+    for row in queryset.exclude(category=None).values('category').annotate(n=Count('pk')):
+        counts['category', str(row['category'])] = row['n']
+    for row in queryset.exclude(brand='').values('brand').annotate(n=Count('pk')):
+        counts['brand', row['brand']] = row['n']
+    tags = Through.objects.filter(product__in=queryset.values('pk')).values('tag').annotate(n=Count('product'))
+    for row in tags.order_by():
+        counts['tags', str(row['tag'])] = row['n']
+    return counts
+
+
+def stored_facets():
+    return Counter({(facet, value): count for facet, value, count in FacetCount.objects.values_list('facet', 'value', 'count')})
+
+
+def rebuild_facet_counts():
+    # Po operacjach hurtowych (import, seed), które omijają sygnały - i do naprawy ewentualnego dryfu
+    counts = count_facets(Product.objects.active())
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            [FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()],
+            batch_size=1000,
+        )
+    return counts
+
+
+def is_filtered(query_params):
+    return any(key not in NON_FILTER_PARAMS and any(values) for key, values in query_params.lists())
+
+
+def facet_payload(counts):
+    by_facet = {facet: {} for facet in FACETS}
+    for (facet, value), count in counts.items():
+        if facet in by_facet and count > 0:
+            by_facet[facet][value] = count
+
+    categories = Category.objects.filter(pk__in=[int(pk) for pk in by_facet['category']]).values_list('pk', 'name', 'slug')
+    tags = Tag.objects.filter(pk__in=[int(pk) for pk in by_facet['tags']]).values_list('pk', 'name', 'slug')
+
+    def related(facet, rows):
+        items = [
+            {'value': pk, 'label': name, 'slug': slug, 'count': by_facet[facet][str(pk)]}
+            for pk, name, slug in rows
+        ]
+        return sorted(items, key=lambda item: (-item['count'], item['label']))
+
+    def choices(facet, options):
+        # Kolejność jak w modelu (XS..XXL, new..fair), nie po liczności
+        return [
+            {'value': value, 'label': label, 'count': by_facet[facet][value]}
+            for value, label in options if value in by_facet[facet]
+        ]
+
+    return {
+        'total': max(counts.get(TOTAL, 0), 0),
+        'facets': {
+            'category': related('category', categories),
+            'size': choices('size', Product.SIZE_CHOICES),
+            'condition': choices('condition', Product.CONDITION_CHOICES),
+            'brand': [
+                {'value': brand, 'label': brand, 'count': count}
+                for brand, count in sorted(by_facet['brand'].items(), key=lambda item: (-item[1], item[0]))
+            ],
+            'tags': related('tags', tags),
+        },
+    }
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers # type: ignore
+from rest_framework.fields import SkipField # type: ignore
+from rest_framework.relations import PKOnlyObject # type: ignore
+from .instrumentation import TimedSerializerMixin
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Podbić przy zmianie pól serializera, żeby nie czytać fragmentów w starym kształcie
+FRAGMENT_VERSION = 1
+HITS_KEY = 'shop:fragments:hits'
+MISSES_KEY = 'shop:fragments:misses'
+
+
+def get_fragment_cache():
+    return caches[getattr(settings, 'SHOP_FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def fragment_key(serializer, instance):
+    # updated_at w kluczu: każdy zapis produktu daje nowy klucz, starych wpisów nie kasujemy
+    updated_at = getattr(instance, 'updated_at', None)
+    if instance.pk is None or updated_at is None:
+        return None
+    request = serializer.context.get('request')
+    # Pola plików są renderowane jako absolutne URL-e, więc host też jest częścią klucza
+    host = f'{request.scheme}://{request.get_host()}' if request is not None else ''
+    stamp = int(updated_at.timestamp() * 1000000)
+    return f'shop:fragment:{FRAGMENT_VERSION}:{type(serializer).__name__}:{host}:{instance.pk}:{stamp}'
+
+
+def count_fragments(hits, misses):
+    fragment_cache = get_fragment_cache()
+    for key, delta in ((HITS_KEY, hits), (MISSES_KEY, misses)):
+        if not delta:
+            continue
+        try:
+            fragment_cache.incr(key, delta)
+        except ValueError:
+            if not fragment_cache.add(key, delta, timeout=None):
+                fragment_cache.incr(key, delta)
+
+
+def fragment_cache_stats():
+    counters = get_fragment_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+def reset_fragment_cache_stats():
+    get_fragment_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def touch_products(product_ids):
+    # Zmiana kategorii/tagu zmienia JSON produktu - nowy updated_at to nowy klucz fragmentu
+    product_ids = list(product_ids)
+    if product_ids:
+        from .models import Product
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+class FragmentListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        instances = list(iterable)
+        # Jeden get_many na całą stronę, serializujemy tylko brakujące produkty
+        self.child.prefetch_fragments(instances)
+        if self.context.get('reload_fragment_misses'):
+            instances = self.child.reload_misses(instances)
+        try:
+            return [self.child.to_representation(instance) for instance in instances]
+        finally:
+            self.child.flush_fragments()
+
+
+class CachedFragmentMixin:
+    # Pola liczone przy każdym renderowaniu - zależą od innych wierszy niż sam produkt
+    fragment_volatile_fields = ()
+
+    def get_fragment_queryset(self):
+        return self.Meta.model._default_manager.all()
+
+    def prefetch_fragments(self, instances):
+        keys = [key for key in (fragment_key(self, instance) for instance in instances) if key]
+        self._fragments = get_fragment_cache().get_many(keys) if keys else {}
+        self._batched = True
+        self._hits = self._misses = 0
+        self._missed_fragments = {}
+
+    def reload_misses(self, instances):
+        # Strona przyszła jako same id + updated_at - pełne wiersze tylko dla brakujących fragmentów
+        missing = {instance.pk for instance in instances if fragment_key(self, instance) not in self._fragments}
+        if not missing:
+            return instances
+        loaded = self.get_fragment_queryset().in_bulk(missing)
+        return [
+            loaded[instance.pk] if instance.pk in missing else instance
+            for instance in instances
+            if instance.pk in loaded or instance.pk not in missing
+        ]
+
+    def flush_fragments(self):
+        if self._missed_fragments:
+            get_fragment_cache().set_many(self._missed_fragments, FRAGMENT_CACHE_TIMEOUT)
+        count_fragments(self._hits, self._misses)
+        self._batched = False
+        self._fragments = self._missed_fragments = {}
+
+    def to_representation(self, instance):
+        if not getattr(self, '_batched', False):
+            self.prefetch_fragments([instance])
+            try:
+                return self.to_representation(instance)
+            finally:
+                self.flush_fragments()
+
+        key = fragment_key(self, instance)
+        fragment = self._fragments.get(key) if key else None
+        if fragment is None:
+            self._misses += 1
+            data = super().to_representation(instance)
+            if key:
+                self._missed_fragments[key] = {
+                    name: value for name, value in data.items() if name not in self.fragment_volatile_fields
+                }
+            return data
+
+        self._hits += 1
+        data = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in self.fragment_volatile_fields:
+                self.represent_field(data, field, instance)
+            elif field.field_name in fragment:
+                data[field.field_name] = fragment[field.field_name]
+        return data
+
+    def represent_field(self, data, field, instance):
+        # Jak w Serializer.to_representation, dla pojedynczego pola
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        data[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
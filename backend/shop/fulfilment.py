@@ -0,0 +1,43 @@
+from django.db import connection, transaction
+from .models import Order
+from .outbox import record_events, status_event
+from .analytics import record_status_sales
+
+# Tyle zamówień zmienia jedno żądanie; większy filtr trzeba zawęzić (np. po created_before)
+BULK_ORDER_LIMIT = 5000
+BULK_FIELDS = ('status', 'shipping_status', 'tracking_number')
+# Stan w wyniku i w zdarzeniu; płatności ta operacja nie zmienia
+STATE_FIELDS = (*BULK_FIELDS, 'payment_status')
+TRACKING_BATCH_SIZE = 1000
+
+
+def bulk_update_orders(queryset, changes, tracking_numbers=None):
+    # changes: wspólne wartości pól z BULK_FIELDS dla wszystkich zamówień, tracking_numbers: {id: numer}.
+    # Jedna transakcja: odczyt poprzedniego stanu, jeden UPDATE na wspólne pola, bulk_update numerów
+    # przesyłek i zdarzenia outboxu - zwraca {id: (poprzedni, nowy stan)} tylko dla istniejących zamówień
+    tracking_numbers = tracking_numbers or {}
+    with transaction.atomic():
+        rows = queryset.order_by('pk')
+        if connection.features.has_select_for_update:
+            # Blokady w kolejności id, tak jak przy rezerwacji stanów - dwie paczki się nie zakleszczą
+            rows = rows.select_for_update()
+        previous = {row[0]: dict(zip(STATE_FIELDS, row[1:])) for row in rows.values_list('pk', *STATE_FIELDS)}
+        current = {
+            pk: dict(state, **changes, **({'tracking_number': tracking_numbers[pk]} if pk in tracking_numbers else {}))
+            for pk, state in previous.items()
+        }
+        changed = [pk for pk in previous if current[pk] != previous[pk]]
+        if changes:
+            Order.objects.filter(pk__in=changed).update(**changes)
+        per_row = [Order(pk=pk, tracking_number=tracking_numbers[pk]) for pk in changed if pk in tracking_numbers]
+        if per_row:
+            Order.objects.bulk_update(per_row, ['tracking_number'], batch_size=TRACKING_BATCH_SIZE)
+        record_events([
+            status_event(
+                Order(pk=pk, **current[pk]),
+                previous[pk]['status'], previous[pk]['shipping_status'],
+            )
+            for pk in changed
+        ])
+        record_status_sales([(pk, previous[pk]['status'], current[pk]['status']) for pk in changed])
+    return {pk: (previous[pk], current[pk]) for pk in previous}
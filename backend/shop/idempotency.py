@@ -0,0 +1,131 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status # type: ignore
+from rest_framework.response import Response # type: ignore
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Jak często powtórka czeka na wynik trwającego wykonania z tym samym kluczem
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    # Ten sam klucz z inną treścią to błąd klienta, nie powtórka
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = {key: values for key, values in data.lists()}
+    payload = json.dumps([request.method, request.path, data], cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def client_scope(scope, request):
+    # Klucze są osobne dla każdego klienta - ten sam Idempotency-Key od kogoś innego nie odtworzy cudzej odpowiedzi
+    if request.user.is_authenticated:
+        return f'{scope}:user:{request.user.pk}'
+    if request.session.session_key is None:
+        request.session.save()
+    return f'{scope}:session:{request.session.session_key}'
+
+
+def claim_key(scope, key, fingerprint):
+    # (rekord, czy_nasz): nowy klucz zakłada wiersz od razu zatwierdzony poza transakcją widoku,
+    # więc równoległy duplikat trafia na ograniczenie unikalności zamiast wykonać zamówienie drugi raz
+    now = timezone.now()
+    lease = now + timedelta(seconds=getattr(settings, 'SHOP_IDEMPOTENCY_LEASE', 60))
+    expires_at = now + timedelta(seconds=getattr(settings, 'SHOP_IDEMPOTENCY_TTL', 60 * 60 * 24))
+    # Najpierw odczyt: powtórka zakończonego żądania to jedno zapytanie po indeksie unikalnym
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    scope=scope, key=key, fingerprint=fingerprint, locked_until=lease, expires_at=expires_at,
+                ), True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+            if record is None:
+                return None, False
+    if record.expires_at <= now or (record.status_code is None and record.locked_until <= now):
+        # Wygasły klucz albo porzucone wykonanie (proces padł) - przejmuje tylko jeden z czekających
+        taken = IdempotencyKey.objects.filter(
+            pk=record.pk, locked_until=record.locked_until, expires_at=record.expires_at,
+        ).update(fingerprint=fingerprint, status_code=None, response=None, locked_until=lease, expires_at=expires_at)
+        if taken:
+            record.fingerprint, record.status_code, record.response = fingerprint, None, None
+            record.locked_until, record.expires_at = lease, expires_at
+            return record, True
+        return None, False
+    return record, False
+
+
+def replay(record):
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def execute(method, view, request, record, *args, **kwargs):
+    # Zamówienie i zapis odpowiedzi w jednej transakcji - po COMMIT powtórka zawsze znajdzie wynik
+    try:
+        with transaction.atomic():
+            response = method(view, request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                IdempotencyKey.objects.filter(pk=record.pk).update(status_code=response.status_code, response=response.data)
+                return response
+    except Exception:
+        IdempotencyKey.objects.filter(pk=record.pk, status_code=None).delete()
+        raise
+    # Błędy walidacji nie są zapamiętywane - poprawione żądanie może przyjść z tym samym kluczem
+    IdempotencyKey.objects.filter(pk=record.pk, status_code=None).delete()
+    return response
+
+
+def idempotent(scope):
+    # Dla metod APIView: nagłówek Idempotency-Key -> jedno wykonanie, kolejne żądania dostają tę samą odpowiedź
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return method(self, request, *args, **kwargs)
+            if not key.strip() or len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'detail': f'{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            fingerprint = request_fingerprint(request)
+            key_scope = client_scope(scope, request)
+            deadline = time.monotonic() + getattr(settings, 'SHOP_IDEMPOTENCY_WAIT', 10)
+            while True:
+                record, claimed = claim_key(key_scope, key, fingerprint)
+                if claimed:
+                    return execute(method, self, request, record, *args, **kwargs)
+                if record is not None:
+                    if record.fingerprint != fingerprint:
+                        return Response(
+                            {'detail': f'{IDEMPOTENCY_HEADER} was already used with a different request.'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        )
+                    if record.status_code is not None:
+                        return replay(record)
+                if time.monotonic() >= deadline:
+                    return Response(
+                        {'detail': 'A request with this Idempotency-Key is still being processed.'},
+                        status=status.HTTP_409_CONFLICT,
+                        headers={'Retry-After': '1'},
+                    )
+                # Równoległy duplikat czeka na wynik pierwszego wykonania zamiast składać drugie zamówienie
+                time.sleep(POLL_INTERVAL)
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('shop')
+
+# Nazwa -> maksymalny bok w px; generujemy od największej, mniejsze skalujemy z poprzedniej
+VARIANTS = {
+    'detail': 1200,
+    'card': 480,
+    'thumbnail': 160,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Zmiana parametrów powyżej = nowa wersja, żeby nie trafiać w stare pliki o tej samej treści źródła
+PIPELINE_VERSION = 1
+VARIANTS_DIR = 'variants'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_path(digest, name, size, extension):
+    # Adresowanie treścią: ten sam plik źródłowy (np. wgrany drugi raz) to te same warianty
+    return f'{VARIANTS_DIR}/{digest[:2]}/{digest}/v{PIPELINE_VERSION}-{name}-{size}.{extension}'
+
+
+def encode(image, image_format, options):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG nie ma przezroczystości - białe tło zamiast czarnego
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(name, storage=None):
+    # Czysta funkcja plikowa (bez bazy) - wołana z wątków przy uploadzie i z procesów przy backfillu
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as file:
+        digest = content_hash(file)
+        image = Image.open(file)
+        # Dekoder JPEG od razu zmniejsza obraz (1/2, 1/4, 1/8) - dużo szybciej dla wielkich zdjęć
+        image.draft('RGB', (max(VARIANTS.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    variants = {}
+    for variant, size in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.LANCZOS)
+        rendition = {'width': image.width, 'height': image.height}
+        for extension, (image_format, options) in FORMATS.items():
+            path = variant_path(digest, variant, size, extension)
+            if not storage.exists(path):
+                path = storage.save(path, ContentFile(encode(image, image_format, options)))
+            rendition[extension] = path
+        variants[variant] = rendition
+    return variants
+
+
+def generate_product_variants(product_id):
+    from .models import Product
+    from .response_cache import invalidate_catalogue
+
+    name = Product.objects.filter(pk=product_id).values_list('image', flat=True).first()
+    if not name:
+        return None
+    variants = render_variants(name)
+    # Warunek na image: jeśli w międzyczasie wgrano inne zdjęcie, nie nadpisujemy jego wariantów
+    updated = Product.objects.filter(pk=product_id, image=name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        invalidate_catalogue()
+    return variants
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SHOP_IMAGE_WORKERS', 2), thread_name_prefix='image-variants'
+                )
+    return _executor
+
+
+def _run_in_worker(product_id):
+    try:
+        generate_product_variants(product_id)
+    except Exception:
+        logger.exception('Generating image variants for product %s failed', product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(product_id):
+    # Po COMMIT, żeby wątek widział zapisany plik i wiersz; w testach można wyłączyć pulę
+    if getattr(settings, 'SHOP_IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, product_id))
+    else:
+        transaction.on_commit(lambda: generate_product_variants(product_id))
+
+
+def variant_urls(variants, request=None):
+    urls = {}
+    for variant, rendition in (variants or {}).items():
+        urls[variant] = dict(rendition)
+        for extension in FORMATS:
+            if extension in rendition:
+                url = default_storage.url(rendition[extension])
+                urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+    return urls
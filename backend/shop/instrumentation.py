@@ -0,0 +1,322 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import serializers  # type: ignore
+
+logger = logging.getLogger('shop.perf')
+
+# Kubełki histogramu czasu odpowiedzi w sekundach (jak domyślne w prometheus_client, do 10 s)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Ile zapytań trzymamy na żądanie do logu wolnych żądań - pętla N+1 nie zje pamięci
+MAX_SQL_SAMPLES = 1000
+SLOW_SQL_LOGGED = 5
+SERIES_KEY = 'shop:metrics:series'
+SERIES_LOCK_KEY = 'shop:metrics:series:lock'
+METRIC_FIELDS = ('requests', 'duration_us', 'db_queries', 'db_us', 'serializer_us', 'response_bytes', 'slow')
+
+_current = ContextVar('shop_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.sql = []
+
+    def record_query(self, sql, duration):
+        self.db_queries += 1
+        self.db_time += duration
+        if len(self.sql) < MAX_SQL_SAMPLES:
+            self.sql.append((duration, sql))
+
+
+def current_stats():
+    return _current.get()
+
+
+def record_sql(execute, sql, params, many, context):
+    # execute_wrapper na każdym połączeniu (też w wątkach sync_to_async - kontekst jest kopiowany)
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, time.perf_counter() - started)
+
+
+def install_sql_wrapper(connection):
+    # Na początek listy: execute_wrapper() Django zdejmuje ostatni element, nie nasz
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_sql)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_sql_wrapper(connection)
+
+
+@contextmanager
+def timed_serialization():
+    # Zagnieżdżone serializery (powiązane produkty) liczą się raz, w najbardziej zewnętrznym
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    stats.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_depth -= 1
+        if not stats.serializer_depth:
+            stats.serializer_time += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class MetricsRegistry:
+    # Agregaty w pamięci procesu, co kilka sekund dopisywane INCR-em do cache'u (Redis), żeby
+    # /metrics pokazywał sumę ze wszystkich workerów gunicorna, a nie jednego losowego
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.known = set()
+        self.last_flush = time.monotonic()
+
+    def observe(self, series, values):
+        with self.lock:
+            pending = self.pending.setdefault(series, dict.fromkeys(METRIC_FIELDS + bucket_fields(), 0))
+            for field, value in values.items():
+                pending[field] += value
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= getattr(settings, 'SHOP_METRICS_FLUSH_INTERVAL', 5):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        metrics_cache = get_metrics_cache()
+        for series, values in pending.items():
+            for field, value in values.items():
+                if value:
+                    increment(metrics_cache, series_key(series, field), value)
+        new_series = pending.keys() - self.known
+        if new_series and register_series(metrics_cache, new_series):
+            self.known |= new_series
+
+
+registry = MetricsRegistry()
+
+
+def bucket_fields():
+    return tuple(f'bucket_{index}' for index in range(len(DURATION_BUCKETS) + 1))
+
+
+def get_metrics_cache():
+    return caches[getattr(settings, 'SHOP_METRICS_CACHE_ALIAS', 'default')]
+
+
+def series_key(series, field):
+    return 'shop:metrics:' + ':'.join(series) + f':{field}'
+
+
+def increment(metrics_cache, key, delta):
+    try:
+        metrics_cache.incr(key, delta)
+    except ValueError:
+        if not metrics_cache.add(key, delta, timeout=None):
+            metrics_cache.incr(key, delta)
+
+
+def register_series(metrics_cache, new_series):
+    # Lista serii zmienia się rzadko (nowy widok/status) - odczyt-zapis pod krótką blokadą w cache'u
+    if not metrics_cache.add(SERIES_LOCK_KEY, 1, timeout=5):
+        return False
+    try:
+        known = set(map(tuple, metrics_cache.get(SERIES_KEY, [])))
+        metrics_cache.set(SERIES_KEY, sorted(known | set(new_series)), timeout=None)
+    finally:
+        metrics_cache.delete(SERIES_LOCK_KEY)
+    return True
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match.route) if match is not None else 'unmatched'
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else 0
+    return len(response.content)
+
+
+def server_timing(stats, total):
+    return (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries", '
+        f'serialize;dur={stats.serializer_time * 1000:.1f}'
+    )
+
+
+def log_slow_request(request, response, stats, total):
+    slowest = sorted(stats.sql, key=lambda sample: sample[0], reverse=True)[:SLOW_SQL_LOGGED]
+    repeated = {}
+    for _, sql in stats.sql:
+        repeated[sql] = repeated.get(sql, 0) + 1
+    sql, count = max(repeated.items(), key=lambda item: item[1], default=(None, 0))
+    lines = [
+        f'Slow request {request.method} {request.get_full_path()} -> {response.status_code} in {total * 1000:.0f} ms: '
+        f'{stats.db_queries} queries in {stats.db_time * 1000:.0f} ms, serializer {stats.serializer_time * 1000:.0f} ms'
+    ]
+    lines += [f'  {duration * 1000:8.1f} ms  {sql}' for duration, sql in slowest]
+    if count > 1:
+        # Ta sama instrukcja wiele razy to zwykle N+1
+        lines.append(f'  repeated {count}x: {sql}')
+    logger.warning('\n'.join(lines))
+
+
+def finish_request(request, response, stats):
+    total = time.perf_counter() - stats.started
+    if getattr(settings, 'SHOP_SERVER_TIMING', True):
+        response['Server-Timing'] = server_timing(stats, total)
+    slow = total * 1000 >= getattr(settings, 'SHOP_SLOW_REQUEST_MS', 500)
+    if slow:
+        log_slow_request(request, response, stats, total)
+    values = {
+        'requests': 1,
+        'duration_us': int(total * 1000000),
+        'db_queries': stats.db_queries,
+        'db_us': int(stats.db_time * 1000000),
+        'serializer_us': int(stats.serializer_time * 1000000),
+        'response_bytes': response_size(response),
+        'slow': int(slow),
+    }
+    bucket = next((index for index, bound in enumerate(DURATION_BUCKETS) if total <= bound), len(DURATION_BUCKETS))
+    values[f'bucket_{bucket}'] = 1
+    registry.observe((request.method, route_label(request), f'{response.status_code // 100}xx'), values)
+    registry.maybe_flush()
+
+
+class PerformanceMiddleware:
+    # Czas całego żądania, zapytania SQL (liczba, czas), czas serializerów i rozmiar odpowiedzi:
+    # nagłówek Server-Timing, agregaty dla /metrics i log wolnych żądań z ich SQL-em
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_sql_wrapper(default_connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        finish_request(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        finish_request(request, response, stats)
+        return response
+
+
+def format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+def metric_lines(name, kind, help_text, samples):
+    yield f'# HELP {name} {help_text}'
+    yield f'# TYPE {name} {kind}'
+    for labels, value in samples:
+        yield f'{name}{{{format_labels(labels)}}} {value}'
+
+
+def render_metrics():
+    registry.flush()
+    metrics_cache = get_metrics_cache()
+    series = [tuple(item) for item in metrics_cache.get(SERIES_KEY, [])]
+    fields = METRIC_FIELDS + bucket_fields()
+    values = metrics_cache.get_many([series_key(item, field) for item in series for field in fields])
+
+    def value(item, field):
+        return values.get(series_key(item, field), 0)
+
+    def labels(item):
+        return (('method', item[0]), ('view', item[1]), ('status', item[2]))
+
+    def totals(field, scale=1):
+        return [(labels(item), round(value(item, field) / scale, 6)) for item in series]
+
+    lines = list(metric_lines('shop_http_requests_total', 'counter', 'HTTP requests.', totals('requests')))
+    # Histogram: _bucket (narastająco), _sum i _count pod jednym # TYPE
+    name = 'shop_http_request_duration_seconds'
+    lines += [f'# HELP {name} Wall time of HTTP requests.', f'# TYPE {name} histogram']
+    for item in series:
+        cumulative = 0
+        for index, bound in enumerate(DURATION_BUCKETS + (None,)):
+            cumulative += value(item, f'bucket_{index}')
+            le = '+Inf' if bound is None else repr(bound)
+            lines.append(f'{name}_bucket{{{format_labels(labels(item) + (("le", le),))}}} {cumulative}')
+        lines.append(f'{name}_sum{{{format_labels(labels(item))}}} {round(value(item, "duration_us") / 1000000, 6)}')
+        lines.append(f'{name}_count{{{format_labels(labels(item))}}} {value(item, "requests")}')
+    lines += metric_lines('shop_db_queries_total', 'counter', 'SQL queries executed while handling requests.', totals('db_queries'))
+    lines += metric_lines('shop_db_query_seconds_total', 'counter', 'Time spent in SQL queries.', totals('db_us', 1000000))
+    lines += metric_lines('shop_serializer_seconds_total', 'counter', 'Time spent rendering DRF serializers.', totals('serializer_us', 1000000))
+    lines += metric_lines('shop_http_response_bytes_total', 'counter', 'Response body bytes.', totals('response_bytes'))
+    lines += metric_lines('shop_slow_requests_total', 'counter', 'Requests slower than SHOP_SLOW_REQUEST_MS.', totals('slow'))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics(request):
+    # Scrape Prometheusa z tokenem (SHOP_METRICS_TOKEN) albo podgląd dla zalogowanego admina
+    token = getattr(settings, 'SHOP_METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token:
+        allowed = constant_time_compare(header, f'Bearer {token}')
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,132 @@
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .response_cache import get_response_cache
+
+logger = logging.getLogger('shop')
+
+# Wpisy dziennika zmian żyją godzinę; proces, który zostanie dalej w tyle, przebudowuje indeks w tle
+CHANGE_LOG_TIMEOUT = 60 * 60
+MAX_CHANGE_LAG = 200
+# Większa paczka (import, rebuild_search_index) to jeden wpis "przebuduj wszystko" zamiast listy id
+MAX_CHANGE_BATCH = 500
+
+
+class SharedIndex:
+    # Indeks w pamięci procesu (autocomplete, wyszukiwarka na SQLite). Każdy worker gunicorna i komenda
+    # mają swoją kopię, więc zmiany katalogu trafiają do dziennika w cache'u: numer sekwencji i lista
+    # (rodzaj, pk) pod kolejnymi kluczami. Pozostałe procesy doczytują z bazy tylko te obiekty
+    # (refresh(index, changes)) - pełna budowa jest tylko na start i gdy proces zgubi część dziennika
+    def __init__(self, name, build, refresh):
+        self.sequence_key = f'shop:index:{name}:sequence'
+        self.change_key = f'shop:index:{name}:change:{{}}'
+        self.name = name
+        self.build = build
+        self.refresh = refresh
+        self.index = None
+        self.sequence = None
+        self.rebuilding = False
+        # RLock - rebuild() bez wątku (SHOP_INDEX_REBUILD_ASYNC=False) woła się spod catch_up()
+        self.lock = threading.RLock()
+
+    def current_sequence(self):
+        cache = get_response_cache()
+        sequence = cache.get(self.sequence_key)
+        if sequence is None:
+            cache.add(self.sequence_key, 0, timeout=None)
+            sequence = cache.get(self.sequence_key, 0)
+        return sequence
+
+    def get(self, build=True):
+        # build=False (sygnały, komendy) - tylko już zbudowany indeks, bez czytania dziennika
+        if not build:
+            return self.index
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    # Sekwencję czytamy przed budową - zmiany w jej trakcie doczytamy z dziennika
+                    sequence = self.current_sequence()
+                    self.index = self.build()
+                    self.sequence = sequence
+        else:
+            self.catch_up()
+        return self.index
+
+    def catch_up(self):
+        sequence = self.current_sequence()
+        if sequence == self.sequence or self.rebuilding:
+            return
+        with self.lock:
+            start = self.sequence
+            if sequence == start or self.rebuilding:
+                return
+            # Cache wyczyszczony (sekwencja od zera) albo proces za daleko w tyle
+            if sequence < start or sequence - start > MAX_CHANGE_LAG:
+                self.rebuild_in_background()
+                return
+            keys = [self.change_key.format(number) for number in range(start + 1, sequence + 1)]
+            entries = get_response_cache().get_many(keys)
+            changes = {}
+            for number, key in enumerate(keys, start + 1):
+                entry = entries.get(key)
+                if entry is None and number == sequence:
+                    # Najnowszy wpis jest właśnie zapisywany (INCR przed SET) - weźmiemy go następnym razem
+                    break
+                if entry is None or entry == 'all':
+                    self.rebuild_in_background()
+                    return
+                changes.update(dict.fromkeys(entry))
+                self.sequence = number
+            changes = list(changes)
+            for offset in range(0, len(changes), MAX_CHANGE_BATCH):
+                self.refresh(self.index, changes[offset:offset + MAX_CHANGE_BATCH])
+
+    def rebuild_in_background(self):
+        # Do czasu podmiany zapytania obsługuje dotychczasowa kopia; w testach można budować od razu
+        self.rebuilding = True
+        if getattr(settings, 'SHOP_INDEX_REBUILD_ASYNC', True):
+            threading.Thread(target=self._rebuild_in_thread, name=f'{self.name}-index', daemon=True).start()
+        else:
+            self.rebuild()
+
+    def rebuild(self):
+        try:
+            sequence = self.current_sequence()
+            index = self.build()
+            with self.lock:
+                self.index, self.sequence = index, sequence
+        except Exception:
+            logger.exception('Rebuilding the %s index failed', self.name)
+        finally:
+            self.rebuilding = False
+
+    def _rebuild_in_thread(self):
+        try:
+            self.rebuild()
+        finally:
+            close_old_connections()
+
+    def changed(self, kind, ids):
+        # Po COMMIT, żeby inne procesy doczytały już zapisane dane
+        ids = list(ids)
+        if ids:
+            transaction.on_commit(lambda: self.publish([(kind, pk) for pk in ids]))
+
+    def publish(self, changes):
+        cache = get_response_cache()
+        try:
+            sequence = cache.incr(self.sequence_key)
+        except ValueError:
+            cache.add(self.sequence_key, 0, timeout=None)
+            sequence = cache.incr(self.sequence_key)
+        entry = changes if len(changes) <= MAX_CHANGE_BATCH else 'all'
+        cache.set(self.change_key.format(sequence), entry, timeout=CHANGE_LOG_TIMEOUT)
+        # Lokalna kopia ma już tę zmianę z sygnału; jeśli nikt inny nie zmienił nic w międzyczasie, jest aktualna
+        if self.sequence == sequence - 1:
+            self.sequence = sequence
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+            self.sequence = None
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from shop.pricing import AUDIT_CHUNK_SIZE, audit_order_totals
+
+SHOWN_MISMATCHES = 20
+
+
+class Command(BaseCommand):
+    help = 'Check stored order total_amount against items + shipping computed in exact cents; --fix rewrites wrong ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=AUDIT_CHUNK_SIZE)
+        parser.add_argument('--fix', action='store_true', help='update wrong totals (and the sales rollups) in place')
+
+    def handle(self, *args, **options):
+        checked = 0
+
+        def progress(last_pk, rows, wrong):
+            nonlocal checked
+            checked += rows
+            if options['verbosity'] > 1:
+                self.stdout.write(f'... up to order {last_pk}: {checked} checked')
+
+        mismatches = audit_order_totals(chunk_size=max(options['chunk_size'], 1), fix=options['fix'], progress=progress)
+        for pk, stored, expected in mismatches[:SHOWN_MISMATCHES]:
+            self.stdout.write(f'Order {pk}: stored {stored}, expected {expected}')
+        if len(mismatches) > SHOWN_MISMATCHES:
+            self.stdout.write(f'... and {len(mismatches) - SHOWN_MISMATCHES} more')
+        verb = 'fixed' if options['fix'] else 'wrong'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} orders, {len(mismatches)} {verb}'))
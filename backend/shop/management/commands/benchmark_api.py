@@ -0,0 +1,102 @@
+import json
+import random
+from django.core.management.base import BaseCommand, CommandError
+from shop.benchmarks.catalogue import seed_catalogue
+from shop.benchmarks.runner import run_in_process, run_http, metadata, compare
+from shop.benchmarks.scenarios import SCENARIOS, BenchmarkData
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic catalogue and measure throughput, p50/p95/p99 latency and query counts of the shop API. '
+        'Run it against a dedicated database - seeding writes to the configured one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-products', type=int, default=0, help='bulk insert N products first (10k-1M)')
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=None, help='orders to seed, default products / 10')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--seed-only', action='store_true')
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--iterations', type=int, default=200, help='requests per scenario')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--cold', action='store_true', help='clear caches before every request')
+        parser.add_argument('--base-url', help='drive a running server over HTTP instead of the in-process client')
+        parser.add_argument('--concurrency', type=int, default=8, help='HTTP clients with --base-url')
+        parser.add_argument('--output', help='write JSON results to this file ("-" for stdout)')
+        parser.add_argument('--compare', help='JSON results of a previous run to diff against')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        if options['seed_products']:
+            elapsed = seed_catalogue(
+                options['seed_products'], options['categories'], options['tags'], options['orders'], options['seed'],
+                progress=self.progress if options['verbosity'] > 1 else None,
+            )
+            self.log(f"Seeded {options['seed_products']} products in {elapsed:.1f}s", options)
+        if options['seed_only']:
+            return
+
+        try:
+            data = BenchmarkData(random.Random(options['seed']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['base_url']:
+            results = run_http(
+                data, options['scenarios'], options['iterations'], options['base_url'], options['concurrency'], options['warmup']
+            )
+        else:
+            results = run_in_process(data, options['scenarios'], options['iterations'], options['warmup'], options['cold'])
+
+        report = {
+            'meta': metadata(
+                driver='http' if options['base_url'] else 'in-process',
+                concurrency=options['concurrency'] if options['base_url'] else 1,
+                iterations=options['iterations'],
+                cold=options['cold'],
+            ),
+            'scenarios': results,
+        }
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_table(results)
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8') as handle:
+                    json.dump(report, handle, indent=2)
+        if baseline is not None:
+            self.print_comparison(compare(baseline, report), baseline['meta'].get('commit'))
+
+    def log(self, message, options):
+        # Przy --output - komunikaty na stderr, żeby stdout był czystym JSON-em
+        (self.stderr if options['output'] == '-' else self.stdout).write(message)
+
+    def progress(self, kind, count):
+        self.stderr.write(f'  {count} {kind}')
+
+    def print_table(self, results):
+        self.stdout.write(f"{'scenario':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7} {'3xx':>5}")
+        for name, result in results.items():
+            latency = result['latency_ms'] or {}
+            queries = result['queries']['mean'] if result['queries'] else '-'
+            self.stdout.write(
+                f"{name:<14} {result['rps'] or 0:>8} {latency.get('p50', '-'):>8} {latency.get('p95', '-'):>8} "
+                f"{latency.get('p99', '-'):>8} {queries:>8} {result['errors']:>7} {result.get('redirects', 0):>5}"
+            )
+
+    def print_comparison(self, rows, commit):
+        self.stdout.write(f'\nChange against {commit or "baseline"}:')
+        for name, metric, old, new, change in rows:
+            change = f'{change:+.1f}%' if change is not None else '-'
+            self.stdout.write(f'{name:<14} {metric:<8} {old!s:>10} -> {new!s:>10} {change:>8}')
@@ -0,0 +1,50 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from shop.autocomplete import TrigramIndex
+from shop.benchmarks.catalogue import COLOURS, MATERIALS, ITEMS, STYLES, BRANDS, random_name, typo
+from shop.benchmarks.stats import percentile
+
+
+class Command(BaseCommand):
+    help = 'Measure autocomplete index build time and per-query latency on a synthetic catalogue (no database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'products':>10} {'build s':>8} {'terms':>9} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8}")
+        for size in options['sizes']:
+            rng = random.Random(options['seed'])
+            index = TrigramIndex()
+            started = time.perf_counter()
+            index.bulk_load(
+                ((product_id, random_name(rng), rng.choice(BRANDS)) for product_id in range(size)),
+                enumerate(STYLES + MATERIALS),
+            )
+            build_time = time.perf_counter() - started
+
+            vocabulary = COLOURS + MATERIALS + ITEMS + STYLES
+            queries = []
+            for _ in range(options['queries']):
+                word = rng.choice(vocabulary)
+                kind = rng.random()
+                if kind < 0.5:
+                    queries.append(word[:rng.randint(1, len(word))])
+                elif kind < 0.8:
+                    queries.append(f'{rng.choice(COLOURS)} {word[:rng.randint(1, len(word))]}')
+                else:
+                    queries.append(typo(rng, word))
+
+            latencies = []
+            for query in queries:
+                started = time.perf_counter_ns()
+                index.suggest(query)
+                latencies.append((time.perf_counter_ns() - started) / 1000)
+            latencies.sort()
+            self.stdout.write(
+                f'{size:>10} {build_time:>8.1f} {len(index):>9} '
+                f'{percentile(latencies, 0.5):>8.0f} {percentile(latencies, 0.95):>8.0f} {percentile(latencies, 0.99):>8.0f}'
+            )
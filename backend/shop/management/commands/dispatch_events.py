@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from shop.outbox import dispatch_events
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending order events from the outbox to SHOP_OUTBOX_SINKS now (normally done by run_worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        read, sent = dispatch_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Dispatched {read} events ({sent} after coalescing)'))
@@ -0,0 +1,49 @@
+import csv
+import json
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from shop.models import Product, Tag
+from shop.catalogue_io import FIELDS, TAG_SEPARATOR, detect_format, export_row, open_output
+
+
+class Command(BaseCommand):
+    help = 'Export products to a CSV or JSONL file (or - for stdout) in the format read by import_products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--active-only', action='store_true')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.select_related('category').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'slug'))
+        ).defer('search_document', 'search_vector').order_by('pk')
+        if options['active_only']:
+            queryset = queryset.active()
+
+        started = time.perf_counter()
+        fmt = detect_format(options['path'], options['format'])
+        total = 0
+        with open_output(options['path']) as handle:
+            if fmt == 'csv':
+                writer = csv.DictWriter(handle, fieldnames=FIELDS)
+                writer.writeheader()
+            # iterator(chunk_size) z prefetch: tagi dociągane dla każdej paczki, tabela nie trafia do pamięci
+            for product in queryset.iterator(chunk_size=options['chunk_size']):
+                row = export_row(product)
+                if fmt == 'csv':
+                    row['tags'] = TAG_SEPARATOR.join(row['tags'])
+                    row['is_active'] = 'true' if row['is_active'] else 'false'
+                    row['is_featured'] = 'true' if row['is_featured'] else 'false'
+                    writer.writerow(row)
+                else:
+                    handle.write(json.dumps(row, ensure_ascii=False) + '\n')
+                total += 1
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        # Przy eksporcie na stdout raport idzie na stderr, żeby nie mieszać go z danymi
+        output = self.stderr if options['path'] == '-' else self.stdout
+        output.write(f'Exported {total} products in {elapsed:.1f}s ({rate:.0f} rows/s)')
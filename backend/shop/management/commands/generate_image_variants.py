@@ -0,0 +1,72 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from shop.models import Product
+from shop.images import render_variants
+from shop.response_cache import invalidate_catalogue
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image variants (thumbnail/card/detail, WebP and JPEG) for existing products in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--force', action='store_true', help='Re-render products that already have variants')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.exclude(image='')
+        if not options['force']:
+            queryset = queryset.filter(image_variants={})
+        # Kilka produktów może wskazywać ten sam plik - renderujemy go raz
+        products_by_image = {}
+        for product_id, name in queryset.order_by('pk').values_list('pk', 'image').iterator(chunk_size=2000):
+            products_by_image.setdefault(name, []).append(product_id)
+
+        started = time.perf_counter()
+        done = failed = 0
+        pending = []
+        # Procesy, nie wątki: dekodowanie i skalowanie to praca CPU, a workery nie dotykają bazy
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            futures = {executor.submit(render_variants, name): name for name in products_by_image}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+                    continue
+                pending.extend((product_id, name, variants) for product_id in products_by_image[name])
+                done += 1
+                if len(pending) >= options['batch_size']:
+                    self.save(pending)
+                    pending = []
+        self.save(pending)
+        if done:
+            invalidate_catalogue()
+
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {done} images ({failed} failed) in {elapsed:.1f}s ({rate:.1f} images/s)'
+        ))
+
+    def save(self, pending):
+        if not pending:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            # Warunek na image jak w shop.images - nie nadpisujemy wariantów zdjęcia podmienionego w trakcie
+            current = dict(
+                Product.objects.select_for_update().filter(pk__in=[product_id for product_id, _, _ in pending])
+                .values_list('pk', 'image')
+            )
+            Product.objects.bulk_update([
+                Product(pk=product_id, image_variants=variants, updated_at=now)
+                for product_id, name, variants in pending
+                if current.get(product_id) == name
+            ], ['image_variants', 'updated_at'])
@@ -0,0 +1,187 @@
+import time
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from shop.models import Product, Category, Tag
+from shop.signals import SEARCH_FIELDS
+from shop.images import schedule_variants
+from shop.facets import rebuild_facet_counts
+from shop.catalogue_io import (
+    RowError, SlugAllocator, SlugCache, detect_format, open_input, parse_row, products_bulk_changed, read_rows,
+)
+
+ROW_FIELDS = (
+    'name', 'description', 'price', 'stock', 'condition', 'size',
+    'brand', 'material', 'image', 'is_active', 'is_featured',
+)
+Through = Product.tags.through
+
+
+class Command(BaseCommand):
+    help = 'Import products from a CSV or JSONL file (or - for stdin); rows with an existing slug update that product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-missing', action='store_true', help='Create unknown categories and tags from their slugs')
+        parser.add_argument('--max-errors', type=int, default=100, help='Abort after this many invalid rows')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        self.categories = SlugCache(Category, options['create_missing'])
+        self.tags = SlugCache(Tag, options['create_missing'])
+        self.slugs = SlugAllocator()
+        self.created = self.updated = self.unchanged = self.skipped = 0
+        self.max_errors = options['max_errors']
+        self.verbosity = options['verbosity']
+
+        started = time.perf_counter()
+        fmt = detect_format(options['path'], options['format'])
+        try:
+            with open_input(options['path']) as handle:
+                batch = []
+                for line_number, row in read_rows(handle, fmt):
+                    if len(batch) >= options['batch_size']:
+                        self.import_batch(batch)
+                        batch = []
+                        self.report(started, final=False)
+                    batch.append((line_number, row))
+                if batch:
+                    self.import_batch(batch)
+        finally:
+            # Liczniki facetów raz na cały import (także przerwany - wcześniejsze paczki są już zapisane)
+            if self.created or self.updated:
+                rebuild_facet_counts()
+        self.report(started, final=True)
+
+    def skip(self, line_number, error):
+        self.skipped += 1
+        self.stderr.write(f'line {line_number}: {error}')
+        if self.skipped > self.max_errors:
+            raise CommandError(f'Too many invalid rows ({self.skipped}), aborting')
+
+    def import_batch(self, batch):
+        rows = []
+        for line_number, row in batch:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                rows.append((line_number, parse_row(row)))
+            except RowError as exc:
+                self.skip(line_number, exc)
+
+        self.categories.resolve(row['category'] for _, row in rows)
+        self.tags.resolve(tag for _, row in rows for tag in row['tags'])
+        # Ostatni wiersz z danym slugiem wygrywa, tak jak przy kolejnych zapisach
+        existing = Product.objects.filter(slug__in={row['slug'] for _, row in rows if row['slug']}).in_bulk(field_name='slug')
+        self.slugs.reserve(existing)
+        current_tags = defaultdict(set)
+        for product_id, tag_id in Through.objects.filter(product_id__in=[p.pk for p in existing.values()]).values_list('product_id', 'tag_id'):
+            current_tags[product_id].add(tag_id)
+
+        to_create, tag_ids = [], {}
+        # pk -> (produkt, zmienione pola, czy zmieniły się tagi); niezmienione wiersze nie idą do bazy
+        to_update = {}
+        category_ids = set()
+        for line_number, row in rows:
+            try:
+                category_id = self.categories.get(row['category']) if row['category'] else None
+                row_tag_ids = list(dict.fromkeys(self.tags.get(tag) for tag in row['tags']))
+            except RowError as exc:
+                self.skip(line_number, exc)
+                continue
+            product = existing.get(row['slug']) if row['slug'] else None
+            if product is None or product.pk is None:
+                if product is None:
+                    product = Product(slug=row['slug'])
+                    to_create.append(product)
+                    if row['slug']:
+                        existing[row['slug']] = product
+                        self.slugs.reserve([row['slug']])
+                for field in ROW_FIELDS:
+                    setattr(product, field, row[field])
+                product.category_id = category_id
+                category_ids.add(category_id)
+                tag_ids[id(product)] = row_tag_ids
+                continue
+
+            changed = {field for field in ROW_FIELDS if self.current_value(product, field) != row[field]}
+            if product.category_id != category_id:
+                changed.add('category')
+                category_ids.update((product.category_id, category_id))
+            tags_changed = set(row_tag_ids) != current_tags[product.pk]
+            if not changed and not tags_changed:
+                if product.pk not in to_update:
+                    self.unchanged += 1
+                continue
+            for field in changed - {'category'}:
+                setattr(product, field, row[field])
+            product.category_id = category_id
+            current_tags[product.pk] = set(row_tag_ids)
+            tag_ids[id(product)] = row_tag_ids
+            _, previous_fields, previous_tags = to_update.get(product.pk, (product, set(), False))
+            to_update[product.pk] = (product, previous_fields | changed, previous_tags or tags_changed)
+            category_ids.add(product.category_id)
+
+        unslugged = [product for product in to_create if not product.slug]
+        for product, slug in zip(unslugged, self.slugs.allocate(product.name for product in unslugged)):
+            product.slug = slug
+
+        # bulk_update ustawia tylko pola, które faktycznie zmieniły się w tej paczce (+ updated_at dla cache'u)
+        now = timezone.now()
+        update_fields = set()
+        for product, changed, _ in to_update.values():
+            product.updated_at = now
+            if 'image' in changed:
+                product.image_variants = {}
+                changed.add('image_variants')
+            update_fields |= changed
+        retagged = [product for product, _, tags_changed in to_update.values() if tags_changed]
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create, batch_size=len(to_create) or None)
+            if to_update:
+                Product.objects.bulk_update(
+                    [product for product, _, _ in to_update.values()], sorted(update_fields) + ['updated_at'], batch_size=500
+                )
+            # Tagi: podmiana całego zestawu tylko tam, gdzie się zmienił, jeden INSERT dla wszystkich
+            Through.objects.filter(product_id__in=[product.pk for product in retagged]).delete()
+            Through.objects.bulk_create([
+                Through(product_id=product.pk, tag_id=tag_id)
+                for product in to_create + retagged
+                for tag_id in tag_ids[id(product)]
+            ], ignore_conflicts=True)
+
+        reindex = [product.pk for product in to_create] + [
+            pk for pk, (_, changed, tags_changed) in to_update.items() if tags_changed or changed & SEARCH_FIELDS
+        ]
+        products_bulk_changed([product.pk for product in to_create] + list(to_update), category_ids, reindex)
+        # Warianty zdjęć jak przy zwykłym zapisie - w tle; dla dużych wsadów szybszy jest generate_image_variants
+        for product in to_create:
+            if product.image:
+                schedule_variants(product.pk)
+        for product_id, (product, changed, _) in to_update.items():
+            if 'image' in changed and product.image:
+                schedule_variants(product_id)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    def current_value(self, product, field):
+        value = getattr(product, field)
+        return value.name or '' if field == 'image' else value
+
+    def report(self, started, final):
+        elapsed = time.perf_counter() - started
+        processed = self.created + self.updated + self.unchanged + self.skipped
+        rate = processed / elapsed if elapsed else 0
+        message = (
+            f'{processed} rows: {self.created} created, {self.updated} updated, '
+            f'{self.unchanged} unchanged, {self.skipped} skipped '
+            f'in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(message))
+        elif self.verbosity >= 2:
+            self.stdout.write(message)
@@ -0,0 +1,124 @@
+import http.client
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from shop.benchmarks.stats import percentile
+
+
+def run_client(url, deadline, headers, latencies, errors, redirects):
+    # Jedno połączenie keep-alive na klienta, jak przeglądarka albo frontend Next.js
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.netloc, timeout=30)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            connection.close()
+            continue
+        if 200 <= response.status < 300:
+            latencies.append((time.perf_counter() - started) * 1000)
+        elif 300 <= response.status < 400:
+            # Przekierowanie (np. SECURE_SSL_REDIRECT) nie jest obsłużonym żądaniem - osobno w raporcie
+            redirects.append(response.status)
+        else:
+            errors.append(response.status)
+        if response.getheader('Connection', '').lower() == 'close':
+            connection.close()
+    connection.close()
+
+
+def run_slow_clients(url, count, deadline, interval=1.0):
+    # Wolni klienci (słabe łącze mobilne, slowloris): nagłówki po jednej linii co sekundę, żądanie
+    # nigdy się nie kończy. Worker wątkowy trzyma na każdym wątek, pętla zdarzeń tylko socket
+    parts = urlsplit(url)
+    host, _, port = parts.netloc.partition(':')
+    sockets = []
+    for _ in range(count):
+        try:
+            client = socket.create_connection((host, int(port or 80)), timeout=5)
+            client.sendall(f'GET {parts.path or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\n'.encode('ascii'))
+            sockets.append(client)
+        except OSError:
+            break
+    while time.perf_counter() < deadline:
+        time.sleep(interval)
+        for client in list(sockets):
+            try:
+                client.sendall(b'X-Slow: 1\r\n')
+            except OSError:
+                sockets.remove(client)
+    for client in sockets:
+        client.close()
+    return len(sockets)
+
+
+class Command(BaseCommand):
+    help = 'Hammer a running server with concurrent keep-alive GET requests and report requests/sec and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='e.g. http://127.0.0.1:8000/api/products/')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+        parser.add_argument('--warmup', type=float, default=2.0, help='seconds, not counted')
+        parser.add_argument('--header', action='append', default=[], help='"Name: value", repeatable')
+        parser.add_argument('--slow-clients', type=int, default=0, help='extra connections that never finish their request')
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            if not value:
+                raise CommandError(f'Invalid header {header!r}, expected "Name: value"')
+            headers[name.strip()] = value.strip()
+
+        slow = None
+        if options['slow_clients']:
+            slow_deadline = time.perf_counter() + options['warmup'] + options['duration']
+            slow = threading.Thread(target=run_slow_clients, args=(options['url'], options['slow_clients'], slow_deadline), daemon=True)
+            slow.start()
+
+        results = {}
+        for phase, duration in (('warmup', options['warmup']), ('measure', options['duration'])):
+            if duration <= 0:
+                continue
+            latencies, errors, redirects = [], [], []
+            deadline = time.perf_counter() + duration
+            clients = [
+                threading.Thread(target=run_client, args=(options['url'], deadline, headers, latencies, errors, redirects))
+                for _ in range(options['concurrency'])
+            ]
+            started = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            results[phase] = (latencies, errors, redirects, time.perf_counter() - started)
+
+        if slow is not None:
+            slow.join()
+        if 'measure' not in results:
+            raise CommandError('--duration must be positive')
+        latencies, errors, redirects, elapsed = results['measure']
+        if not latencies:
+            raise CommandError(
+                f'No successful requests ({len(errors)} errors: {sorted(set(map(str, errors)))}, '
+                f'{len(redirects)} redirects: {sorted(set(map(str, redirects)))})'
+            )
+        latencies.sort()
+        clients = f"{options['concurrency']} clients" + (f" (+{options['slow_clients']} slow)" if options['slow_clients'] else '')
+        failures = f' ({", ".join(sorted(set(map(str, errors))))})' if errors else ''
+        if redirects:
+            failures += f', {len(redirects)} redirects ({", ".join(sorted(set(map(str, redirects))))})'
+        self.stdout.write(
+            f'{len(latencies)} requests in {elapsed:.1f}s with {clients}: {len(latencies) / elapsed:.1f} req/s, '
+            f'p50 {percentile(latencies, 0.5):.1f} ms, p95 {percentile(latencies, 0.95):.1f} ms, '
+            f'p99 {percentile(latencies, 0.99):.1f} ms, {len(errors)} errors{failures}'
+        )
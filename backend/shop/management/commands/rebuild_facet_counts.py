@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from shop.facets import rebuild_facet_counts, stored_facets
+
+
+class Command(BaseCommand):
+    help = 'Recount the facet table behind /api/products/facets/ (after raw SQL or bulk changes that skip signals)'
+
+    def handle(self, *args, **options):
+        before = stored_facets()
+        after = rebuild_facet_counts()
+        drift = sum(1 for key in before.keys() | after.keys() if before.get(key, 0) != after.get(key, 0))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(after)} facet counts ({drift} differed from the stored ones)'))
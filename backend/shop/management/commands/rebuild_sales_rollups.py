@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from shop.analytics import REBUILD_CHUNK_DAYS, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the sales rollups behind /api/analytics/ from order history, one window of days per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=REBUILD_CHUNK_DAYS)
+
+    def handle(self, *args, **options):
+        def progress(start, end, buckets):
+            self.stdout.write(f'{start:%Y-%m-%d} - {end:%Y-%m-%d}: {buckets} buckets')
+
+        windows = rebuild_sales_rollups(max(options['chunk_days'], 1), progress)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups in {windows} windows'))
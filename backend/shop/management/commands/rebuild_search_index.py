@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from shop.models import Product
+from shop.search import update_search_documents, reset_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized product search documents (and tsvectors on PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, total = [], 0
+        for product_id in Product.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size):
+            batch.append(product_id)
+            if len(batch) >= batch_size:
+                update_search_documents(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            update_search_documents(batch)
+            total += len(batch)
+        reset_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search documents for {total} products'))
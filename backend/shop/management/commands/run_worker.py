@@ -0,0 +1,59 @@
+import multiprocessing
+import signal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from shop.tasks import Worker
+
+
+def run_process(threads, poll_interval, burst):
+    # Proces potomny: własny Worker i własne połączenie z bazą (rodzic zamyka swoje przed fork)
+    worker = Worker(threads=threads, poll_interval=poll_interval, burst=burst)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the shop job queue (order emails and other post-checkout work)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'SHOP_WORKER_THREADS', 4),
+                            help='Tasks executed concurrently by each process (I/O-bound work: SMTP, HTTP)')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes, for CPU-bound tasks; jobs are claimed with SKIP LOCKED on Postgres')
+        parser.add_argument('--poll-interval', type=float, default=getattr(settings, 'SHOP_TASKS_POLL_INTERVAL', 1.0))
+        parser.add_argument('--burst', action='store_true', help='Exit once no tasks are due (cron, CI)')
+
+    def handle(self, *args, **options):
+        threads, processes = max(options['threads'], 1), max(options['processes'], 1)
+        self.stdout.write(f'Worker started: {processes} process(es) x {threads} thread(s)')
+        if processes == 1:
+            worker = Worker(threads=threads, poll_interval=options['poll_interval'], burst=options['burst'])
+            signal.signal(signal.SIGTERM, worker.stop)
+            signal.signal(signal.SIGINT, worker.stop)
+            processed, failed = worker.run()
+            self.stdout.write(self.style.SUCCESS(f'Worker stopped: {processed} tasks run, {failed} failed'))
+            return
+
+        # fork nie może dziedziczyć otwartego połączenia - każdy proces otworzy swoje
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=run_process, args=(threads, options['poll_interval'], options['burst']))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop_children(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, stop_children)
+        # Ctrl+C trafia do całej grupy procesów - dzieci same kończą pobrane zadania
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.10 on 2026-10-17 19:51
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def build_search_documents(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    products = Product.objects.select_related('category').prefetch_related('tags')
+    for product in products.iterator(chunk_size=500):
+        parts = [
+            product.brand,
+            product.material,
+            product.category.name if product.category_id else '',
+            ' '.join(tag.name for tag in product.tags.all()),
+            product.description,
+        ]
+        product.search_document = ' '.join(part for part in parts if part)
+        product.save(update_fields=['search_document'])
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE shop_product SET search_vector = "
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(search_document, '')), 'B')"
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS shop_product_search_vector_gin '
+            'ON shop_product USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS shop_product_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_catalogue_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Indeks GIN tylko na PostgreSQL - na SQLite wyszukiwanie idzie przez indeks w pamięci
+        migrations.RunPython(build_search_documents, drop_search_index),
+    ]
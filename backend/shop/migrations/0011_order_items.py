@@ -0,0 +1,75 @@
+# Generated by Django 4.2.10 on 2026-10-17 20:18
+
+from decimal import Decimal, InvalidOperation
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_items_to_table(apps, schema_editor):
+    Order = apps.get_model('shop', 'Order')
+    OrderItem = apps.get_model('shop', 'OrderItem')
+    Product = apps.get_model('shop', 'Product')
+    product_prices = dict(Product.objects.values_list('id', 'price'))
+
+    batch = []
+    for order_id, items in Order.objects.values_list('id', 'items').iterator(chunk_size=1000):
+        for item in items or []:
+            # Starsze zamówienia zapisywały produkt jako 'id' zamiast 'product_id'
+            product_id = item.get('product_id', item.get('id'))
+            try:
+                unit_price = Decimal(str(item['price']))
+            except (KeyError, InvalidOperation):
+                unit_price = product_prices.get(product_id, Decimal('0.00'))
+            batch.append(OrderItem(
+                order_id=order_id,
+                product_id=product_id if product_id in product_prices else None,
+                quantity=max(int(item.get('quantity', 0)), 0),
+                unit_price=unit_price,
+            ))
+        if len(batch) >= 1000:
+            OrderItem.objects.bulk_create(batch)
+            batch = []
+    OrderItem.objects.bulk_create(batch)
+
+
+def copy_items_to_json(apps, schema_editor):
+    Order = apps.get_model('shop', 'Order')
+    OrderItem = apps.get_model('shop', 'OrderItem')
+    items = {}
+    for order_id, product_id, quantity, unit_price in OrderItem.objects.order_by('id').values_list(
+        'order_id', 'product_id', 'quantity', 'unit_price'
+    ).iterator(chunk_size=1000):
+        items.setdefault(order_id, []).append(
+            {'product_id': product_id, 'quantity': quantity, 'price': str(unit_price)}
+        )
+    for order_id, order_items in items.items():
+        Order.objects.filter(pk=order_id).update(items=order_items)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='shop.order')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='shop.product')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['product', 'order'], name='shop_orderi_product_573aed_idx')],
+            },
+        ),
+        migrations.RunPython(copy_items_to_table, copy_items_to_json),
+        migrations.RemoveField(
+            model_name='order',
+            name='items',
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.10 on 2026-10-17 21:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_products(apps, schema_editor):
+    # Ten sam stan, co shop.facets.rebuild_facet_counts, na modelach historycznych
+    Product = apps.get_model('shop', 'Product')
+    FacetCount = apps.get_model('shop', 'FacetCount')
+    active = Product.objects.filter(is_active=True).order_by()
+    rows = [FacetCount(facet='total', value='', count=active.count())]
+    for field, facet in (('condition', 'condition'), ('size', 'size'), ('category', 'category'), ('brand', 'brand'), ('tags', 'tags')):
+        grouped = active.exclude(**{f'{field}__isnull': True}).values(field).annotate(n=Count('pk', distinct=True))
+        rows += [FacetCount(facet=facet, value=str(row[field]), count=row['n']) for row in grouped if row[field] != '']
+    FacetCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(count_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.10 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    # Jak shop.category_tree.rebuild_category_paths, na modelach historycznych
+    Category = apps.get_model('shop', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def resolve(pk, visiting=()):
+        if pk not in paths:
+            parent_id = parents[pk]
+            parent_path = '' if parent_id is None or parent_id in visiting else resolve(parent_id, visiting + (pk,))
+            paths[pk] = f'{parent_path}{pk:07d}/'
+        return paths[pk]
+
+    for pk in parents:
+        resolve(pk)
+    Category.objects.bulk_update(
+        [Category(pk=pk, path=path, depth=path.count('/') - 1) for pk, path in paths.items()], ['path', 'depth'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_facet_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,43 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.db.models import Index
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 from django.utils.text import slugify
+from .pricing import order_total
+
+# Ścieżka kategorii to id przodków i jej własne, każde na stałej liczbie cyfr: '0000003/0000012/'.
+# Porządek napisów = porządek drzewa, a poddrzewo to przedział [path, path + '~') na zwykłym indeksie B-tree
+CATEGORY_PATH_DIGITS = 7
+CATEGORY_PATH_END = '~'
+
+
+def category_path(parent_path, pk):
+    return f'{parent_path}{pk:0{CATEGORY_PATH_DIGITS}d}/'
+
+
+class CategoryQuerySet(models.QuerySet):
+    def with_products_count(self):
+        return self.annotate(products_count=models.Count('products'))
+
+    def subtree(self, path):
+        # Kategoria o tej ścieżce i wszystkie jej podkategorie - jeden przedział na indeksie path
+        return self.filter(path__gte=path, path__lt=path + CATEGORY_PATH_END)
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
+    # Utrzymywane w save() (i przy usunięciu rodzica w shop.signals), nie edytujemy ręcznie
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
@@ -20,7 +48,32 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        # Ścieżki z bazy, nie z obiektu w pamięci - przodek mógł zostać przeniesiony w międzyczasie
+        paths = dict(Category.objects.filter(pk__in=[self.pk, self.parent_id]).values_list('pk', 'path'))
+        previous = paths.get(self.pk, '')
+        parent_path = paths.get(self.parent_id, '') if self.parent_id is not None else ''
+        if previous and parent_path.startswith(previous):
+            raise ValueError('A category cannot be moved under itself or one of its subcategories')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            path = category_path(parent_path, self.pk)
+            if path != previous:
+                self.move_subtree(previous, path)
+
+    def move_subtree(self, previous, path):
+        depth = path.count('/') - 1
+        Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+        if previous:
+            # Potomkowie: podmiana prefiksu ścieżki jednym UPDATE
+            Category.objects.subtree(previous).exclude(pk=self.pk).update(
+                path=Concat(models.Value(path), Substr('path', len(previous) + 1)),
+                depth=models.F('depth') + depth - (previous.count('/') - 1),
+            )
+        self.path, self.depth = path, depth
+
+    def get_ancestor_ids(self):
+        # Od korzenia do rodzica, prosto ze ścieżki - bez zapytań
+        return [int(segment) for segment in self.path.split('/')[:-2]]
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -34,6 +87,24 @@ class Tag(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+class ProductQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+    def with_related(self):
+        # Kategoria przez JOIN, tagi jednym dodatkowym zapytaniem dla całej strony
+        return self.select_related('category').prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.only('id', 'name', 'slug'))
+        )
+
+    def in_category_tree(self, path):
+        # category_id IN (SELECT id ... WHERE path w przedziale) - indeks path i (category, is_active)
+        return self.filter(category__in=Category.objects.subtree(path).values('pk'))
+
+    def for_listing(self):
+        # Kolumny wyszukiwarki są potrzebne tylko przy zapisie i w WHERE
+        return self.active().with_related().defer('search_document', 'search_vector')
+
 class Product(models.Model):
     CONDITION_CHOICES = (
         ('new', 'New'),
@@ -67,6 +138,13 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, db_index=True)
     is_featured = models.BooleanField(default=False)
+    # Utrzymywane przez shop.search (sygnały), nie edytujemy ręcznie
+    search_document = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Ścieżki wariantów zdjęcia (shop.images), uzupełniane w tle po zapisie
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         indexes = [
@@ -85,6 +163,39 @@ class Product(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+class FacetCount(models.Model):
+    # Liczba aktywnych produktów na wartość faceta bez filtrów - utrzymywana przez sygnały (shop.facets)
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+
+    def __str__(self):
+        return f'{self.facet}={self.value}: {self.count}'
+
+class IdempotencyKey(models.Model):
+    # Klucz Idempotency-Key klienta -> zapisana odpowiedź (shop.idempotency); status_code=NULL = w trakcie
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope}:{self.key}'
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -114,7 +225,6 @@ class Order(models.Model):
     city = models.CharField(max_length=100)
     postal_code = models.CharField(max_length=20)
     country = models.CharField(max_length=100)
-    items = models.JSONField(default=list)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     status = models.CharField(
         max_length=20,
@@ -157,10 +267,127 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.id} - {self.name}"
 
-    def save(self, *args, **kwargs):
-        if not self.total_amount and self.items:
-            # Oblicz total_amount na podstawie items
-            self.total_amount = sum(
-                float(item.get('price', 0)) * item.get('quantity', 0)
-                for item in self.items
-            ) + float(self.shipping_cost)
\ No newline at end of file
+    def update_total(self):
+        # Suma liczona dokładnie w Decimal (shop.pricing) - SUM na DecimalField w SQLite idzie przez float
+        lines = OrderItem.objects.filter(order=self).order_by().values_list('quantity', 'unit_price')
+        self.total_amount = order_total(lines, self.shipping_cost)
+        Order.objects.filter(pk=self.pk).update(total_amount=self.total_amount)
+        return self.total_amount
+
+class OrderItemQuerySet(models.QuerySet):
+    def sales_by_product(self):
+        return self.values('product').annotate(
+            units=models.Sum('quantity'),
+            revenue=models.Sum(LINE_TOTAL),
+            orders=models.Count('order', distinct=True),
+        ).order_by('-revenue')
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
+    # Historia sprzedaży zostaje nawet po usunięciu produktu
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    objects = OrderItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'order']),
+        ]
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} (order {self.order_id})"
+
+LINE_TOTAL = models.ExpressionWrapper(
+    models.F('quantity') * models.F('unit_price'),
+    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+class Job(models.Model):
+    # Zadanie w tle (shop.tasks): udane są usuwane, w tabeli zostają kolejka, trwające i martwe (failed)
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Worker pyta tylko o (status, run_at) - martwe zadania nie puchną indeksu kolejki
+            models.Index(fields=['run_at'], condition=models.Q(status='queued'), name='job_queue_idx'),
+            models.Index(fields=['locked_until'], condition=models.Q(status='running'), name='job_running_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+
+class OrderEvent(models.Model):
+    # Outbox (shop.outbox): zdarzenie zapisane w transakcji zmiany zamówienia, wysyłane później w paczkach
+    order_id = models.BigIntegerField(db_index=True)
+    event = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.event} order {self.order_id} #{self.pk}'
+
+
+class SalesRollup(models.Model):
+    # Sprzedaż w godzinie/dniu (shop.analytics): utrzymywana przyrostowo przy zamówieniach, anulowane nie wchodzą
+    PERIOD_CHOICES = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    )
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    # Początek godziny albo północ dnia w strefie SHOP_ANALYTICS_TIME_ZONE
+    bucket = models.DateTimeField()
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'bucket'], name='unique_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f'{self.period} {self.bucket:%Y-%m-%d %H:%M}'
+
+
+class ProductSalesRollup(models.Model):
+    # Dzienna sprzedaż produktu; product_id=0 to produkty już usunięte, kategoria z chwili sprzedaży
+    bucket = models.DateTimeField()
+    product_id = models.BigIntegerField()
+    category_id = models.BigIntegerField(null=True)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'product_id'], name='unique_product_sales_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket', 'category_id']),
+        ]
+
+    def __str__(self):
+        return f'product {self.product_id} {self.bucket:%Y-%m-%d}'
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from .models import Order
+from .tasks import task, enqueue
+
+# Serwery pocztowe bywają chwilowo niedostępne - więcej prób niż domyślnie, backoff sięga godziny
+MAIL_ATTEMPTS = 8
+
+
+def order_summary(order):
+    lines = [
+        f'{item.quantity} x {item.product.name if item.product else "Product no longer available"} - {item.unit_price}'
+        for item in order.order_items.all()
+    ]
+    lines.append(f'Shipping: {order.shipping_cost}')
+    lines.append(f'Total: {order.total_amount}')
+    return '\n'.join(lines)
+
+
+@task(name='orders.send_confirmation', max_attempts=MAIL_ATTEMPTS)
+def send_order_confirmation(order_id):
+    order = Order.objects.prefetch_related('order_items__product').filter(pk=order_id).first()
+    if order is None:
+        return
+    send_mail(
+        f'Loopstore order #{order.pk} confirmed',
+        f'Hi {order.name},\n\nthank you for your order.\n\n{order_summary(order)}\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [order.email],
+    )
+
+
+@task(name='orders.send_status_update', max_attempts=MAIL_ATTEMPTS)
+def send_order_status_update(order_id, status):
+    order = Order.objects.filter(pk=order_id).first()
+    # Kilka zmian statusu pod rząd - mail tylko o tej, która nadal obowiązuje
+    if order is None or order.status != status:
+        return
+    send_mail(
+        f'Loopstore order #{order.pk} is {order.get_status_display().lower()}',
+        f'Hi {order.name},\n\nyour order #{order.pk} is now {order.get_status_display().lower()}.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [order.email],
+    )
+
+
+def order_created(order):
+    enqueue(send_order_confirmation, order_id=order.pk)
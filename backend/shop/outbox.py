@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+import logging
+import urllib.request
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job, OrderEvent
+from .notifications import send_order_status_update
+from .tasks import task, enqueue
+
+logger = logging.getLogger('shop')
+event_logger = logging.getLogger('shop.events')
+
+STATUS_CHANGED = 'order.status_changed'
+DISPATCH_TASK = 'outbox.dispatch'
+SIGNATURE_HEADER = 'X-Loopstore-Signature'
+
+
+def status_event(order, previous_status, previous_shipping_status=None):
+    return OrderEvent(
+        order_id=order.pk,
+        event=STATUS_CHANGED,
+        payload={
+            'order_id': order.pk,
+            'previous_status': previous_status,
+            'status': order.status,
+            'previous_shipping_status': previous_shipping_status or order.shipping_status,
+            'shipping_status': order.shipping_status,
+            'payment_status': order.payment_status,
+            'tracking_number': order.tracking_number,
+            'changed_at': timezone.now(),
+        },
+    )
+
+
+def status_changed(payload):
+    return (payload['status'], payload['shipping_status']) != (payload['previous_status'], payload['previous_shipping_status'])
+
+
+def record_events(events):
+    # Wołać w transakcji zmiany: zdarzenie istnieje wtedy i tylko wtedy, gdy zmiana weszła do bazy
+    events = [event for event in events if status_changed(event.payload)]
+    if not events:
+        return []
+    events = OrderEvent.objects.bulk_create(events)
+    schedule_dispatch()
+    return events
+
+
+def record_status_change(order, previous_status, previous_shipping_status=None):
+    record_events([status_event(order, previous_status, previous_shipping_status)])
+
+
+def schedule_dispatch():
+    # Jedno zadanie wysyłki na okno SHOP_OUTBOX_DELAY - kolejne zmiany w tym czasie jadą tą samą paczką
+    # i szybkie zmiany tego samego zamówienia zlewają się w jedno zdarzenie
+    if not Job.objects.filter(name=DISPATCH_TASK, status='queued').exists():
+        enqueue(dispatch_events, countdown=getattr(settings, 'SHOP_OUTBOX_DELAY', 2))
+
+
+def coalesce(events):
+    # Kilka zmian statusu jednego zamówienia w paczce -> jedno zdarzenie: stan z ostatniego,
+    # previous_* z pierwszego; powrót do stanu wyjściowego znika w całości
+    merged = {}
+    for event in events:
+        payload = dict(event.payload, event_id=event.pk, event=event.event)
+        payload.setdefault('previous_shipping_status', payload['shipping_status'])
+        if event.order_id in merged:
+            first = merged[event.order_id]
+            payload['previous_status'], payload['previous_shipping_status'] = first['previous_status'], first['previous_shipping_status']
+        merged[event.order_id] = payload
+    return [payload for payload in merged.values() if status_changed(payload)]
+
+
+class LogSink:
+    def deliver(self, events):
+        for event in events:
+            event_logger.info(
+                '%s order=%s %s -> %s (shipping %s -> %s)', event['event'], event['order_id'], event['previous_status'],
+                event['status'], event['previous_shipping_status'], event['shipping_status'],
+            )
+
+
+class FileSink:
+    # JSON Lines - podgląd zdarzeń w dev albo wejście dla zewnętrznego shippera logów
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'SHOP_OUTBOX_FILE', 'order-events.jsonl')
+
+    def deliver(self, events):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            for event in events:
+                file.write(json.dumps(event, cls=DjangoJSONEncoder) + '\n')
+
+
+class WebhookSink:
+    # Cała paczka jednym POST-em, podpisana HMAC-SHA256 treści; błąd HTTP = ponowienie całej paczki
+    def __init__(self, url=None, secret=None, timeout=5):
+        self.url = url or settings.SHOP_OUTBOX_WEBHOOK_URL
+        self.secret = secret if secret is not None else getattr(settings, 'SHOP_OUTBOX_WEBHOOK_SECRET', '')
+        self.timeout = timeout
+
+    def deliver(self, events):
+        body = json.dumps({'events': events}, cls=DjangoJSONEncoder).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            digest = hmac.new(self.secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            headers[SIGNATURE_HEADER] = f'sha256={digest}'
+        request = urllib.request.Request(self.url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class StatusEmailSink:
+    # Mail do klienta idzie przez kolejkę zadań - po scaleniu, więc seria zmian to jeden mail
+    def deliver(self, events):
+        for event in events:
+            if event['status'] != event['previous_status']:
+                enqueue(send_order_status_update, order_id=event['order_id'], status=event['status'])
+
+
+def get_sinks():
+    return [import_string(path)() for path in getattr(settings, 'SHOP_OUTBOX_SINKS', ['shop.outbox.LogSink'])]
+
+
+def dispatch_batch(sinks, batch_size):
+    # Paczka zablokowana do końca wysyłki; drugi dispatcher na Postgresie bierze kolejne wiersze (SKIP LOCKED)
+    with transaction.atomic():
+        pending = OrderEvent.objects.order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending[:batch_size])
+        if not events:
+            return 0, 0
+        # Późniejsze zdarzenia tych samych zamówień dołączają do paczki - zaległość scala się tak samo jak seria
+        events += pending.filter(order_id__in={event.order_id for event in events}, pk__gt=events[-1].pk)
+        delivered = coalesce(events)
+        if delivered:
+            for sink in sinks:
+                sink.deliver(delivered)
+        OrderEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+    return len(events), len(delivered)
+
+
+@task(name=DISPATCH_TASK, max_attempts=20)
+def dispatch_events(batch_size=None):
+    # Wyjątek ujścia zostawia zdarzenia w outboxie - zadanie ponowi całą paczkę z backoffem
+    batch_size = batch_size or getattr(settings, 'SHOP_OUTBOX_BATCH_SIZE', 500)
+    sinks = get_sinks()
+    read = sent = 0
+    while True:
+        batch_read, batch_sent = dispatch_batch(sinks, batch_size)
+        if not batch_read:
+            break
+        read, sent = read + batch_read, sent + batch_sent
+    if read:
+        logger.debug('Dispatched %s order events (%s after coalescing)', read, sent)
+    return read, sent
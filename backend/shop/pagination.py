@@ -0,0 +1,198 @@
+import base64
+import json
+from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound # type: ignore
+from rest_framework.filters import OrderingFilter # type: ignore
+from rest_framework.pagination import BasePagination # type: ignore
+from rest_framework.response import Response # type: ignore
+from rest_framework.utils.urls import remove_query_param, replace_query_param # type: ignore
+
+
+class SizedPagination(BasePagination):
+    page_size_query_param = 'page_size'
+    page_size = 24
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+
+class KeysetPagination(SizedPagination):
+    # Paginacja po (pole sortowania, id) - kolejne strony to WHERE po indeksie zamiast OFFSET
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Dla widoków async (shop.async_views): ten sam kursor, wiersze przez aiterator() -
+        # bez prefetch_related, którego aiterator() w Django 4.2 nie obsługuje
+        return self.set_page([instance async for instance in self.page_queryset(queryset, request, view).aiterator()])
+
+    def page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+
+        self.cursor = cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(cursor and cursor.get('r'))
+        queryset = queryset.order_by(*self.get_order_by(reverse=self.reverse))
+        if cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(cursor['v'], cursor['id'], self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        cursor = self.cursor
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        # Przy cofaniu się "więcej" oznacza poprzednią stronę, a następna zawsze istnieje
+        self.has_next = has_more if not self.reverse else cursor is not None
+        self.has_previous = cursor is not None if not self.reverse else has_more
+        return results
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering[0] if ordering else self.ordering
+        field = ordering.lstrip('-')
+        if field == 'pk':
+            field = 'id'
+        return field, ordering.startswith('-')
+
+    def get_order_by(self, reverse=False):
+        descending = self.descending != reverse
+        # NULL-e zawsze na końcu w kierunku "do przodu" - tak samo na SQLite i PostgreSQL
+        if descending:
+            primary = F(self.field).desc(nulls_last=not reverse, nulls_first=reverse)
+        else:
+            primary = F(self.field).asc(nulls_last=not reverse, nulls_first=reverse)
+        if self.field == 'id':
+            return [primary]
+        return [primary, '-id' if descending else 'id']
+
+    def get_keyset_filter(self, value, pk, reverse):
+        after = 'lt' if self.descending != reverse else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{after}': pk})
+        tie = Q(**{self.field: value, f'id__{after}': pk})
+        if value is None:
+            if reverse:
+                return Q(**{f'{self.field}__isnull': False}) | Q(**{f'{self.field}__isnull': True, f'id__{after}': pk})
+            return Q(**{f'{self.field}__isnull': True, f'id__{after}': pk})
+        if reverse:
+            return Q(**{f'{self.field}__{after}': value}) | tie
+        return Q(**{f'{self.field}__{after}': value}) | tie | Q(**{f'{self.field}__isnull': True})
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(cursor, dict) or 'v' not in cursor or 'id' not in cursor:
+                raise ValueError
+            # Poprawny base64/JSON z wartością nie do porównania (np. "abc" dla ceny) to też zły kursor, nie 500
+            cursor['id'] = model._meta.pk.to_python(cursor['id'])
+            if cursor['v'] is not None:
+                cursor['v'] = model._meta.get_field(self.field).to_python(cursor['v'])
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.field)
+        if value is not None and not isinstance(value, (str, int)):
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        cursor = {'v': value, 'id': instance.pk}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class SearchPagination(SizedPagination):
+    # Wyniki posortowane po trafności nie mają stabilnego klucza - numer strony, bez COUNT(*)
+    page_query_param = 'page'
+    max_page = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound('Invalid page')
+        if not 1 <= self.page_number <= self.max_page:
+            raise NotFound('Invalid page')
+
+        offset = (self.page_number - 1) * self.page_size
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size and self.page_number < self.max_page
+        return results[:self.page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        if self.page_number == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.page_number - 1)
+
+
+class ProductPagination(KeysetPagination):
+    ordering = '-created_at'
+
+
+class OrderPagination(KeysetPagination):
+    ordering = '-created_at'
@@ -0,0 +1,105 @@
+import decimal
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+
+try:
+    import numpy as np
+except ImportError:  # numpy przychodzi z scipy; bez niego sumy liczy pętla w Pythonie
+    np = None
+
+CENT = Decimal('0.01')
+AUDIT_CHUNK_SIZE = 1000
+
+
+def rounding():
+    # Nazwa trybu z modułu decimal, np. ROUND_HALF_UP (domyślnie) albo ROUND_HALF_EVEN
+    return getattr(decimal, getattr(settings, 'SHOP_PRICE_ROUNDING', 'ROUND_HALF_UP'))
+
+
+def to_decimal(value):
+    # float przez repr - 19.99 zostaje 19.99, a nie 19.989999999999998436805981327779591083526611328125
+    return Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+
+
+def money(value):
+    return to_decimal(value).quantize(CENT, rounding=rounding())
+
+
+def line_total(unit_price, quantity):
+    return money(unit_price) * quantity
+
+
+def order_total(lines, shipping_cost=0):
+    # lines: pary (ilość, cena jednostkowa)
+    return sum((line_total(unit_price, quantity) for quantity, unit_price in lines), money(shipping_cost))
+
+
+def to_cents(value):
+    return int(money(value).scaleb(2))
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def totals_in_cents(order_index, quantities, unit_cents, shipping_cents):
+    # Sumy wielu zamówień naraz na liczbach całkowitych groszy: linia i trafia do zamówienia order_index[i],
+    # shipping_cents ma po jednej pozycji na zamówienie
+    if np is None:
+        totals = list(shipping_cents)
+        for index, quantity, cents in zip(order_index, quantities, unit_cents):
+            totals[index] += quantity * cents
+        return totals
+    totals = np.array(shipping_cents, dtype=np.int64)
+    np.add.at(
+        totals, np.asarray(order_index, dtype=np.intp),
+        np.asarray(quantities, dtype=np.int64) * np.asarray(unit_cents, dtype=np.int64),
+    )
+    return totals.tolist()
+
+
+def expected_totals(orders):
+    # orders: [(id, shipping_cost)] -> {id: suma z pozycji + dostawa}; pozycje jednym zapytaniem
+    from .models import OrderItem
+    positions = {pk: index for index, (pk, _) in enumerate(orders)}
+    order_index, quantities, unit_cents = [], [], []
+    items = OrderItem.objects.filter(order_id__in=list(positions)).order_by().values_list('order_id', 'quantity', 'unit_price')
+    for order_id, quantity, unit_price in items.iterator(chunk_size=5000):
+        order_index.append(positions[order_id])
+        quantities.append(quantity)
+        unit_cents.append(to_cents(unit_price))
+    totals = totals_in_cents(order_index, quantities, unit_cents, [to_cents(shipping) for _, shipping in orders])
+    return {pk: from_cents(cents) for (pk, _), cents in zip(orders, totals)}
+
+
+def audit_order_totals(queryset=None, chunk_size=AUDIT_CHUNK_SIZE, fix=False, progress=None):
+    # Przegląd total_amount paczkami po id (keyset, bez OFFSET); z fix=True błędne sumy są poprawiane
+    # bulk_update-em w transakcji paczki, razem z rollupami sprzedaży. Zwraca [(id, zapisana, poprawna)]
+    from .models import Order
+    from .analytics import counted, record_sales
+    queryset = Order.objects.all() if queryset is None else queryset
+    mismatches = []
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = queryset.filter(pk__gt=last_pk).order_by('pk')
+            if fix and connection.features.has_select_for_update:
+                rows = rows.select_for_update()
+            rows = list(rows.values_list('pk', 'shipping_cost', 'total_amount')[:chunk_size])
+            if not rows:
+                break
+            expected = expected_totals([(pk, shipping) for pk, shipping, _ in rows])
+            wrong = [(pk, stored, expected[pk]) for pk, _, stored in rows if stored != expected[pk]]
+            if fix and wrong:
+                fixed = counted(Order.objects.filter(pk__in=[pk for pk, _, _ in wrong]))
+                record_sales(fixed, -1)
+                Order.objects.bulk_update(
+                    [Order(pk=pk, total_amount=total) for pk, _, total in wrong], ['total_amount'], batch_size=chunk_size,
+                )
+                record_sales(fixed)
+        mismatches += wrong
+        last_pk = rows[-1][0]
+        if progress:
+            progress(last_pk, len(rows), len(wrong))
+    return mismatches
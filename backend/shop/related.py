@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import Product
+
+# Ile produktów z kategorii pokazujemy jako powiązane
+RELATED_PRODUCTS_LIMIT = 4
+RELATED_CACHE_TIMEOUT = 60 * 15
+
+
+def related_cache_key(category_id):
+    return f'shop:related_products:{category_id}'
+
+
+def top_products_by_category(category_ids, per_category):
+    # Jedno zapytanie z ROW_NUMBER() OVER (PARTITION BY category) zamiast zapytania na kategorię
+    return Product.objects.for_listing().filter(
+        category_id__in=category_ids
+    ).annotate(
+        category_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('category_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        )
+    ).filter(category_rank__lte=per_category).order_by('category_id', 'category_rank')
+
+
+def get_related_products_map(category_ids):
+    from .serializers import ProductSerializer
+
+    category_ids = {category_id for category_id in category_ids if category_id is not None}
+    keys = {related_cache_key(category_id): category_id for category_id in category_ids}
+    cached = cache.get_many(keys.keys())
+    related = {keys[key]: value for key, value in cached.items()}
+
+    missing = category_ids - related.keys()
+    if missing:
+        # Jeden produkt więcej, bo produkt oglądany jest odfiltrowywany dopiero przy serializacji
+        fetched = {category_id: [] for category_id in missing}
+        products = list(top_products_by_category(missing, RELATED_PRODUCTS_LIMIT + 1))
+        for data, product in zip(ProductSerializer(products, many=True).data, products):
+            fetched[product.category_id].append(data)
+        cache.set_many(
+            {related_cache_key(category_id): value for category_id, value in fetched.items()},
+            RELATED_CACHE_TIMEOUT
+        )
+        related.update(fetched)
+    return related
+
+
+def related_products_for(product):
+    if product.category_id is None:
+        return []
+    related_map = get_related_products_map([product.category_id])
+    related = [data for data in related_map.get(product.category_id, []) if data['id'] != product.id]
+    return related[:RELATED_PRODUCTS_LIMIT]
+
+
+def invalidate_related_products(*category_ids):
+    cache.delete_many([related_cache_key(category_id) for category_id in category_ids if category_id is not None])
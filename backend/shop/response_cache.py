@@ -0,0 +1,163 @@
+import hashlib
+import json
+import time
+from asgiref.sync import sync_to_async
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response # type: ignore
+from .models import Product, Category
+
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+GENERATION_KEY = 'shop:catalogue:generation'
+MODIFIED_KEY = 'shop:catalogue:modified'
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'SHOP_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def catalogue_version(scope_key=None):
+    # Numer generacji jest częścią klucza - unieważnienie to jeden INCR zamiast kasowania kluczy.
+    # scope_key: znacznik jednego obiektu (stan magazynu produktu) dokładany do klucza i Last-Modified
+    response_cache = get_response_cache()
+    version = response_cache.get_many([GENERATION_KEY, MODIFIED_KEY] + ([scope_key] if scope_key else []))
+    generation = version.get(GENERATION_KEY)
+    if generation is None:
+        response_cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = response_cache.get(GENERATION_KEY, 1)
+    modified = version.get(MODIFIED_KEY)
+    if modified is None:
+        modified = last_catalogue_update()
+        response_cache.add(MODIFIED_KEY, modified, timeout=None)
+    return scoped_version(generation, modified, version.get(scope_key))
+
+
+def scoped_version(generation, modified, stamp):
+    if stamp is None:
+        return generation, modified
+    return f'{generation}.{stamp}', max(modified, stamp)
+
+
+def last_catalogue_update():
+    # Po restarcie cache'u Last-Modified odtwarzamy z updated_at
+    timestamps = [
+        Product.objects.aggregate(last=Max('updated_at'))['last'],
+        Category.objects.aggregate(last=Max('updated_at'))['last'],
+    ]
+    timestamps = [timestamp.timestamp() for timestamp in timestamps if timestamp is not None]
+    return max(timestamps, default=time.time())
+
+
+def bump_catalogue_generation():
+    response_cache = get_response_cache()
+    response_cache.set(MODIFIED_KEY, time.time(), timeout=None)
+    try:
+        response_cache.incr(GENERATION_KEY)
+    except ValueError:
+        response_cache.add(GENERATION_KEY, 1, timeout=None)
+
+
+def invalidate_catalogue():
+    # Od razu - żeby ta sama transakcja widziała zmiany, i po COMMIT - żeby wyrzucić odpowiedzi
+    # zbudowane w międzyczasie przez innych ze starych danych
+    bump_catalogue_generation()
+    transaction.on_commit(bump_catalogue_generation)
+
+
+def product_stock_key(slug, **kwargs):
+    return f'shop:product:{slug}:stock'
+
+
+def stock_changed(slugs):
+    # Checkout zmienia tylko stan magazynu - nowy znacznik w kluczach odpowiedzi szczegółów tych produktów
+    # zamiast nowej generacji całego katalogu. Fragmenty list zmieniają klucz same (updated_at)
+    slugs = list(slugs)
+
+    def stamp():
+        get_response_cache().set_many({product_stock_key(slug): time.time() for slug in slugs}, timeout=None)
+
+    stamp()
+    transaction.on_commit(stamp)
+
+
+def response_cache_key(request, generation):
+    # Parametry w stałej kolejności: ?b=1&a=2 i ?a=2&b=1 to ten sam wpis
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists() if key != 'format')
+    raw = json.dumps([request.build_absolute_uri(request.path), params])
+    return f'shop:response:{generation}:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def cached_response(request, entry):
+    data, etag, last_modified = entry
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+    response = Response(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def cache_response(view_method=None, scope=None):
+    # Dla GET-ów katalogu: dane po serializacji z cache'u, ETag/Last-Modified i 304 dla klienta.
+    # Uprawnienia i throttling sprawdza DRF w initial(), zanim trafimy do handlera.
+    # scope(**kwargs) -> klucz znacznika obiektu, który unieważnia tylko tę odpowiedź (product_stock_key)
+    if view_method is None:
+        return lambda view_method: cache_response(view_method, scope)
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        response_cache = get_response_cache()
+        generation, modified = catalogue_version(scope(**kwargs) if scope else None)
+        key = response_cache_key(request, generation)
+        entry = response_cache.get(key)
+        if entry is None:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = (response.data, make_etag(response.data), modified)
+            response_cache.set(key, entry, RESPONSE_CACHE_TIMEOUT)
+        return cached_response(request, entry)
+    return wrapper
+
+
+async def acatalogue_version(scope_key=None):
+    keys = [GENERATION_KEY, MODIFIED_KEY] + ([scope_key] if scope_key else [])
+    version = await get_response_cache().aget_many(keys)
+    if GENERATION_KEY in version and MODIFIED_KEY in version:
+        return scoped_version(version[GENERATION_KEY], version[MODIFIED_KEY], version.get(scope_key))
+    # Zimny cache - odtworzenie z bazy jak w wersji synchronicznej
+    return await sync_to_async(catalogue_version)(scope_key)
+
+
+def acache_response(view_method=None, scope=None):
+    # cache_response dla handlerów async (shop.async_views)
+    if view_method is None:
+        return lambda view_method: acache_response(view_method, scope)
+
+    @wraps(view_method)
+    async def wrapper(self, request, *args, **kwargs):
+        response_cache = get_response_cache()
+        generation, modified = await acatalogue_version(scope(**kwargs) if scope else None)
+        key = response_cache_key(request, generation)
+        entry = await response_cache.aget(key)
+        if entry is None:
+            response = await view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = (response.data, make_etag(response.data), modified)
+            await response_cache.aset(key, entry, RESPONSE_CACHE_TIMEOUT)
+        return cached_response(request, entry)
+    return wrapper
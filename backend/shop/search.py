@@ -0,0 +1,193 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from django.db import connection
+from django.db.models import F, Prefetch
+from .models import Product, Tag
+from .local_index import SharedIndex
+
+# 'simple' bez stemmingu - katalog miesza nazwy polskie i angielskie
+SEARCH_CONFIG = 'simple'
+NAME_WEIGHT = 3
+DOCUMENT_WEIGHT = 1
+MAX_QUERY_TERMS = 8
+MAX_RESULTS = 5000
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_document(product):
+    # Zdenormalizowany tekst: wszystko poza nazwą, łącznie z nazwami kategorii i tagów
+    parts = [
+        product.brand,
+        product.material,
+        product.category.name if product.category_id else '',
+        ' '.join(tag.name for tag in product.tags.all()),
+        product.description,
+    ]
+    return ' '.join(part for part in parts if part)
+
+
+def update_search_documents(product_ids):
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    products = list(
+        Product.objects.filter(pk__in=product_ids)
+        .select_related('category')
+        .prefetch_related(Prefetch('tags', queryset=Tag.objects.only('id', 'name')))
+        .only('id', 'name', 'brand', 'material', 'description', 'is_active', 'category__name')
+    )
+    for product in products:
+        product.search_document = build_search_document(product)
+    Product.objects.bulk_update(products, ['search_document'], batch_size=500)
+
+    if uses_postgres_search():
+        from django.contrib.postgres.search import SearchVector
+        Product.objects.filter(pk__in=product_ids).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG) +
+                SearchVector('search_document', weight='B', config=SEARCH_CONFIG)
+            )
+        )
+    else:
+        # Inne procesy doczytają te produkty do swoich kopii indeksu (shop.local_index)
+        search_index_changed(product_ids)
+        index = get_search_index(build=False)
+        if index is not None:
+            for product in products:
+                index.add(product.id, product.name, product.search_document, product.is_active)
+        missing = set(product_ids) - {product.id for product in products}
+        if index is not None and missing:
+            index.remove(*missing)
+
+
+class InvertedIndex:
+    # Fallback dla SQLite: token -> {product_id: waga}, zapytanie to AND prefiksów tokenów
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.vocabulary = []
+        self._vocabulary_dirty = False
+        self.lock = threading.RLock()
+
+    def add(self, product_id, name, document, is_active=True):
+        with self.lock:
+            self.remove(product_id)
+            if not is_active:
+                return
+            weights = defaultdict(int)
+            for token in tokenize(name):
+                weights[token] += NAME_WEIGHT
+            for token in tokenize(document):
+                weights[token] += DOCUMENT_WEIGHT
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    self._vocabulary_dirty = True
+                self.postings[token][product_id] = weight
+            self.documents[product_id] = list(weights)
+
+    def remove(self, *product_ids):
+        with self.lock:
+            for product_id in product_ids:
+                for token in self.documents.pop(product_id, []):
+                    postings = self.postings.get(token)
+                    if postings is None:
+                        continue
+                    postings.pop(product_id, None)
+                    if not postings:
+                        del self.postings[token]
+                        self._vocabulary_dirty = True
+
+    def expand(self, term):
+        if self._vocabulary_dirty:
+            self.vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        position = bisect_left(self.vocabulary, term)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(term):
+            yield self.vocabulary[position]
+            position += 1
+
+    def search(self, query):
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        with self.lock:
+            total = len(self.documents) or 1
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token in self.expand(term):
+                    postings = self.postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for product_id, weight in postings.items():
+                        term_scores[product_id] += weight * idf
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+                if not scores:
+                    return []
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def build_search_index():
+    index = InvertedIndex()
+    rows = Product.objects.active().values_list('id', 'name', 'search_document')
+    for product_id, name, document in rows.iterator(chunk_size=2000):
+        index.add(product_id, name, document)
+    return index
+
+
+def refresh_search_index(index, changes):
+    product_ids = {pk for _, pk in changes}
+    rows = Product.objects.filter(pk__in=product_ids).values_list('id', 'name', 'search_document', 'is_active')
+    for product_id, name, document, is_active in rows:
+        index.add(product_id, name, document, is_active)
+        product_ids.discard(product_id)
+    index.remove(*product_ids)
+
+
+_search_index = SharedIndex('search', build_search_index, refresh_search_index)
+
+
+def get_search_index(build=True):
+    return _search_index.get(build)
+
+
+def search_index_changed(product_ids):
+    _search_index.changed('product', product_ids)
+
+
+def reset_search_index():
+    _search_index.reset()
+
+
+def search_products(queryset, query):
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+
+    if uses_postgres_search():
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-id').distinct()
+
+    # Ranking z indeksu w pamięci, filtry z get_queryset nakładane w bazie
+    ranked = get_search_index().search(' '.join(terms))[:MAX_RESULTS]
+    if not ranked:
+        return queryset.none()
+    allowed = set(queryset.filter(pk__in=[pid for pid, _ in ranked]).values_list('pk', flat=True))
+    return [pid for pid, _ in ranked if pid in allowed]
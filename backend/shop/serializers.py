@@ -2,64 +2,97 @@
 from requests import Response
 from scipy import stats
 from rest_framework import serializers # type: ignore
-from .models import Product, Category, Order, Tag
+from .models import Product, Category, Order, OrderItem, Tag, SalesRollup
+from .related import related_products_for
+from .fragments import CachedFragmentMixin, FragmentListSerializer
+from .images import variant_urls
+from .instrumentation import TimedSerializerMixin, TimedListSerializer
+from .stock import StockError, check_stock, item_quantities, reserve_stock
+from .notifications import order_created
+from .exports import OrderExportFilter
+from .fulfilment import BULK_ORDER_LIMIT, BULK_FIELDS
+from .analytics import MAX_HOURLY_DAYS, MAX_RANGE_DAYS, analytics_tz, record_order_sales
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
 from rest_framework.views import APIView # type: ignore
 import logging
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     slug = serializers.SlugField(read_only=True)
     products_count = serializers.SerializerMethodField()
+    ancestors = serializers.ListField(source='get_ancestor_ids', child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'parent', 'products_count']
+        fields = ['id', 'name', 'slug', 'description', 'parent', 'depth', 'ancestors', 'products_count']
+        list_serializer_class = TimedListSerializer
+
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and self.instance.path and parent.path.startswith(self.instance.path):
+            raise serializers.ValidationError('A category cannot be moved under itself or one of its subcategories.')
+        return parent
 
     def get_products_count(self, obj):
-        return obj.products.count()
+        # Listy kategorii dostają products_count z adnotacji (Category.objects.with_products_count)
+        products_count = getattr(obj, 'products_count', None)
+        if products_count is None:
+            products_count = obj.products.count()
+        return products_count
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     slug = serializers.SlugField(read_only=True)
 
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
+        list_serializer_class = TimedListSerializer
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TimedSerializerMixin, CachedFragmentMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     slug = serializers.SlugField(read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'slug', 'description', 'price',
-            'stock', 'image', 'category', 'category_name',
+            'stock', 'image', 'image_variants', 'category', 'category_name',
             'tags', 'condition', 'size', 'brand', 'material',
             'is_active', 'is_featured'
         ]
+        # Fragmenty JSON per produkt z cache'u, klucz (id, updated_at)
+        list_serializer_class = FragmentListSerializer
+
+    def get_fragment_queryset(self):
+        return Product.objects.for_listing()
+
+    def get_image_variants(self, obj):
+        # {wariant: {width, height, webp, jpeg}} - pusty, dopóki warianty generują się w tle
+        return variant_urls(obj.image_variants, self.context.get('request'))
 
 class ProductDetailSerializer(ProductSerializer):
     category = CategorySerializer(read_only=True)
     related_products = serializers.SerializerMethodField()
+    # products_count kategorii i powiązane produkty zmieniają się bez zmiany updated_at produktu
+    fragment_volatile_fields = ('category', 'related_products')
 
     class Meta(ProductSerializer.Meta):
         fields = ProductSerializer.Meta.fields + ['created_at', 'updated_at', 'related_products']
 
     def get_related_products(self, obj):
-        # Pobierz produkty z tej samej kategorii
-        related = Product.objects.filter(
-            category=obj.category,
-            is_active=True
-        ).exclude(id=obj.id)[:4]
-        return ProductSerializer(related, many=True).data
+        # Produkty z tej samej kategorii - z cache'owanej mapy kategoria -> top produkty
+        return related_products_for(obj)
 
 class OrderItemSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
-    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    # Cena z chwili zakupu, brana z produktu przy rezerwacji - tego, co przysyła klient, nie zapisujemy
+    price = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, read_only=True)
 
-class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    items = OrderItemSerializer(source='order_items', many=True)
     total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
@@ -71,39 +104,96 @@ class OrderSerializer(serializers.ModelSerializer):
             'shipping_status', 'total_amount', 'shipping_cost',
             'tracking_number', 'notes'
         ]
+        list_serializer_class = TimedListSerializer
 
     def validate_items(self, items):
         if not items:
             raise serializers.ValidationError("Order must contain at least one item.")
-        
-        for item in items:
-            try:
-                product = Product.objects.get(id=item['product_id'])
-                if product.stock < item['quantity']:
-                    raise serializers.ValidationError(
-                        f"Not enough stock for product {product.name}. "
-                        f"Available: {product.stock}, requested: {item['quantity']}"
-                    )
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(
-                    f"Product with id {item['product_id']} does not exist."
-                )
+
+        # Wstępne sprawdzenie jednym zapytaniem; wiążąca rezerwacja dzieje się w create()
+        quantities = item_quantities(items)
+        products = Product.objects.only('id', 'name', 'stock').in_bulk(list(quantities))
+        try:
+            check_stock(products, quantities)
+        except StockError as exc:
+            raise serializers.ValidationError(str(exc))
         return items
 
     def create(self, validated_data):
-        items = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        
-        # Aktualizuj stan magazynowy
-        for item in items:
-            product = Product.objects.get(id=item['product_id'])
-            product.stock -= item['quantity']
-            product.save()
-        
-        order.items = items
-        order.save()
+        items = validated_data.pop('order_items')
+        with transaction.atomic():
+            try:
+                products = reserve_stock(item_quantities(items))
+            except StockError as exc:
+                raise serializers.ValidationError({'items': [str(exc)]})
+            order = Order.objects.create(**validated_data)
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product_id=item['product_id'],
+                    quantity=item['quantity'],
+                    unit_price=products[item['product_id']].price,
+                )
+                for item in items
+            ])
+            order.update_total()
+            record_order_sales(order)
+            # Mail z potwierdzeniem wysyła worker (shop.tasks) - checkout nie czeka na SMTP
+            order_created(order)
         return order
 
+class BulkOrderStatusSerializer(serializers.Serializer):
+    # Zamówienia po liście id albo filtrze jak w eksporcie; tracking_numbers to numery przesyłek per id
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=BULK_ORDER_LIMIT)
+    filter = serializers.DictField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    shipping_status = serializers.ChoiceField(choices=Order.SHIPPING_STATUS_CHOICES, required=False)
+    tracking_number = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    tracking_numbers = serializers.DictField(child=serializers.CharField(max_length=100, allow_blank=True), required=False)
+
+    def validate_filter(self, value):
+        filterset = OrderExportFilter(value, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        return filterset.qs
+
+    def validate_tracking_numbers(self, value):
+        try:
+            return {int(pk): number for pk, number in value.items()}
+        except ValueError:
+            raise serializers.ValidationError('Keys must be order ids.')
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('Provide either ids or filter.')
+        if not any(field in data for field in (*BULK_FIELDS, 'tracking_numbers')):
+            raise serializers.ValidationError(f'Provide at least one of: {", ".join(BULK_FIELDS)}, tracking_numbers.')
+        if 'tracking_number' in data and 'tracking_numbers' in data:
+            raise serializers.ValidationError('Provide either tracking_number or tracking_numbers.')
+        unknown = set(data.get('tracking_numbers', {})) - set(data.get('ids', data.get('tracking_numbers', {})))
+        if unknown:
+            raise serializers.ValidationError({'tracking_numbers': [f'Ids not in ids: {sorted(unknown)}']})
+        return data
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    # Parametry /api/analytics/; domyślnie ostatnie 30 dni dziennie
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=SalesRollup.PERIOD_CHOICES, default='day')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, data):
+        data.setdefault('date_to', timezone.now().astimezone(analytics_tz()).date())
+        data.setdefault('date_from', data['date_to'] - timedelta(days=29))
+        days = (data['date_to'] - data['date_from']).days + 1
+        if days < 1:
+            raise serializers.ValidationError({'date_from': ['Must not be after date_to.']})
+        if days > MAX_RANGE_DAYS:
+            raise serializers.ValidationError({'date_from': [f'Range is limited to {MAX_RANGE_DAYS} days.']})
+        if data['interval'] == 'hour' and days > MAX_HOURLY_DAYS:
+            raise serializers.ValidationError({'interval': [f'Hourly series are limited to {MAX_HOURLY_DAYS} days.']})
+        return data
+
 logger = logging.getLogger(__name__)
 
 class OrderView(APIView):
@@ -0,0 +1,253 @@
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Product, Category, Tag, FacetCount, Order
+from .related import invalidate_related_products
+from .search import update_search_documents, get_search_index, search_index_changed, uses_postgres_search
+from .autocomplete import get_autocomplete_index, autocomplete_changed
+from .response_cache import invalidate_catalogue
+from .fragments import touch_products
+from .images import schedule_variants
+from .facets import Through, product_facets, tag_facets, facets_changed, apply_facet_deltas
+from .analytics import CANCELLED, record_sales
+
+# Zmiana tych pól wymaga przebudowy dokumentu wyszukiwarki
+SEARCH_FIELDS = {'name', 'brand', 'material', 'description', 'category', 'is_active'}
+AUTOCOMPLETE_FIELDS = {'name', 'brand', 'is_active'}
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_state(sender, instance, **kwargs):
+    # Przeniesienie produktu do innej kategorii musi unieważnić także starą kategorię
+    instance._previous_category_id = None
+    instance._previous_image = None
+    instance._previous_facets = set()
+    previous = None
+    if instance.pk:
+        previous = Product.objects.filter(pk=instance.pk).values(
+            'category_id', 'image', 'is_active', 'condition', 'size', 'brand'
+        ).first()
+    if previous is not None:
+        instance._previous_category_id, instance._previous_image = previous['category_id'], previous['image']
+        instance._previous_facets = product_facets(Product(**{key: previous[key] for key in previous if key != 'image'}))
+    if instance.image.name != instance._previous_image:
+        # Warianty starego zdjęcia znikają od razu, nowe dojdą z shop.images
+        instance.image_variants = {}
+
+
+@receiver(post_save, sender=Product)
+def product_saved_facets(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_facets', set())
+    current = product_facets(instance)
+    if bool(previous) != bool(current) and instance.pk:
+        # Aktywacja/dezaktywacja - tagi produktu też wchodzą do liczników albo z nich wypadają
+        tags = tag_facets(instance.tags.values_list('pk', flat=True))
+        previous, current = (previous | tags, current) if previous else (previous, current | tags)
+    facets_changed(previous, current)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_deleted_facets(sender, instance, **kwargs):
+    instance._deleted_facets = product_facets(instance)
+    if instance._deleted_facets:
+        instance._deleted_facets |= tag_facets(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_facets(sender, instance, **kwargs):
+    facets_changed(getattr(instance, '_deleted_facets', set()), set())
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def facet_value_deleted(sender, instance, **kwargs):
+    # Produkty tracą kategorię/tag przez SET NULL/CASCADE w bazie, bez sygnałów - znika cały wiersz
+    FacetCount.objects.filter(facet='category' if sender is Category else 'tags', value=str(instance.pk)).delete()
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted_tree(sender, instance, **kwargs):
+    # Dzieci dostają parent=NULL UPDATE-em bez save() - całe ich poddrzewa stają się korzeniami
+    if instance.path:
+        Category.objects.subtree(instance.path).update(
+            path=Substr('path', len(instance.path) + 1), depth=F('depth') - instance.depth - 1,
+        )
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted_sales(sender, instance, **kwargs):
+    # Przed kaskadą na pozycje - potem nie byłoby czego odjąć od rollupów
+    if instance.status != CANCELLED:
+        record_sales(Order.objects.filter(pk=instance.pk), -1)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_tags_changed_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    # Ile aktywnych produktów zyskało/straciło który tag; pre_* zapamiętuje stan sprzed usunięcia
+    if not reverse:
+        if not instance.is_active:
+            return
+        if action == 'pre_remove':
+            instance._removed_tag_ids = set(Through.objects.filter(product=instance, tag__in=pk_set).values_list('tag_id', flat=True))
+        elif action == 'pre_clear':
+            instance._removed_tag_ids = set(Through.objects.filter(product=instance).values_list('tag_id', flat=True))
+        elif action == 'post_add':
+            facets_changed(set(), tag_facets(pk_set))
+        elif action in ('post_remove', 'post_clear'):
+            facets_changed(tag_facets(getattr(instance, '_removed_tag_ids', ())), set())
+        return
+    key = ('tags', str(instance.pk))
+    if action == 'pre_remove':
+        instance._removed_active = Through.objects.filter(tag=instance, product__in=pk_set, product__is_active=True).count()
+    elif action == 'pre_clear':
+        instance._removed_active = Through.objects.filter(tag=instance, product__is_active=True).count()
+    elif action == 'post_add':
+        apply_facet_deltas({key: Product.objects.filter(pk__in=pk_set, is_active=True).count()})
+    elif action in ('post_remove', 'post_clear'):
+        apply_facet_deltas({key: -getattr(instance, '_removed_active', 0)})
+
+
+@receiver(post_save, sender=Product)
+def product_image_changed(sender, instance, **kwargs):
+    if instance.image and instance.image.name != getattr(instance, '_previous_image', None):
+        schedule_variants(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    invalidate_related_products(instance.category_id, getattr(instance, '_previous_category_id', None))
+
+
+@receiver(post_save, sender=Product)
+def product_saved_fragment(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=[...]) bez updated_at nie zmieniłby klucza fragmentu
+    if update_fields is not None and 'updated_at' not in update_fields:
+        touch_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def product_saved_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_search(sender, instance, **kwargs):
+    if not uses_postgres_search():
+        search_index_changed([instance.pk])
+    index = get_search_index(build=False)
+    if index is not None:
+        index.remove(instance.pk)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def product_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_products([instance.pk])
+            invalidate_related_products(instance.category_id)
+            update_search_documents([instance.pk])
+        return
+    # Zmiana od strony tagu - przy clear() pk_set jest pusty, więc produkty bierzemy przed usunięciem
+    if action == 'pre_clear':
+        instance._cleared_product_ids = list(instance.product_set.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_product_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        product_ids = list(pk_set)
+    else:
+        return
+    touch_products(product_ids)
+    products = Product.objects.filter(pk__in=product_ids)
+    invalidate_related_products(*products.values_list('category_id', flat=True).distinct())
+    update_search_documents(product_ids)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def remember_affected_products(sender, instance, **kwargs):
+    lookup = 'tags' if sender is Tag else 'category'
+    instance._affected_product_ids = list(
+        Product.objects.filter(**{lookup: instance}).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    product_ids = getattr(instance, '_affected_product_ids', None)
+    if product_ids is None:
+        product_ids = list(Product.objects.filter(tags=instance).values_list('pk', flat=True))
+    touch_products(product_ids)
+    products = Product.objects.filter(pk__in=product_ids)
+    invalidate_related_products(*products.values_list('category_id', flat=True).distinct())
+    update_search_documents(product_ids)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, created=False, **kwargs):
+    invalidate_related_products(instance.pk)
+    if created:
+        return
+    product_ids = getattr(instance, '_affected_product_ids', None)
+    if product_ids is None:
+        product_ids = list(Product.objects.filter(category=instance).values_list('pk', flat=True))
+    touch_products(product_ids)
+    update_search_documents(product_ids)
+
+
+@receiver(post_save, sender=Product)
+def product_saved_autocomplete(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTOCOMPLETE_FIELDS.intersection(update_fields):
+        return
+    autocomplete_changed('product', [instance.pk])
+    index = get_autocomplete_index(build=False)
+    if index is not None:
+        index.update_product(instance.pk, instance.name, instance.brand, instance.is_active)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_autocomplete(sender, instance, **kwargs):
+    autocomplete_changed('product', [instance.pk])
+    index = get_autocomplete_index(build=False)
+    if index is not None:
+        index.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved_autocomplete(sender, instance, **kwargs):
+    autocomplete_changed('tag', [instance.pk])
+    index = get_autocomplete_index(build=False)
+    if index is not None:
+        index.update_tag(instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted_autocomplete(sender, instance, **kwargs):
+    autocomplete_changed('tag', [instance.pk])
+    index = get_autocomplete_index(build=False)
+    if index is not None:
+        index.remove_tag(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalogue_changed(sender, **kwargs):
+    invalidate_catalogue()
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def catalogue_tags_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_catalogue()
@@ -0,0 +1,70 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .models import Product
+from .related import invalidate_related_products
+from .response_cache import stock_changed
+
+
+class StockError(Exception):
+    def __init__(self, message, product_id=None):
+        super().__init__(message)
+        self.product_id = product_id
+
+
+def item_quantities(items):
+    # Kilka pozycji z tym samym produktem rezerwujemy łącznie
+    quantities = Counter()
+    for item in items:
+        quantities[item['product_id']] += item['quantity']
+    return quantities
+
+
+def check_stock(products, quantities):
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            raise StockError(f"Product with id {product_id} does not exist.", product_id)
+        if product.stock < quantity:
+            raise StockError(
+                f"Not enough stock for product {product.name}. "
+                f"Available: {product.stock}, requested: {quantity}",
+                product_id
+            )
+
+
+def reserve_stock(quantities):
+    # Zdejmuje towar ze stanu dla {product_id: ilość} albo rzuca StockError.
+    # Wołać wewnątrz transaction.atomic() razem z zapisem zamówienia. Zwraca zablokowane produkty (z ceną).
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return {}
+    product_ids = sorted(quantities)
+
+    # Blokady wierszy zawsze w kolejności id - dwa koszyki z tymi samymi produktami nie zakleszczą się
+    products = {
+        product.pk: product
+        for product in Product.objects.select_for_update()
+        .filter(pk__in=product_ids).order_by('pk').only('id', 'name', 'slug', 'price', 'stock', 'category_id')
+    }
+    check_stock(products, quantities)
+
+    # Jeden warunkowy UPDATE; WHERE stock >= ilość chroni przed overselling także bez blokad (SQLite)
+    requested = Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    updated = Product.objects.filter(pk__in=product_ids, stock__gte=requested).update(
+        stock=F('stock') - requested,
+        updated_at=timezone.now(),
+    )
+    if updated != len(product_ids):
+        raise StockError('Stock changed while the order was being placed, please try again.')
+
+    category_ids = {product.category_id for product in products.values()}
+    transaction.on_commit(lambda: invalidate_related_products(*category_ids))
+    # UPDATE omija sygnały; zmienia się tylko stan, więc unieważniamy szczegóły tych produktów,
+    # a nie cały katalog - listy mogą pokazywać stary stan do RESPONSE_CACHE_TIMEOUT, checkout i tak go sprawdza
+    stock_changed(product.slug for product in products.values())
+    return products
@@ -0,0 +1,169 @@
+import json
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger('shop')
+
+# Nazwa zadania -> funkcja; wypełniane dekoratorem @task przy imporcie modułów (shop.apps.ready)
+TASKS = {}
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def task(name=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    # Zadanie dostaje tylko argumenty nazwane, które przejdą przez JSON - id obiektów, nie instancje
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        TASKS[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, countdown=0, **kwargs):
+    # Wiersz zadania zapisuje się w bieżącej transakcji: wycofane zamówienie nie zostawia maila w kolejce,
+    # a worker widzi zadanie dopiero po COMMIT
+    payload = json.loads(json.dumps(kwargs, cls=DjangoJSONEncoder))
+    if getattr(settings, 'SHOP_TASKS_EAGER', False):
+        # Bez workera (dev, testy): po COMMIT w tym samym procesie, z tym samym payloadem co z kolejki
+        transaction.on_commit(lambda: func(**payload))
+        return None
+    return Job.objects.create(
+        name=func.task_name,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+        max_attempts=func.max_attempts,
+    )
+
+
+def retry_delay(attempts):
+    # Wykładniczo od SHOP_TASKS_BACKOFF do SHOP_TASKS_MAX_BACKOFF, z rozrzutem, żeby ponowienia się nie zbiegały
+    base = getattr(settings, 'SHOP_TASKS_BACKOFF', 10)
+    delay = min(getattr(settings, 'SHOP_TASKS_MAX_BACKOFF', 60 * 60), base * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_jobs(limit):
+    # Zadania gotowe do wykonania przechodzą na 'running' z dzierżawą; próba liczy się już przy pobraniu,
+    # więc zadanie zabijające workera nie będzie ponawiane w nieskończoność
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    changes = {
+        'status': 'running',
+        'locked_until': now + timedelta(seconds=getattr(settings, 'SHOP_TASKS_LEASE', 300)),
+        'attempts': F('attempts') + 1,
+    }
+    ready = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'pk')
+    if connection.features.has_select_for_update_skip_locked:
+        # Postgres: kilka workerów pobiera równolegle różne wiersze, nikt nie czeka na cudze blokady
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(**changes)
+    else:
+        # SQLite nie ma blokad wierszy - każdy wiersz przejmujemy warunkowym UPDATE (bez otwartej transakcji,
+        # bo odczyt przechodzący w zapis kończy się tam od razu "database is locked")
+        jobs = [job for job in ready[:limit] if Job.objects.filter(pk=job.pk, status='queued').update(**changes)]
+    for job in jobs:
+        job.status, job.locked_until, job.attempts = 'running', changes['locked_until'], job.attempts + 1
+    return jobs
+
+
+def requeue_abandoned():
+    # Dzierżawa minęła = worker padł w trakcie; bez wolnych prób zadanie trafia do martwych
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_until__lt=now)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_until=None, last_error='Worker lease expired',
+    )
+    requeued = stale.update(status='queued', locked_until=None, run_at=now)
+    return requeued, failed
+
+
+def run_job(job):
+    # Wyjątek = ponowienie z opóźnieniem albo 'failed'. Zadanie nie działa w transakcji (SMTP nie trzyma
+    # połączenia i blokad) - wykonanie jest "co najmniej raz", więc zadania muszą znosić powtórkę
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f'Unknown task {job.name!r}')
+        func(**job.payload)
+        Job.objects.filter(pk=job.pk).delete()
+        return True
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.exception('Task %s #%s failed after %s attempts', job.name, job.pk, job.attempts)
+            Job.objects.filter(pk=job.pk).update(status='failed', locked_until=None, last_error=error)
+        else:
+            logger.warning('Task %s #%s failed (attempt %s), retrying', job.name, job.pk, job.attempts, exc_info=True)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', locked_until=None, last_error=error,
+                run_at=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+
+
+class Worker:
+    # Jeden wątek pobiera zadania i pilnuje dzierżaw, pula wątków je wykonuje.
+    # Wiele procesów = kilka Workerów (run_worker --processes), każdy z własnym połączeniem
+    def __init__(self, threads=4, poll_interval=1.0, burst=False):
+        self.threads = max(threads, 1)
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.stopping = threading.Event()
+        self.processed = self.failed = 0
+        self.lock = threading.Lock()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def execute(self, job):
+        try:
+            ok = run_job(job)
+        finally:
+            close_old_connections()
+        with self.lock:
+            self.processed += 1
+            self.failed += not ok
+
+    def run(self):
+        lease = getattr(settings, 'SHOP_TASKS_LEASE', 300)
+        next_recovery = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='shop-worker') as executor:
+            while not self.stopping.is_set():
+                close_old_connections()
+                running = {future for future in running if not future.done()}
+                try:
+                    now = timezone.now().timestamp()
+                    if now >= next_recovery:
+                        requeue_abandoned()
+                        next_recovery = now + lease / 2
+                    jobs = claim_jobs(self.threads - len(running))
+                except DatabaseError:
+                    # Restart bazy albo zajęta SQLite - worker czeka i próbuje dalej zamiast kończyć pracę
+                    logger.exception('Claiming tasks failed')
+                    jobs = []
+                running.update(executor.submit(self.execute, job) for job in jobs)
+                if jobs and len(running) < self.threads:
+                    # W kolejce może czekać więcej - pobieramy od razu, bez czekania na poll
+                    continue
+                if running:
+                    wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                elif self.burst:
+                    break
+                else:
+                    self.stopping.wait(self.poll_interval)
+            # Przy zatrzymaniu dokańczamy pobrane zadania (wyjście z executora czeka na wątki)
+        close_old_connections()
+        return self.processed, self.failed
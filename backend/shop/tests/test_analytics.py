@@ -0,0 +1,134 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from zoneinfo import ZoneInfo
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.analytics import MAX_HOURLY_DAYS, record_order_sales
+from shop.models import Category, Order, OrderItem, ProductSalesRollup, SalesRollup
+from .test_stock import order_data, create_products
+
+WARSAW = ZoneInfo('Europe/Warsaw')
+
+
+def rollup_state():
+    return (
+        sorted(SalesRollup.objects.exclude(orders=0).values_list('period', 'bucket', 'orders', 'revenue', 'shipping', 'units')),
+        sorted(ProductSalesRollup.objects.exclude(units=0).values_list('bucket', 'product_id', 'category_id', 'units', 'revenue')),
+    )
+
+
+@override_settings(SHOP_ANALYTICS_TIME_ZONE='Europe/Warsaw')
+class SalesRollupTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='testpass', is_staff=True))
+        self.category = Category.objects.create(name='Shoes', slug='shoes')
+        self.products = create_products(2)
+        self.products[0].category = self.category
+        self.products[0].save()
+
+    def place_order(self, *lines, created_at=None):
+        order = Order.objects.create(name='Ann', email='ann@example.com', address='a', city='c', postal_code='p',
+                                     country='PL', shipping_cost=Decimal('10.00'))
+        if created_at:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity, unit_price=product.price) for product, quantity in lines
+        ])
+        order.update_total()
+        record_order_sales(order)
+        return order
+
+    def report(self, **params):
+        return self.client.get(reverse('sales-analytics'), params)
+
+    def test_order_created_through_api_is_counted(self):
+        response = self.client.post(reverse('orders'), order_data((self.products[0], 2), (self.products[1], 1)), format='json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        day = SalesRollup.objects.get(period='day')
+        self.assertEqual((day.orders, day.revenue, day.units), (1, order.total_amount, 3))
+        self.assertEqual(day.bucket, datetime.combine(order.created_at.astimezone(WARSAW).date(), datetime.min.time(), tzinfo=WARSAW))
+        self.assertEqual(SalesRollup.objects.get(period='hour').revenue, order.total_amount)
+        self.assertEqual(
+            dict(ProductSalesRollup.objects.values_list('product_id', 'category_id')),
+            {self.products[0].pk: self.category.pk, self.products[1].pk: None},
+        )
+
+    def test_cancel_and_restore(self):
+        order = self.place_order((self.products[0], 2))
+        url = reverse('order-update-status', kwargs={'pk': order.pk})
+        self.client.post(url, {'status': 'cancelled'})
+        self.assertEqual(rollup_state(), ([], []))
+        self.client.post(url, {'status': 'processing'})
+        self.assertEqual(SalesRollup.objects.get(period='day').revenue, Decimal('60.00'))
+
+        self.client.post(reverse('orders-bulk-update-status'), {'ids': [order.pk], 'status': 'cancelled'}, format='json')
+        self.assertEqual(rollup_state(), ([], []))
+
+    def test_deleted_order_is_subtracted(self):
+        kept = self.place_order((self.products[0], 1))
+        self.place_order((self.products[1], 3)).delete()
+        self.assertEqual(SalesRollup.objects.get(period='day').revenue, kept.total_amount)
+
+    def test_incremental_matches_rebuild(self):
+        self.place_order((self.products[0], 1), created_at=datetime(2024, 3, 30, 23, 30, tzinfo=WARSAW))
+        # Zmiana czasu 31.03 - godzina 01:00 UTC to już 03:00 lokalnie
+        self.place_order((self.products[0], 2), (self.products[1], 1), created_at=datetime(2024, 3, 31, 1, 15, tzinfo=ZoneInfo('UTC')))
+        self.place_order((self.products[1], 1), created_at=datetime(2024, 4, 20, 12, 0, tzinfo=WARSAW))
+        Order.objects.filter(pk=self.place_order((self.products[0], 5)).pk).update(status='cancelled')
+        self.products[1].delete()
+        incremental = rollup_state()
+
+        SalesRollup.objects.update(orders=99)
+        SalesRollup.objects.create(period='day', bucket=datetime(2020, 1, 1, tzinfo=WARSAW), orders=1)
+        out = StringIO()
+        call_command('rebuild_sales_rollups', chunk_days=3, stdout=out)
+        self.assertIn('Rebuilt sales rollups', out.getvalue())
+        totals, products = rollup_state()
+        # Zamówienie anulowane poza API (UPDATE bez hooka) wypada dopiero po przebudowie
+        self.assertEqual(totals, [row for row in incremental[0] if row[3] != Decimal('135.00')])
+        self.assertEqual(len(totals), 6)
+        # Pozycje usuniętego produktu zostają w sprzedaży jako product_id=0
+        self.assertEqual(sorted({row[1] for row in products}), [0, self.products[0].pk])
+
+    def test_report_zero_fills_and_aggregates(self):
+        self.place_order((self.products[0], 2), created_at=datetime(2024, 5, 1, 10, 0, tzinfo=WARSAW))
+        self.place_order((self.products[1], 1), created_at=datetime(2024, 5, 3, 22, 30, tzinfo=WARSAW))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.report(date_from='2024-04-30', date_to='2024-05-04')
+        self.assertEqual(response.status_code, 200)
+        # Same rollupy: seria, produkty, kategorie i nazwy - bez skanu zamówień
+        self.assertFalse([query for query in queries if '"shop_order' in query['sql']])
+        self.assertEqual(len(queries), 5)
+        self.assertEqual([row['orders'] for row in response.data['series']], [0, 1, 0, 1, 0])
+        self.assertEqual(response.data['series'][3]['bucket'], datetime(2024, 5, 3, tzinfo=WARSAW))
+        self.assertEqual(response.data['totals'], {'orders': 2, 'revenue': Decimal('95.00'), 'shipping': Decimal('20.00'), 'units': 3})
+        self.assertEqual([row['product_id'] for row in response.data['top_products']], [self.products[0].pk, self.products[1].pk])
+        self.assertEqual(response.data['categories'][0], {'category_id': self.category.pk, 'name': 'Shoes', 'units': 2, 'revenue': Decimal('50.00')})
+
+        hourly = self.report(date_from='2024-05-03', date_to='2024-05-03', interval='hour').data['series']
+        self.assertEqual(len(hourly), 24)
+        self.assertEqual([row['bucket'].hour for row in hourly if row['orders']], [22])
+
+    def test_hourly_series_across_dst_change(self):
+        hourly = self.report(date_from='2024-03-31', date_to='2024-03-31', interval='hour').data['series']
+        self.assertEqual(len(hourly), 23)
+        self.assertEqual(len(self.report(date_from='2024-10-27', date_to='2024-10-27', interval='hour').data['series']), 25)
+
+    def test_validation(self):
+        self.assertEqual(self.report(date_from='2024-05-04', date_to='2024-05-01').status_code, 400)
+        self.assertEqual(self.report(interval='week').status_code, 400)
+        last = date(2024, 5, 1) + timedelta(days=MAX_HOURLY_DAYS)
+        self.assertEqual(self.report(date_from='2024-05-01', date_to=last.isoformat(), interval='hour').status_code, 400)
+        self.assertEqual(self.report(date_from='2020-01-01', date_to='2024-05-01').status_code, 400)
+        self.assertEqual(len(self.report().data['series']), 30)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='testpass'))
+        self.assertEqual(self.report().status_code, 403)
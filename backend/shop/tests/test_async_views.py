@@ -0,0 +1,117 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from shop.models import Product, Category, Tag
+
+
+class AsyncCatalogueViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_login(self.user)
+        self.async_client.cookies = self.client.cookies
+        self.category = Category.objects.create(name='Dresses')
+        tag = Tag.objects.create(name='Vintage')
+        for index in range(30):
+            product = Product.objects.create(
+                name=f'Dress {index}',
+                description='Upcycled cotton dress',
+                price=Decimal('10.00') + index,
+                stock=1,
+                size='M',
+                category=self.category,
+                is_featured=index % 3 == 0,
+            )
+            product.tags.add(tag)
+        self.product = product
+
+    async def assertSameAsSync(self, async_url, sync_url):
+        response = await self.async_client.get(async_url)
+        expected = await self.async_client.get(sync_url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        if isinstance(data, dict) and 'results' in data:
+            self.assertEqual(data['results'], expected.json()['results'])
+        else:
+            self.assertEqual(data, expected.json())
+        return response
+
+    async def test_product_list_matches_sync(self):
+        response = await self.assertSameAsSync(reverse('async-product-list'), reverse('product-list'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 24)
+        self.assertIn('/api/async/products/?cursor=', data['next'])
+
+        second = await self.async_client.get(data['next'])
+        expected = await self.async_client.get(data['next'].replace('/api/async/', '/api/'))
+        self.assertEqual(second.json()['results'], expected.json()['results'])
+        self.assertEqual(len(second.json()['results']), 6)
+
+    async def test_product_list_filters_and_ordering(self):
+        await self.assertSameAsSync(
+            reverse('async-product-list') + f'?category={self.category.pk}&ordering=price&page_size=5',
+            reverse('product-list') + f'?category={self.category.pk}&ordering=price&page_size=5',
+        )
+        await self.assertSameAsSync(
+            reverse('async-product-list') + '?min_price=35&search=dress',
+            reverse('product-list') + '?min_price=35&search=dress',
+        )
+        response = await self.async_client.get(reverse('async-product-list') + '?category=999')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_category_tree_matches_sync(self):
+        for slug in (self.category.slug, 'unknown'):
+            await self.assertSameAsSync(
+                reverse('async-product-list') + f'?category_tree={slug}',
+                reverse('product-list') + f'?category_tree={slug}',
+            )
+            await self.assertSameAsSync(
+                reverse('async-product-featured') + f'?category_tree={slug}',
+                reverse('product-featured') + f'?category_tree={slug}',
+            )
+
+    async def test_featured_detail_and_categories_match_sync(self):
+        await self.assertSameAsSync(reverse('async-product-featured'), reverse('product-featured'))
+        await self.assertSameAsSync(
+            reverse('async-product-detail', kwargs={'slug': self.product.slug}),
+            reverse('product-detail', kwargs={'slug': self.product.slug}),
+        )
+        await self.assertSameAsSync(reverse('async-category-list'), reverse('category-list'))
+        await self.assertSameAsSync(
+            reverse('async-category-detail', kwargs={'slug': self.category.slug}),
+            reverse('category-detail', kwargs={'slug': self.category.slug}),
+        )
+
+    async def test_not_found(self):
+        response = await self.async_client.get(reverse('async-product-detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    async def test_requires_authentication(self):
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(reverse('async-product-list'))
+        expected = await self.async_client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+
+    async def test_conditional_get_and_head(self):
+        url = reverse('async-product-list')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        not_modified = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        head = await self.async_client.head(url)
+        self.assertEqual(head.status_code, 200)
+        self.assertEqual(head['ETag'], response['ETag'])
+
+    def test_cached_response_skips_database(self):
+        url = reverse('async-category-list')
+        self.client.get(url)
+        # Sesja i użytkownik to 2 zapytania, odpowiedź już z cache'u
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['products_count'], 30)
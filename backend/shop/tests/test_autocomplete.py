@@ -0,0 +1,152 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Tag
+from shop.autocomplete import TrigramIndex, reset_autocomplete_index, get_autocomplete_index
+from shop.local_index import MAX_CHANGE_BATCH, SharedIndex
+from shop.response_cache import get_response_cache
+from decimal import Decimal
+from unittest import mock
+from django.test import override_settings
+from django.contrib.auth.models import User
+
+
+class TrigramIndexTest(APITestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.bulk_load(
+            [(1, 'Red Silk Dress', 'Levi'), (2, 'Blue Denim Jacket', 'Levi'), (3, 'Red Wool Coat', 'Zara')],
+            [(1, 'Vintage')],
+        )
+
+    def texts(self, query, limit=8):
+        return [item['text'] for item in self.index.suggest(query, limit)]
+
+    def test_prefix_matches_any_word(self):
+        self.assertEqual(self.texts('dre'), ['Red Silk Dress'])
+        self.assertEqual(self.texts('red'), ['Red Wool Coat', 'Red Silk Dress'])
+
+    def test_brand_and_tag_rank_first(self):
+        self.assertEqual(self.texts('v'), ['Vintage'])
+        self.assertEqual(self.texts('le')[0], 'Levi')
+        levi = self.index.suggest('levi')[0]
+        self.assertEqual((levi['type'], levi['count']), ('brand', 2))
+
+    def test_non_adjacent_words(self):
+        self.assertEqual(self.texts('red dress'), ['Red Silk Dress'])
+        self.assertEqual(self.texts('red jacket'), [])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.texts('jackte'), ['Blue Denim Jacket'])
+        self.assertEqual(self.texts('denin jack'), ['Blue Denim Jacket'])
+
+    def test_incremental_updates(self):
+        self.index.update_product(1, 'Green Silk Dress', 'Levi')
+        self.assertEqual(self.texts('red'), ['Red Wool Coat'])
+        self.assertEqual(self.texts('gre'), ['Green Silk Dress'])
+        self.index.remove_product(2)
+        self.assertEqual(self.index.suggest('levi')[0]['count'], 1)
+        self.index.remove_product(1)
+        self.assertEqual(self.texts('levi'), [])
+        self.assertEqual(self.texts('silk'), [])
+        self.index.update_tag(1, 'Retro')
+        self.assertEqual(self.texts('vintage'), [])
+        self.assertEqual(self.texts('retro'), ['Retro'])
+
+    def test_text_expanding_under_normalisation(self):
+        # 'ﷺ' to po NFKD cztery słowa, 18 znaków - klucz dłuższy niż tekst nie może przepełnić offsetu
+        name = 'ﷺ ' * 20 + 'zzz'
+        self.index.update_product(4, name, '')
+        self.assertEqual(self.texts('صلى'), [name.strip()])
+        self.index.remove_product(4)
+        self.assertEqual(self.texts('صلى'), [])
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.suggest('r', limit=1)), 1)
+
+
+class AutocompleteEndpointTest(APITestCase):
+    def setUp(self):
+        reset_autocomplete_index()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(
+            name='Patchwork Denim Jacket', description='Upcycled', price=Decimal('80.00'), stock=1, size='L',
+            brand='Reworked Co'
+        )
+        self.url = reverse('product-autocomplete')
+
+    def test_suggestions_without_queries(self):
+        get_autocomplete_index()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'patch'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['text'], 'Patchwork Denim Jacket')
+
+    def test_index_follows_signals(self):
+        get_autocomplete_index()
+        self.product.name = 'Patchwork Denim Vest'
+        self.product.save()
+        Tag.objects.create(name='Denim Revival')
+        texts = [item['text'] for item in self.client.get(self.url, {'q': 'denim'}).data['results']]
+        self.assertEqual(texts, ['Denim Revival', 'Patchwork Denim Vest'])
+        self.product.delete()
+        texts = [item['text'] for item in self.client.get(self.url, {'q': 'patch'}).data['results']]
+        self.assertEqual(texts, [])
+
+    def test_changes_from_other_processes_are_applied_incrementally(self):
+        index = get_autocomplete_index()
+        # Inny proces (worker, import_products) zmienia bazę i dopisuje zmianę do dziennika w cache'u
+        other_process = SharedIndex('autocomplete', TrigramIndex, None)
+        Product.objects.filter(pk=self.product.pk).update(name='Quilted Vest')
+        tag = Tag.objects.create(name='Quilting')
+        other_process.publish([('product', self.product.pk), ('tag', tag.pk), ('tag', 999999)])
+        texts = [item['text'] for item in self.client.get(self.url, {'q': 'quil'}).data['results']]
+        self.assertEqual(texts, ['Quilting', 'Quilted Vest'])
+        self.assertIs(get_autocomplete_index(), index)
+
+        Product.objects.filter(pk=self.product.pk).delete()
+        other_process.publish([('product', self.product.pk)])
+        with self.assertNumQueries(1):
+            texts = [item['text'] for item in get_autocomplete_index().suggest('quil')]
+        self.assertEqual(texts, ['Quilting'])
+
+    @override_settings(SHOP_INDEX_REBUILD_ASYNC=False)
+    def test_large_or_missing_changes_rebuild_index(self):
+        index = get_autocomplete_index()
+        other_process = SharedIndex('autocomplete', TrigramIndex, None)
+        Product.objects.filter(pk=self.product.pk).update(name='Quilted Vest')
+        other_process.publish([('product', pk) for pk in range(MAX_CHANGE_BATCH + 1)])
+        rebuilt = get_autocomplete_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual([item['text'] for item in rebuilt.suggest('quil')], ['Quilted Vest'])
+
+        # Wpis wypadł z cache'u - tylko pełna budowa da pewny stan
+        other_process.publish([('product', self.product.pk)])
+        other_process.publish([('product', self.product.pk)])
+        cache = get_response_cache()
+        cache.delete(f'shop:index:autocomplete:change:{cache.get("shop:index:autocomplete:sequence") - 1}')
+        self.assertIsNot(get_autocomplete_index(), rebuilt)
+
+    def test_rebuild_runs_in_background(self):
+        index = get_autocomplete_index()
+        SharedIndex('autocomplete', TrigramIndex, None).publish([('product', pk) for pk in range(MAX_CHANGE_BATCH + 1)])
+        with mock.patch('shop.local_index.threading.Thread') as thread:
+            # Do końca przebudowy odpowiada dotychczasowa kopia, bez czekania na blokadę
+            self.assertIs(get_autocomplete_index(), index)
+            self.assertIs(get_autocomplete_index(), index)
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+        thread.call_args.kwargs['target']()
+        self.assertIsNot(get_autocomplete_index(), index)
+
+    def test_own_changes_keep_index(self):
+        index = get_autocomplete_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Patchwork Denim Vest'
+            self.product.save()
+        self.assertIs(get_autocomplete_index(), index)
+
+    def test_empty_query(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'], [])
@@ -0,0 +1,110 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, LiveServerTestCase
+from shop.benchmarks.catalogue import seed_catalogue
+from shop.benchmarks.runner import compare, run_http, run_in_process
+from shop.benchmarks.scenarios import SCENARIOS, BenchmarkData
+from shop.models import Product, Category, Tag, Order, OrderItem, SalesRollup
+
+
+class SeedCatalogueTest(TestCase):
+    def test_seeds_related_rows(self):
+        seed_catalogue(300, categories=5, tags=10, orders=40, progress=None)
+        self.assertEqual(Product.objects.count(), 300)
+        self.assertEqual(Category.objects.count(), 5)
+        self.assertEqual(Tag.objects.count(), 10)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertTrue(Product.tags.through.objects.exists())
+        self.assertEqual(Product.objects.filter(category__isnull=True).count(), 0)
+        order = Order.objects.first()
+        items = OrderItem.objects.filter(order=order)
+        self.assertEqual(order.total_amount, sum(item.quantity * item.unit_price for item in items) + order.shipping_cost)
+        # Wyszukiwarka widzi produkty wstawione z pominięciem sygnałów
+        product = Product.objects.filter(is_active=True).select_related('category').first()
+        self.assertIn(product.category.name, product.search_document)
+        # /api/analytics/ widzi zamówienia wstawione bulk_create
+        self.assertEqual(
+            SalesRollup.objects.filter(period='day').aggregate(orders=Sum('orders'))['orders'],
+            Order.objects.exclude(status='cancelled').count(),
+        )
+
+    def test_seeding_twice_adds_rows(self):
+        seed_catalogue(50, categories=2, tags=3, orders=0)
+        seed_catalogue(50, categories=2, tags=3, orders=0)
+        self.assertEqual(Product.objects.count(), 100)
+        self.assertEqual(Category.objects.count(), 4)
+
+
+class BenchmarkCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed_catalogue(300, categories=5, tags=10, orders=20)
+
+    def test_in_process_results(self):
+        out = StringIO()
+        call_command('benchmark_api', iterations=5, warmup=1, output='-', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['driver'], 'in-process')
+        self.assertEqual(report['meta']['products'], 300)
+        self.assertEqual(set(report['scenarios']), {'list', 'filter', 'search', 'detail', 'order_create'})
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 5)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+            self.assertGreater(result['queries']['max'], 0)
+        self.assertEqual(Order.objects.count(), 20 + 6)
+
+    def test_redirects_are_not_successes(self):
+        # Bez końcowego ukośnika CommonMiddleware odpowiada 301
+        with mock.patch.dict(SCENARIOS, {'redirect': lambda data: ('GET', '/api/categories', None)}):
+            result = run_in_process(None, ['redirect'], 3)['redirect']
+        self.assertEqual((result['requests'], result['redirects'], result['errors']), (0, 3, 0))
+
+    def test_compare_with_previous_run(self):
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        call_command('benchmark_api', iterations=3, warmup=0, scenarios=['list', 'detail'], output=path, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_api', iterations=3, warmup=0, scenarios=['detail'], compare=path, stdout=out)
+        self.assertIn('Change against', out.getvalue())
+        self.assertRegex(out.getvalue(), r'detail\s+p95 ms')
+        self.assertNotRegex(out.getvalue(), r'list\s+p95 ms')
+
+    def test_compare_rows(self):
+        baseline = {'scenarios': {'list': {'rps': 100.0, 'latency_ms': {'p50': 10, 'p95': 20, 'p99': 40}, 'queries': {'mean': 4}}}}
+        current = {'scenarios': {'list': {'rps': 50.0, 'latency_ms': {'p50': 20, 'p95': 20, 'p99': 30}, 'queries': {'mean': 5}}}}
+        self.assertEqual(compare(baseline, current), [
+            ('list', 'rps', 100.0, 50.0, -50.0),
+            ('list', 'p50 ms', 10, 20, 100.0),
+            ('list', 'p95 ms', 20, 20, 0.0),
+            ('list', 'p99 ms', 40, 30, -25.0),
+            ('list', 'queries', 4, 5, 25.0),
+        ])
+
+
+class HttpDriverTest(LiveServerTestCase):
+    def test_drives_live_server(self):
+        cache.clear()
+        seed_catalogue(100, categories=3, tags=5, orders=0)
+        data = BenchmarkData(random.Random(1))
+        # Serwer testowy dzieli jedno połączenie SQLite między wątki - zapisy po kolei
+        results = run_http(data, ['detail', 'order_create'], 6, self.live_server_url, concurrency=1)
+        self.assertEqual(results['detail']['requests'], 6)
+        self.assertEqual(results['detail']['errors'], 0)
+        self.assertIsNone(results['detail']['queries'])
+        self.assertEqual(results['order_create']['errors'], 0)
+        self.assertEqual(Order.objects.count(), 6)
+        # Sama rozgrzewka albo nic - pusty wynik zamiast wyjątku
+        results = run_http(data, ['detail'], 0, self.live_server_url, concurrency=1, warmup=2)
+        self.assertEqual((results['detail']['requests'], results['detail']['latency_ms']), (0, None))
+        self.assertEqual(run_http(data, ['detail'], 0, self.live_server_url, concurrency=1)['detail']['requests'], 0)
+
+        with mock.patch.dict(SCENARIOS, {'redirect': lambda data: ('GET', '/api/categories', None)}):
+            result = run_http(data, ['redirect'], 3, self.live_server_url, concurrency=1)['redirect']
+        self.assertEqual((result['requests'], result['redirects'], result['errors'], result['latency_ms']), (0, 3, 0, None))
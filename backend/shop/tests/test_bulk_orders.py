@@ -0,0 +1,103 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.fulfilment import BULK_ORDER_LIMIT
+from shop.models import Job, Order, OrderEvent
+from shop.outbox import coalesce
+
+
+def create_orders(count, **fields):
+    return Order.objects.bulk_create([
+        Order(name=f'Customer {i}', email=f'c{i}@example.com', address='a', city='c', postal_code='p', country='PL', **fields)
+        for i in range(count)
+    ])
+
+
+class BulkUpdateStatusTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='testpass', is_staff=True))
+        self.url = reverse('orders-bulk-update-status')
+
+    def post(self, data):
+        return self.client.post(self.url, data, format='json')
+
+    def test_mark_shipped_by_ids(self):
+        orders = create_orders(3, status='processing')
+        Order.objects.filter(pk=orders[2].pk).update(shipping_status='shipped')
+        ids = [order.pk for order in orders]
+        response = self.post({'ids': [*ids, 999999], 'shipping_status': 'shipped', 'tracking_number': 'PL123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual([result['result'] for result in response.data['results']], ['updated'] * 3 + ['not_found'])
+        self.assertEqual(response.data['results'][0]['shipping_status'], 'shipped')
+        self.assertEqual(set(Order.objects.values_list('shipping_status', 'tracking_number')), {('shipped', 'PL123')})
+
+        response = self.post({'ids': ids, 'shipping_status': 'shipped', 'tracking_number': 'PL123'})
+        self.assertEqual(response.data['updated'], 0)
+        self.assertEqual({result['result'] for result in response.data['results']}, {'unchanged'})
+
+    def test_constant_query_count(self):
+        ids = [order.pk for order in create_orders(200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({'ids': ids, 'status': 'processing', 'shipping_status': 'shipped'})
+        self.assertEqual(response.data['updated'], 200)
+        order_updates = [query for query in queries if query['sql'].startswith('UPDATE "shop_order"')]
+        self.assertEqual(len(order_updates), 1)
+        # Odczyt stanu + UPDATE + zdarzenia outboxu + zaplanowanie wysyłki (sprawdzenie i wstawienie zadania)
+        statements = [query for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE', 'BEGIN', 'COMMIT'))]
+        self.assertEqual(len(statements), 5)
+
+    def test_per_row_tracking_numbers(self):
+        orders = create_orders(3)
+        numbers = {str(orders[0].pk): 'A1', str(orders[1].pk): 'B2'}
+        response = self.post({'ids': [order.pk for order in orders], 'shipping_status': 'shipped', 'tracking_numbers': numbers})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(Order.objects.order_by('pk').values_list('tracking_number', flat=True)), ['A1', 'B2', '']
+        )
+        self.assertEqual(response.data['results'][1]['tracking_number'], 'B2')
+
+    def test_by_filter(self):
+        pending = create_orders(2)
+        create_orders(2, status='completed')
+        response = self.post({'filter': {'status': ['pending']}, 'status': 'cancelled'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(result['id'] for result in response.data['results']), [order.pk for order in pending])
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), 2)
+
+    def test_events_recorded_for_changed_orders(self):
+        orders = create_orders(2)
+        self.post({'ids': [order.pk for order in orders], 'status': 'processing'})
+        self.post({'ids': [orders[0].pk], 'shipping_status': 'shipped', 'tracking_number': 'X9'})
+        self.assertEqual(OrderEvent.objects.count(), 3)
+        self.assertEqual(Job.objects.filter(name='outbox.dispatch').count(), 1)
+        first = next(event for event in coalesce(OrderEvent.objects.all()) if event['order_id'] == orders[0].pk)
+        self.assertEqual(
+            (first['previous_status'], first['status'], first['previous_shipping_status'], first['shipping_status'], first['tracking_number']),
+            ('pending', 'processing', 'pending', 'shipped', 'X9'),
+        )
+
+    def test_validation(self):
+        ids = [order.pk for order in create_orders(1)]
+        self.assertEqual(self.post({'ids': ids, 'status': 'lost'}).status_code, 400)
+        self.assertEqual(self.post({'ids': ids}).status_code, 400)
+        self.assertEqual(self.post({'status': 'processing'}).status_code, 400)
+        self.assertEqual(self.post({'ids': ids, 'filter': {}, 'status': 'processing'}).status_code, 400)
+        self.assertEqual(self.post({'filter': {'status': ['lost']}, 'status': 'processing'}).status_code, 400)
+        self.assertEqual(self.post({'ids': ids, 'tracking_numbers': {'999999': 'A'}}).status_code, 400)
+        self.assertEqual(self.post({'ids': list(range(1, BULK_ORDER_LIMIT + 2)), 'status': 'processing'}).status_code, 400)
+        self.assertEqual(Order.objects.get().status, 'pending')
+
+    def test_filter_limit(self):
+        create_orders(3)
+        with mock.patch('shop.views.BULK_ORDER_LIMIT', 2):
+            response = self.post({'filter': {'status': ['pending']}, 'status': 'processing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exclude(status='pending').exists())
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='testpass'))
+        self.assertEqual(self.post({'ids': [1], 'status': 'processing'}).status_code, 403)
@@ -0,0 +1,119 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.category_tree import rebuild_category_paths
+from shop.models import Product, Category
+
+
+class CategoryTreeTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.women = Category.objects.create(name='Women')
+        self.dresses = Category.objects.create(name='Dresses', parent=self.women)
+        self.maxi = Category.objects.create(name='Maxi Dresses', parent=self.dresses)
+        self.coats = Category.objects.create(name='Coats', parent=self.women)
+        self.men = Category.objects.create(name='Men')
+
+    def create_product(self, name, category):
+        return Product.objects.create(name=name, description='Upcycled', price=Decimal('30.00'), stock=1, size='M', category=category)
+
+    def refresh(self, *categories):
+        for category in categories:
+            category.refresh_from_db()
+
+
+class CategoryPathTest(CategoryTreeTestCase):
+    def test_paths_and_depth(self):
+        self.assertEqual(self.women.depth, 0)
+        self.assertEqual(self.maxi.depth, 2)
+        self.assertEqual(self.maxi.path, f'{self.women.pk:07d}/{self.dresses.pk:07d}/{self.maxi.pk:07d}/')
+        self.assertEqual(self.maxi.get_ancestor_ids(), [self.women.pk, self.dresses.pk])
+        self.assertEqual(
+            set(Category.objects.subtree(self.women.path)),
+            {self.women, self.dresses, self.maxi, self.coats},
+        )
+        self.assertEqual(set(Category.objects.subtree(self.dresses.path)), {self.dresses, self.maxi})
+
+    def test_moving_a_subtree(self):
+        self.dresses.parent = self.men
+        self.dresses.save()
+        self.refresh(self.maxi)
+        self.assertEqual(self.maxi.path, f'{self.men.pk:07d}/{self.dresses.pk:07d}/{self.maxi.pk:07d}/')
+        self.assertEqual(self.maxi.depth, 2)
+        self.dresses.parent = None
+        self.dresses.save()
+        self.refresh(self.maxi)
+        self.assertEqual(self.maxi.depth, 1)
+        self.assertEqual(set(Category.objects.subtree(self.men.path)), {self.men})
+
+    def test_cannot_move_under_own_subtree(self):
+        self.women.parent = self.maxi
+        with self.assertRaises(ValueError):
+            self.women.save()
+        response = self.client.patch(
+            reverse('category-detail', kwargs={'slug': 'women'}), {'parent': self.maxi.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.data)
+
+    def test_deleting_parent_reroots_children(self):
+        self.dresses.delete()
+        self.refresh(self.maxi)
+        self.assertIsNone(self.maxi.parent_id)
+        self.assertEqual(self.maxi.path, f'{self.maxi.pk:07d}/')
+        self.assertEqual(self.maxi.depth, 0)
+
+    def test_rebuild_after_bulk_changes(self):
+        Category.objects.update(path='', depth=0)
+        rebuild_category_paths()
+        self.refresh(self.maxi)
+        self.assertEqual(self.maxi.path, f'{self.women.pk:07d}/{self.dresses.pk:07d}/{self.maxi.pk:07d}/')
+        self.assertEqual(self.maxi.depth, 2)
+
+
+class CategoryTreeApiTest(CategoryTreeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_product('Red Maxi', self.maxi)
+        self.create_product('Blue Dress', self.dresses)
+        self.create_product('Wool Coat', self.coats)
+        self.create_product('Shirt', self.men)
+
+    def test_subtree_filter(self):
+        url = reverse('product-list')
+        names = {product['name'] for product in self.client.get(url, {'category_tree': 'women'}).data['results']}
+        self.assertEqual(names, {'Red Maxi', 'Blue Dress', 'Wool Coat'})
+        names = {product['name'] for product in self.client.get(url, {'category_tree': 'dresses'}).data['results']}
+        self.assertEqual(names, {'Red Maxi', 'Blue Dress'})
+        self.assertEqual(self.client.get(url, {'category_tree': 'unknown'}).data['results'], [])
+
+    def test_tree_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-tree'))
+        self.assertEqual(response.status_code, 200)
+        men, women = response.data
+        self.assertEqual((men['name'], men['subtree_products_count'], men['children']), ('Men', 1, []))
+        self.assertEqual(women['products_count'], 0)
+        self.assertEqual(women['subtree_products_count'], 3)
+        self.assertEqual([child['name'] for child in women['children']], ['Coats', 'Dresses'])
+        dresses = women['children'][1]
+        self.assertEqual((dresses['products_count'], dresses['subtree_products_count'], dresses['depth']), (1, 2, 1))
+        self.assertEqual(dresses['children'][0]['slug'], 'maxi-dresses')
+
+    def test_serializer_shows_position(self):
+        data = self.client.get(reverse('category-detail', kwargs={'slug': 'maxi-dresses'})).data
+        self.assertEqual(data['depth'], 2)
+        self.assertEqual(data['ancestors'], [self.women.pk, self.dresses.pk])
+
+    def test_tree_invalidated_on_move(self):
+        url = reverse('category-tree')
+        self.client.get(url)
+        self.coats.parent = self.men
+        self.coats.save()
+        men, women = self.client.get(url).data
+        self.assertEqual(men['subtree_products_count'], 2)
+        self.assertEqual(women['subtree_products_count'], 2)
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+import tracemalloc
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Order, OrderItem
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class OrderExportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(name='Red Dress', description='', price=Decimal('49.99'), stock=10, size='M')
+        self.url = reverse('orders-export')
+
+    def create_order(self, **kwargs):
+        defaults = {
+            'name': 'Customer', 'email': 'customer@example.com', 'address': 'Address',
+            'city': 'City', 'postal_code': '00-001', 'country': 'PL',
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+    def export(self, query=''):
+        response = self.client.get(f'{self.url}{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_export(self):
+        order = self.create_order(notes='Zostawić u sąsiada', shipping_cost=Decimal('10.00'))
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, unit_price=Decimal('49.99'))
+        order.update_total()
+        self.create_order(name='Second')
+
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([line['id'] for line in lines], sorted(line['id'] for line in lines))
+        self.assertEqual(lines[0]['notes'], 'Zostawić u sąsiada')
+        self.assertEqual(lines[0]['total_amount'], '109.98')
+        self.assertEqual(lines[0]['items'], [{'product_id': self.product.id, 'quantity': 2, 'price': '49.99'}])
+        self.assertEqual(lines[1]['items'], [])
+
+    def test_csv_export(self):
+        order = self.create_order(address='Street 1, "B"\nFlat 2')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, unit_price=Decimal('49.99'))
+        OrderItem.objects.create(order=order, product=None, quantity=3, unit_price=Decimal('5.00'))
+
+        response, body = self.export('?output=csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['address'], 'Street 1, "B"\nFlat 2')
+        self.assertEqual(rows[0]['items'], f'{self.product.id}:1:49.99|None:3:5.00')
+
+    def test_filters(self):
+        now = timezone.now()
+        old = self.create_order(status='completed', payment_status='paid')
+        Order.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=30))
+        paid = self.create_order(status='completed', payment_status='paid')
+        self.create_order(status='pending')
+        cancelled = self.create_order(status='cancelled', shipping_status='returned')
+
+        def ids(query):
+            return [json.loads(line)['id'] for line in self.export(query)[1].splitlines()]
+
+        self.assertEqual(ids('?status=completed'), [old.id, paid.id])
+        self.assertEqual(ids('?status=completed&status=cancelled&payment_status=paid'), [old.id, paid.id])
+        self.assertEqual(ids('?shipping_status=returned'), [cancelled.id])
+        since = (now - timedelta(days=1)).isoformat()
+        self.assertEqual(ids(f'?status=completed&created_after={since.replace("+", "%2B")}'), [paid.id])
+        self.assertEqual(ids(f'?created_before={since.replace("+", "%2B")}'), [old.id])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(f'{self.url}?status=unknown').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(f'{self.url}?created_after=yesterday').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(f'{self.url}?output=xml').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertIn(self.client.get(self.url).status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='testpass'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get(f'{self.url}?output=csv').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_memory_is_bounded(self):
+        total = 100000
+        Order.objects.bulk_create(
+            [Order(name=f'Customer {i}', email='customer@example.com', address='Address ' * 5, city='City',
+                   postal_code='00-001', country='PL', total_amount=Decimal('99.99')) for i in range(total)],
+            batch_size=5000,
+        )
+        order_ids = list(Order.objects.order_by('pk').values_list('pk', flat=True)[:total:10])
+        OrderItem.objects.bulk_create(
+            [OrderItem(order_id=order_id, product=self.product, quantity=1, unit_price=Decimal('99.99')) for order_id in order_ids],
+            batch_size=5000,
+        )
+        del order_ids
+
+        response = self.client.get(self.url)
+        tracemalloc.start()
+        size = lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.assertEqual(lines, total)
+        # Cały eksport to ~40 MB tekstu, w pamięci jest najwyżej jedna paczka zamówień
+        self.assertGreater(size, 30 * 1024 * 1024)
+        self.assertLess(peak, 12 * 1024 * 1024)
@@ -0,0 +1,150 @@
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.facets import stored_facets, count_facets
+from shop.models import Product, Category, Tag, FacetCount
+
+
+class FacetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.dresses = Category.objects.create(name='Dresses')
+        self.coats = Category.objects.create(name='Coats')
+        self.vintage = Tag.objects.create(name='Vintage')
+        self.linen = Tag.objects.create(name='Linen')
+
+    def create_product(self, name, category, size='M', condition='good', brand='', tags=(), **kwargs):
+        product = Product.objects.create(
+            name=name, description='Upcycled', price=Decimal('30.00'), stock=1,
+            category=category, size=size, condition=condition, brand=brand, **kwargs
+        )
+        product.tags.set(tags)
+        return product
+
+    def assertCountsMatchProducts(self):
+        # Tabela utrzymywana sygnałami = liczenie od zera
+        stored = {key: count for key, count in stored_facets().items() if count}
+        self.assertEqual(stored, dict(count_facets(Product.objects.active())))
+
+
+class FacetCountMaintenanceTest(FacetTestCase):
+    def test_counts_follow_product_changes(self):
+        dress = self.create_product('Red Dress', self.dresses, brand='Zara', tags=[self.vintage])
+        coat = self.create_product('Wool Coat', self.coats, size='L', condition='new', tags=[self.vintage, self.linen])
+        self.assertCountsMatchProducts()
+        self.assertEqual(FacetCount.objects.get(facet='tags', value=str(self.vintage.pk)).count, 2)
+
+        dress.size = 'S'
+        dress.category = self.coats
+        dress.brand = ''
+        dress.save()
+        self.assertCountsMatchProducts()
+
+        coat.is_active = False
+        coat.save()
+        self.assertCountsMatchProducts()
+        self.assertEqual(FacetCount.objects.get(facet='tags', value=str(self.linen.pk)).count, 0)
+        coat.is_active = True
+        coat.save()
+        self.assertCountsMatchProducts()
+
+        coat.tags.remove(self.vintage, self.linen)
+        dress.tags.add(self.linen)
+        self.assertCountsMatchProducts()
+        dress.tags.clear()
+        self.assertCountsMatchProducts()
+
+        dress.delete()
+        self.assertCountsMatchProducts()
+
+    def test_counts_follow_tag_side_changes(self):
+        products = [self.create_product(f'Dress {i}', self.dresses) for i in range(3)]
+        products[2].is_active = False
+        products[2].save()
+        self.vintage.product_set.add(*products)
+        self.assertCountsMatchProducts()
+        self.vintage.product_set.remove(products[0], products[2])
+        self.assertCountsMatchProducts()
+        self.vintage.product_set.clear()
+        self.assertCountsMatchProducts()
+
+    def test_deleting_category_and_tag(self):
+        self.create_product('Red Dress', self.dresses, tags=[self.vintage])
+        self.dresses.delete()
+        self.vintage.delete()
+        self.assertCountsMatchProducts()
+
+    def test_rebuild_command_fixes_drift(self):
+        self.create_product('Red Dress', self.dresses)
+        Product.objects.update(size='XL')
+        out = StringIO()
+        call_command('rebuild_facet_counts', stdout=out)
+        self.assertIn('2 differed', out.getvalue())
+        self.assertCountsMatchProducts()
+
+
+class FacetEndpointTest(FacetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_product('Red Dress', self.dresses, size='S', brand='Zara', tags=[self.vintage])
+        self.create_product('Blue Dress', self.dresses, size='M', brand='Zara', tags=[self.vintage, self.linen])
+        self.create_product('Wool Coat', self.coats, size='L', condition='new', tags=[self.linen])
+        self.create_product('Hidden Coat', self.coats, size='L', is_active=False, tags=[self.linen])
+
+    def test_unfiltered_counts_from_table(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('product-facets'))
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(
+            data['facets']['category'],
+            [
+                {'value': self.dresses.pk, 'label': 'Dresses', 'slug': 'dresses', 'count': 2},
+                {'value': self.coats.pk, 'label': 'Coats', 'slug': 'coats', 'count': 1},
+            ],
+        )
+        self.assertEqual([(item['value'], item['count']) for item in data['facets']['size']], [('S', 1), ('M', 1), ('L', 1)])
+        self.assertEqual([(item['value'], item['count']) for item in data['facets']['condition']], [('new', 1), ('good', 2)])
+        self.assertEqual(data['facets']['brand'], [{'value': 'Zara', 'label': 'Zara', 'count': 2}])
+        self.assertEqual({item['slug']: item['count'] for item in data['facets']['tags']}, {'vintage': 2, 'linen': 2})
+
+    def test_counts_under_filters(self):
+        url = reverse('product-facets')
+        # Walidacja filtra kategorii (django-filter) + 4 GROUP BY + nazwy kategorii i tagów
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'category': self.dresses.pk, 'ordering': 'price'})
+        data = response.data
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([item['value'] for item in data['facets']['category']], [self.dresses.pk])
+        self.assertEqual({item['slug']: item['count'] for item in data['facets']['tags']}, {'vintage': 2, 'linen': 1})
+
+        # Filtr po tagach robi JOIN - produkt z dwoma pasującymi tagami liczy się raz
+        counts = count_facets(Product.objects.for_listing().filter(tags__in=[self.vintage, self.linen]))
+        self.assertEqual(counts['total', ''], 3)
+        self.assertEqual((counts['size', 'S'], counts['size', 'M'], counts['size', 'L']), (1, 1, 1))
+        self.assertEqual(counts['tags', str(self.linen.pk)], 2)
+
+        data = self.client.get(url, {'min_price': '100'}).data
+        self.assertEqual(data['total'], 0)
+        self.assertEqual(data['facets']['category'], [])
+
+    def test_filtered_counts_match_list(self):
+        params = {'size': 'L'}
+        listed = self.client.get(reverse('product-list'), params).data['results']
+        data = self.client.get(reverse('product-facets'), params).data
+        self.assertEqual(data['total'], len(listed))
+
+    def test_cached_until_catalogue_changes(self):
+        url = reverse('product-facets')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        self.create_product('Linen Shirt', self.coats, size='XL')
+        self.assertEqual(self.client.get(url).data['total'], 4)
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Category, Tag
+from shop.fragments import fragment_cache_stats, reset_fragment_cache_stats
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class FragmentCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Dresses')
+        self.tag = Tag.objects.create(name='Vintage')
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(
+                name=f'Red Dress {i}',
+                description='Upcycled cotton dress',
+                price=Decimal('49.99'),
+                stock=10,
+                size='M',
+                category=self.category,
+            )
+            product.tags.add(self.tag)
+            self.products.append(product)
+        self.url = reverse('product-list')
+        # Każde zapytanie z innym parametrem, żeby ominąć cache całych odpowiedzi
+        self.requests = 0
+
+    def fetch(self, url=None):
+        self.requests += 1
+        response = self.client.get(f'{url or self.url}?page_size={50 + self.requests}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item['id']: item for item in response.data['results']}
+
+    def test_hits_and_misses_are_counted(self):
+        reset_fragment_cache_stats()
+        self.fetch()
+        self.assertEqual(fragment_cache_stats(), {'hits': 0, 'misses': 3, 'hit_ratio': 0.0})
+        self.fetch()
+        self.assertEqual(fragment_cache_stats(), {'hits': 3, 'misses': 3, 'hit_ratio': 0.5})
+
+    def test_product_save_changes_fragment(self):
+        self.fetch()
+        product = self.products[0]
+        product.price = Decimal('59.99')
+        product.save()
+        self.assertEqual(self.fetch()[product.id]['price'], '59.99')
+
+        product.stock = 3
+        product.save(update_fields=['stock'])
+        self.assertEqual(self.fetch()[product.id]['stock'], 3)
+
+    def test_category_and_tag_changes_refresh_fragments(self):
+        self.fetch()
+        self.category.name = 'Gowns'
+        self.category.save()
+        self.assertEqual({item['category_name'] for item in self.fetch().values()}, {'Gowns'})
+
+        self.tag.name = 'Retro'
+        self.tag.save()
+        self.assertEqual(self.fetch()[self.products[0].id]['tags'][0]['name'], 'Retro')
+
+        self.products[1].tags.clear()
+        self.assertEqual(self.fetch()[self.products[1].id]['tags'], [])
+
+        self.tag.delete()
+        self.assertEqual(self.fetch()[self.products[0].id]['tags'], [])
+
+        self.category.delete()
+        self.assertEqual({item['category'] for item in self.fetch().values()}, {None})
+
+    def test_detail_recomputes_volatile_fields(self):
+        url = reverse('product-detail', kwargs={'slug': self.products[0].slug})
+        self.client.get(url)
+        # Nowy produkt w kategorii nie zmienia updated_at oglądanego, a zmienia licznik i powiązane
+        Product.objects.create(
+            name='Blue Dress', description='Dress', price=Decimal('9.99'), stock=1, size='M', category=self.category
+        )
+        reset_fragment_cache_stats()
+        response = self.client.get(url)
+        # Fragment oglądanego produktu i trzech powiązanych z cache'u, nowy produkt serializowany od zera
+        self.assertEqual(fragment_cache_stats(), {'hits': 4, 'misses': 1, 'hit_ratio': 0.8})
+        self.assertEqual(response.data['category']['products_count'], 4)
+        self.assertEqual(response.data['related_products'][0]['name'], 'Blue Dress')
+
+    def test_stats_endpoint_requires_admin(self):
+        url = reverse('fragment-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'hits', 'misses', 'hit_ratio'})
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.parsers import JSONParser # type: ignore
+from rest_framework.request import Request # type: ignore
+from rest_framework.test import APITestCase, APIClient # type: ignore
+from shop.idempotency import request_fingerprint
+from shop.models import Order, IdempotencyKey
+from .test_stock import order_data, create_products
+
+
+class IdempotentOrderTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.product, = create_products(1, stock=10)
+        self.url = reverse('orders')
+
+    def post(self, data, key='checkout-1'):
+        return self.client.post(self.url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_response(self):
+        data = order_data((self.product, 2))
+        first = self.post(data)
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post(data)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        # Powtórka to odczyt zapisanej odpowiedzi - bez walidacji i bez ruszania stanów
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+    def test_keys_are_scoped_per_client(self):
+        data = order_data((self.product, 1))
+        first = self.post(data)
+        self.client.force_authenticate(user=User.objects.create_user(username='other', password='testpass'))
+        other = self.post(data)
+        self.assertEqual(other.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', other)
+        self.assertNotEqual(other.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.get(scope=f'orders:user:{self.user.pk}').key, 'checkout-1')
+
+    def test_key_reused_with_different_body(self):
+        self.post(order_data((self.product, 1)))
+        response = self.post(order_data((self.product, 3)))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_errors_are_not_stored(self):
+        response = self.post(order_data((self.product, 50)))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.post(order_data((self.product, 5)))
+        self.assertEqual(response.status_code, 201)
+
+    def test_without_key_every_request_executes(self):
+        data = order_data((self.product, 1))
+        self.client.post(self.url, data, format='json')
+        self.client.post(self.url, data, format='json')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_invalid_key(self):
+        self.assertEqual(self.post(order_data((self.product, 1)), key='x' * 256).status_code, 400)
+
+    def test_expired_key_executes_again(self):
+        data = order_data((self.product, 1))
+        self.post(data)
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn('Idempotent-Replayed', self.post(data))
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_purge_command(self):
+        self.post(order_data((self.product, 1)), key='old')
+        self.post(order_data((self.product, 1)), key='new')
+        IdempotencyKey.objects.filter(key='old').update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+class ConcurrentIdempotentOrderTest(TransactionTestCase):
+    def setUp(self):
+        self.product, = create_products(1, stock=10)
+        self.data = order_data((self.product, 1))
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def in_progress(self, locked_until):
+        # Wiersz, jaki zostawia trwające (albo porzucone) wykonanie z tym samym kluczem
+        return IdempotencyKey.objects.create(
+            scope=f'orders:user:{self.user.pk}', key='checkout-1', fingerprint=self.fingerprint(), locked_until=locked_until,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+    def fingerprint(self):
+        django_request = RequestFactory().post(reverse('orders'), json.dumps(self.data), content_type='application/json')
+        return request_fingerprint(Request(django_request, parsers=[JSONParser()]))
+
+    def post(self):
+        return self.client.post(reverse('orders'), self.data, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+    def test_duplicate_waits_for_running_request(self):
+        record = self.in_progress(timezone.now() + timedelta(minutes=1))
+
+        def finish():
+            time.sleep(0.2)
+            IdempotencyKey.objects.filter(pk=record.pk).update(status_code=201, response={'id': 12345})
+            connection.close()
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        response = self.post()
+        thread.join()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'id': 12345})
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 0)
+
+    @override_settings(SHOP_IDEMPOTENCY_WAIT=0.2)
+    def test_duplicate_gives_up_with_conflict(self):
+        self.in_progress(timezone.now() + timedelta(minutes=1))
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_abandoned_request_is_taken_over(self):
+        self.in_progress(timezone.now() - timedelta(seconds=1))
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
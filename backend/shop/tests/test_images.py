@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.models import Product
+from shop.images import VARIANTS, render_variants
+from decimal import Decimal
+from django.contrib.auth.models import User
+from PIL import Image
+
+
+def image_file(size=(2000, 1000), mode='RGB', image_format='JPEG', color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format)
+    return ContentFile(buffer.getvalue())
+
+
+class ImageVariantsTest(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, SHOP_IMAGE_VARIANTS_ASYNC=False)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_product(self, image=None, name='red.jpg'):
+        product = Product(name='Red Dress', description='', price=Decimal('49.99'), stock=1, size='M')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image.save(name, image or image_file())
+        return product
+
+    def test_variants_generated_on_upload(self):
+        product = self.create_product()
+        product.refresh_from_db()
+        self.assertEqual(set(product.image_variants), set(VARIANTS))
+        detail, thumbnail = product.image_variants['detail'], product.image_variants['thumbnail']
+        self.assertEqual((detail['width'], detail['height']), (1200, 600))
+        self.assertEqual((thumbnail['width'], thumbnail['height']), (160, 80))
+        with default_storage.open(thumbnail['webp']) as file:
+            self.assertEqual(Image.open(file).format, 'WEBP')
+        with default_storage.open(thumbnail['jpeg']) as file:
+            self.assertEqual(Image.open(file).format, 'JPEG')
+
+    def test_small_images_are_not_upscaled(self):
+        variants = render_variants(default_storage.save('products/small.png', image_file((100, 50), 'RGBA', 'PNG', (0, 0, 0, 0))))
+        self.assertEqual((variants['detail']['width'], variants['detail']['height']), (100, 50))
+        with default_storage.open(variants['card']['jpeg']) as file:
+            # Przezroczyste tło w JPEG staje się białe
+            self.assertEqual(Image.open(file).convert('RGB').getpixel((0, 0)), (255, 255, 255))
+
+    def test_variants_are_content_addressed(self):
+        first = render_variants(default_storage.save('products/a.jpg', image_file()))
+        second = render_variants(default_storage.save('products/b.jpg', image_file()))
+        other = render_variants(default_storage.save('products/c.jpg', image_file(color=(0, 0, 200))))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first['card']['webp'], other['card']['webp'])
+
+    def test_new_image_replaces_variants(self):
+        product = self.create_product()
+        product.refresh_from_db()
+        old = product.image_variants['card']['webp']
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image.save('blue.jpg', image_file(color=(0, 0, 200)))
+        product.refresh_from_db()
+        self.assertNotEqual(product.image_variants['card']['webp'], old)
+
+    def test_serializer_exposes_urls(self):
+        product = self.create_product()
+        response = self.client.get(reverse('product-detail', kwargs={'slug': product.slug}))
+        card = response.data['image_variants']['card']
+        self.assertEqual((card['width'], card['height']), (480, 240))
+        self.assertTrue(card['webp'].startswith('http://testserver/media/variants/'))
+        self.assertTrue(card['jpeg'].endswith('.jpeg'))
+
+    def test_backfill_command(self):
+        name = default_storage.save('products/old.jpg', image_file())
+        products = [
+            Product.objects.create(name=f'Dress {i}', description='', price=1, stock=1, size='M', image=name)
+            for i in range(2)
+        ]
+        Product.objects.update(image_variants={})
+        out = StringIO()
+        call_command('generate_image_variants', workers=2, stdout=out)
+        self.assertIn('Rendered 1 images (0 failed)', out.getvalue())
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(set(product.image_variants), set(VARIANTS))
+
+        out = StringIO()
+        call_command('generate_image_variants', workers=2, stdout=out)
+        self.assertIn('Rendered 0 images', out.getvalue())
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from shop.models import Product, Category, Tag
+from shop.search import get_search_index, reset_search_index
+from decimal import Decimal
+
+
+class ImportExportTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.category = Category.objects.create(name='Dresses')
+        self.tag = Tag.objects.create(name='Vintage')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_csv(self, rows, name='products.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            writer = csv.DictWriter(handle, fieldnames=sorted({key for row in rows for key in row}))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def write_jsonl(self, rows, name='products.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            for row in rows:
+                handle.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_products', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_creates_products(self):
+        path = self.write_csv([
+            {'name': 'Red Dress', 'price': '49.99', 'stock': '3', 'category': 'dresses', 'tags': 'vintage', 'size': 'S'},
+            {'name': 'Red Dress', 'price': '39.99', 'stock': '1', 'category': 'dresses', 'tags': '', 'size': 'M'},
+            {'name': 'Denim Jacket', 'price': '89', 'stock': '2', 'category': '', 'tags': 'vintage|retro', 'size': 'L'},
+        ])
+        out, err = self.run_import(path, create_missing=True)
+        self.assertIn('3 created, 0 updated, 0 unchanged, 0 skipped', out)
+        self.assertIn('rows/s', out)
+
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['denim-jacket', 'red-dress', 'red-dress-2'],
+        )
+        jacket = Product.objects.get(slug='denim-jacket')
+        self.assertEqual(jacket.price, Decimal('89.00'))
+        self.assertIsNone(jacket.category)
+        self.assertEqual(sorted(jacket.tags.values_list('slug', flat=True)), ['retro', 'vintage'])
+        self.assertEqual(Product.objects.get(slug='red-dress').category, self.category)
+
+    def test_slugs_do_not_collide_with_existing(self):
+        Product.objects.create(name='Red Dress', description='', price=1, stock=1, size='M')
+        Product.objects.create(name='Red Dress 2', slug='red-dress-2', description='', price=1, stock=1, size='M')
+        path = self.write_jsonl([{'name': 'Red Dress', 'price': '10'} for _ in range(3)])
+        self.run_import(path, batch_size=2)
+        self.assertEqual(
+            sorted(Product.objects.values_list('slug', flat=True)),
+            ['red-dress', 'red-dress-2', 'red-dress-3', 'red-dress-4', 'red-dress-5'],
+        )
+
+    def test_existing_slug_updates_product(self):
+        product = Product.objects.create(
+            name='Red Dress', description='', price=1, stock=1, size='M', category=self.category
+        )
+        product.tags.add(self.tag)
+        path = self.write_jsonl([
+            {'slug': product.slug, 'name': 'Blue Dress', 'price': '19.99', 'stock': 7, 'tags': ['new-in'], 'is_featured': True},
+        ])
+        out, _ = self.run_import(path, create_missing=True)
+        self.assertIn('0 created, 1 updated, 0 unchanged', out)
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price, product.stock), ('Blue Dress', Decimal('19.99'), 7))
+        self.assertTrue(product.is_featured)
+        self.assertIsNone(product.category)
+        self.assertEqual(list(product.tags.values_list('slug', flat=True)), ['new-in'])
+
+    def test_invalid_rows_are_reported(self):
+        path = self.write_jsonl([
+            {'name': 'Good', 'price': '10'},
+            {'name': '', 'price': '10'},
+            {'name': 'Bad price', 'price': 'abc'},
+            {'name': 'Unknown category', 'price': '10', 'category': 'shoes'},
+            'not json',
+        ])
+        out, err = self.run_import(path)
+        self.assertIn('1 created, 0 updated, 0 unchanged, 4 skipped', out)
+        self.assertIn("line 4: unknown category 'shoes'", err)
+        self.assertIn('line 5: invalid JSON', err)
+        self.assertFalse(Category.objects.filter(slug='shoes').exists())
+        with self.assertRaises(CommandError):
+            self.run_import(path, max_errors=1)
+
+    def test_imported_products_are_searchable(self):
+        reset_search_index()
+        get_search_index()
+        path = self.write_jsonl([{'name': 'Corduroy Skirt', 'price': '10', 'tags': ['vintage']}])
+        self.run_import(path)
+        product = Product.objects.get()
+        self.assertIn('Vintage', product.search_document)
+        self.assertEqual([pid for pid, _ in get_search_index().search('corduroy vint')], [product.id])
+
+    def test_queries_are_batched(self):
+        rows = [{'name': f'Dress {i}', 'price': '10', 'category': 'dresses', 'tags': ['vintage']} for i in range(300)]
+        path = self.write_jsonl(rows)
+        with CaptureQueriesContext(connection) as context:
+            self.run_import(path, batch_size=100)
+        self.assertEqual(Product.objects.count(), 300)
+        # Liczba zapytań zależy od liczby paczek, nie wierszy
+        self.assertLess(len(context.captured_queries), 60)
+
+    def test_export_round_trip(self):
+        product = Product.objects.create(
+            name='Red Dress', description='Cotton, "midi"\nlength', price=Decimal('49.99'), stock=3, size='S',
+            category=self.category, is_featured=True,
+        )
+        product.tags.add(self.tag)
+        for fmt in ('csv', 'jsonl'):
+            path = os.path.join(self.directory, f'export.{fmt}')
+            out = StringIO()
+            call_command('export_products', path, chunk_size=1, stdout=out)
+            self.assertIn('Exported 1 products', out.getvalue())
+
+            Product.objects.filter(pk=product.pk).update(name='Changed', stock=0, is_featured=False)
+            self.run_import(path)
+            product.refresh_from_db()
+            self.assertEqual(Product.objects.count(), 1)
+            self.assertEqual((product.name, product.stock, product.is_featured), ('Red Dress', 3, True))
+            self.assertEqual(product.description, 'Cotton, "midi"\nlength')
+            self.assertEqual(list(product.tags.values_list('slug', flat=True)), ['vintage'])
+
+            # Ponowny import bez zmian nie zapisuje nic
+            updated_at = product.updated_at
+            out, _ = self.run_import(path)
+            self.assertIn('0 created, 0 updated, 1 unchanged', out)
+            product.refresh_from_db()
+            self.assertEqual(product.updated_at, updated_at)
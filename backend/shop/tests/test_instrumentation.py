@@ -0,0 +1,104 @@
+import re
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from shop.instrumentation import RequestStats, record_sql, registry, _current
+from shop.models import Product, Category
+
+
+def timing(response):
+    return {
+        match.group(1): match.group(2)
+        for match in re.finditer(r'(\w+);dur=([\d.]+)', response['Server-Timing'])
+    }
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.pending.clear()
+        registry.known.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_login(self.user)
+        self.async_client.cookies = self.client.cookies
+        category = Category.objects.create(name='Dresses')
+        for index in range(5):
+            Product.objects.create(
+                name=f'Dress {index}', description='Linen', price=Decimal('20.00') + index, stock=2, category=category,
+            )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+        entries = timing(response)
+        self.assertEqual(set(entries), {'total', 'db', 'serialize'})
+        self.assertGreater(float(entries['total']), 0)
+        self.assertGreaterEqual(float(entries['total']), float(entries['serialize']))
+        queries = int(re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+
+    async def test_async_views_are_measured(self):
+        response = await self.async_client.get(reverse('async-product-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        self.assertGreater(float(timing(response)['serialize']), 0)
+
+    @override_settings(SHOP_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('product-list')))
+
+    @override_settings(SHOP_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs('shop.perf', 'WARNING') as logs:
+            self.client.get(reverse('product-list'))
+        self.assertIn('Slow request GET /api/products/', logs.output[0])
+        self.assertIn('shop_product', logs.output[0])
+
+    def test_wrapper_records_only_inside_request(self):
+        stats = RequestStats()
+        calls = []
+        record_sql(lambda *args: calls.append(args), 'SELECT 1', (), False, {})
+        token = _current.set(stats)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            _current.reset(token)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(stats.db_queries, 1)
+        self.assertEqual(stats.sql[0][1], 'SELECT 1')
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.pending.clear()
+        registry.known.clear()
+        self.admin = User.objects.create_user(username='admin', password='testpass', is_staff=True)
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(SHOP_METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_prometheus_aggregates(self):
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            self.client.get(reverse('product-list'))
+        self.client.get('/api/products/missing-slug/')
+        body = self.client.get(reverse('metrics')).content.decode()
+        labels = 'method="GET",view="product-list",status="2xx"'
+        self.assertIn(f'shop_http_requests_total{{{labels}}} 3', body)
+        self.assertIn(f'shop_http_request_duration_seconds_count{{{labels}}} 3', body)
+        self.assertIn(f'shop_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', body)
+        self.assertIn('shop_http_requests_total{method="GET",view="product-detail",status="4xx"} 1', body)
+        self.assertIn('# TYPE shop_http_request_duration_seconds histogram', body)
+        queries = re.search(rf'shop_db_queries_total{{{labels}}} (\d+)', body)
+        self.assertGreater(int(queries.group(1)), 0)
+        size = re.search(rf'shop_http_response_bytes_total{{{labels}}} (\d+)', body)
+        self.assertGreater(int(size.group(1)), 0)
@@ -0,0 +1,33 @@
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_login(user)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def test_reports_throughput(self):
+        out = StringIO()
+        call_command(
+            'loadtest', f'{self.live_server_url}/api/categories/', concurrency=2, duration=0.5, warmup=0,
+            header=[f'Cookie: {self.cookie}'], stdout=out,
+        )
+        self.assertRegex(out.getvalue(), r'^\d+ requests in [\d.]+s with 2 clients: [\d.]+ req/s, p50 .* 0 errors\n$')
+
+    def test_only_errors(self):
+        with self.assertRaisesMessage(CommandError, 'No successful requests'):
+            call_command('loadtest', f'{self.live_server_url}/api/categories/', concurrency=1, duration=0.2, warmup=0, stdout=StringIO())
+
+    def test_redirects_are_not_successes(self):
+        # Bez końcowego ukośnika CommonMiddleware odpowiada 301 (jak SECURE_SSL_REDIRECT przy DEBUG=False)
+        with self.assertRaisesMessage(CommandError, "0 errors: [], "):
+            call_command(
+                'loadtest', f'{self.live_server_url}/api/categories', concurrency=1, duration=0.2, warmup=0,
+                header=[f'Cookie: {self.cookie}'], stdout=StringIO(),
+            )
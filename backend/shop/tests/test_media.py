@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from shop.media import RangeFile, parse_range, IMMUTABLE_CACHE_CONTROL, DEFAULT_CACHE_CONTROL
+
+
+class MediaServingTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.content = bytes(range(256)) * 40
+        self.write('variants/ab/abcdef/v1-card-480.webp', self.content)
+        self.write('products/red.jpg', self.content)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def get(self, path, **headers):
+        response = self.client.get('/media/' + path, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_variant_is_immutable(self):
+        response, body = self.get('variants/ab/abcdef/v1-card-480.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+
+    def test_original_is_revalidated(self):
+        response, _ = self.get('products/red.jpg')
+        self.assertEqual(response['Cache-Control'], DEFAULT_CACHE_CONTROL)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_conditional_get(self):
+        response, _ = self.get('products/red.jpg')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response, body = self.get('products/red.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response, _ = self.get('products/red.jpg', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        response, _ = self.get('products/red.jpg', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_byte_ranges(self):
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=10000-')
+        self.assertEqual(body, self.content[10000:])
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get('products/red.jpg', HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_multiple_ranges_and_stale_if_range_send_whole_file(self):
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+
+        etag = self.get('products/red.jpg')[0]['ETag']
+        response, body = self.get('products/red.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[:10])
+
+    def test_head_and_not_found(self):
+        response = self.client.head('/media/products/red.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get('products/missing.jpg')[0].status_code, 404)
+        self.assertEqual(self.get('../etc/passwd')[0].status_code, 404)
+        self.assertEqual(self.get('products')[0].status_code, 404)
+        self.assertEqual(self.client.post('/media/products/red.jpg').status_code, 405)
+
+    @override_settings(SHOP_MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        response, body = self.get('variants/ab/abcdef/v1-card-480.webp')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/variants/ab/abcdef/v1-card-480.webp')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(body, b'')
+
+    def test_range_file_keeps_fileno_for_sendfile(self):
+        with open(os.path.join(self.media_root, 'products/red.jpg'), 'rb') as file:
+            wrapper = RangeFile(file, 50, 20)
+            self.assertEqual(wrapper.fileno(), file.fileno())
+            self.assertEqual(wrapper.tell(), 50)
+            self.assertEqual(wrapper.read(), self.content[50:70])
+            self.assertEqual(wrapper.read(), b'')
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-0', 10), False)
+        self.assertEqual(parse_range('bytes=7-3', 10), False)
+        self.assertIsNone(parse_range('items=0-1', 10))
+        self.assertIsNone(parse_range(None, 10))
@@ -1,5 +1,5 @@
 from django.test import TestCase
-from shop.models import Product, Order
+from shop.models import Product, Order, OrderItem
 from decimal import Decimal
 
 class ProductModelTest(TestCase):
@@ -23,12 +23,19 @@ class ProductModelTest(TestCase):
 
 class OrderModelTest(TestCase):
     def setUp(self):
+        self.product = Product.objects.create(
+            name='Test Product',
+            description='Test Description',
+            price=Decimal('99.99'),
+            stock=10,
+        )
         self.order = Order.objects.create(
             name='Test Customer',
             email='test@example.com',
             address='Test Address',
-            items=[{'id': 1, 'quantity': 2}]
+            shipping_cost=Decimal('10.00'),
         )
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, unit_price=Decimal('99.99'))
 
     def test_order_creation(self):
         self.assertTrue(isinstance(self.order, Order))
@@ -38,4 +45,17 @@ class OrderModelTest(TestCase):
         self.assertEqual(self.order.name, 'Test Customer')
         self.assertEqual(self.order.email, 'test@example.com')
         self.assertEqual(self.order.address, 'Test Address')
-        self.assertEqual(self.order.items, [{'id': 1, 'quantity': 2}]) 
\ No newline at end of file
+        self.assertEqual(
+            list(self.order.order_items.values('product_id', 'quantity')),
+            [{'product_id': self.product.id, 'quantity': 2}]
+        )
+
+    def test_update_total(self):
+        self.assertEqual(self.order.update_total(), Decimal('209.98'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, Decimal('209.98'))
+
+    def test_sales_by_product(self):
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, unit_price=Decimal('50.00'))
+        sales = list(OrderItem.objects.sales_by_product())
+        self.assertEqual(sales, [{'product': self.product.id, 'units': 3, 'revenue': Decimal('249.98'), 'orders': 1}]) 
\ No newline at end of file
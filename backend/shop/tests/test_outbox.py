@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from shop.models import Job, Order, OrderEvent
+from shop.outbox import FileSink, WebhookSink, dispatch_events, record_status_change, SIGNATURE_HEADER
+from shop.tasks import claim_jobs, run_job
+
+delivered = []
+
+
+class RecordingSink:
+    def deliver(self, events):
+        delivered.append(events)
+
+
+class BrokenSink:
+    def deliver(self, events):
+        raise ConnectionError('sink down')
+
+
+def create_order(email='ann@example.com'):
+    return Order.objects.create(name='Ann', email=email, address='a', city='c', postal_code='p', country='PL')
+
+
+@override_settings(SHOP_OUTBOX_SINKS=['shop.tests.test_outbox.RecordingSink'])
+class OutboxTest(APITestCase):
+    def setUp(self):
+        delivered.clear()
+        self.client.force_authenticate(user=User.objects.create_user(username='staff', password='testpass', is_staff=True))
+        self.order = create_order()
+
+    def update_status(self, order, new_status):
+        return self.client.post(reverse('order-update-status', kwargs={'pk': order.pk}), {'status': new_status})
+
+    def test_status_write_is_scoped_and_recorded(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.update_status(self.order, 'processing')
+        self.assertEqual(response.status_code, 200)
+        update, = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "shop_order"')]
+        self.assertNotIn('"email"', update)
+        event = OrderEvent.objects.get()
+        self.assertEqual((event.payload['previous_status'], event.payload['status']), ('pending', 'processing'))
+        self.assertEqual(Job.objects.get().name, 'outbox.dispatch')
+
+        # Kolejne zmiany w oknie dispatchu nie dokładają zadań
+        self.update_status(self.order, 'completed')
+        self.update_status(self.order, 'completed')
+        self.assertEqual((OrderEvent.objects.count(), Job.objects.count()), (2, 1))
+
+    def test_invalid_status(self):
+        self.assertEqual(self.update_status(self.order, 'lost').status_code, 400)
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='customer', password='testpass'))
+        self.assertEqual(self.update_status(self.order, 'cancelled').status_code, 403)
+
+    def test_event_rolls_back_with_change(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.order.status = 'cancelled'
+            self.order.save(update_fields=['status'])
+            record_status_change(self.order, 'pending')
+            raise RuntimeError
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_dispatch_coalesces_per_order(self):
+        other = create_order('bob@example.com')
+        for order, new_status in [(self.order, 'processing'), (other, 'processing'), (self.order, 'completed'),
+                                  (other, 'pending')]:
+            self.update_status(order, new_status)
+        self.assertEqual(dispatch_events(), (4, 1))
+        batch, = delivered
+        self.assertEqual(
+            [(event['order_id'], event['previous_status'], event['status']) for event in batch],
+            [(self.order.pk, 'pending', 'completed')],
+        )
+        self.assertFalse(OrderEvent.objects.exists())
+
+    @override_settings(SHOP_OUTBOX_SINKS=['shop.tests.test_outbox.BrokenSink'])
+    def test_sink_failure_keeps_events_for_retry(self):
+        self.update_status(self.order, 'processing')
+        # Dispatch rusza po oknie scalania SHOP_OUTBOX_DELAY
+        self.assertEqual(claim_jobs(1), [])
+        Job.objects.update(run_at=timezone.now())
+        job, = claim_jobs(1)
+        self.assertFalse(run_job(job))
+        self.assertEqual(OrderEvent.objects.count(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+    @override_settings(SHOP_OUTBOX_SINKS=['shop.outbox.StatusEmailSink'])
+    def test_status_email_sent_once_per_burst(self):
+        self.update_status(self.order, 'processing')
+        self.update_status(self.order, 'completed')
+        dispatch_events()
+        for job in claim_jobs(10):
+            run_job(job)
+        self.assertEqual([message.subject for message in mail.outbox], [f'Loopstore order #{self.order.pk} is completed'])
+
+
+class SinkTest(TestCase):
+    events = [{'event': 'order.status_changed', 'event_id': 7, 'order_id': 1, 'previous_status': 'pending', 'status': 'processing'}]
+
+    def test_file_sink_appends_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            FileSink(path).deliver(self.events)
+            FileSink(path).deliver(self.events)
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual([json.loads(line) for line in file], self.events * 2)
+
+    def test_webhook_sink_posts_signed_batch(self):
+        received = []
+
+        class Stub(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append((self.headers[SIGNATURE_HEADER], self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Stub)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        try:
+            WebhookSink(f'http://127.0.0.1:{server.server_port}/hooks', secret='s3cret').deliver(self.events)
+        finally:
+            thread.join()
+            server.server_close()
+        signature, body = received[0]
+        self.assertEqual(json.loads(body), {'events': self.events})
+        self.assertEqual(signature, 'sha256=' + hmac.new(b's3cret', body, hashlib.sha256).hexdigest())
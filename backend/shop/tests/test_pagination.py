@@ -0,0 +1,148 @@
+import base64
+import json
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Order
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url):
+        pages, ids = 0, []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            last_response, url = response, response.data['next']
+            pages += 1
+        return ids, pages, last_response
+
+    def walk_back(self, response):
+        ids = [item['id'] for item in response.data['results']]
+        url = response.data['previous']
+        while url:
+            response = self.client.get(url)
+            ids = [item['id'] for item in response.data['results']] + ids
+            url = response.data['previous']
+        return ids
+
+
+class ProductPaginationTest(KeysetPaginationTestCase):
+    def setUp(self):
+        super().setUp()
+        # Powtarzające się ceny i nazwy sprawdzają rozstrzyganie remisów po id
+        for i in range(23):
+            Product.objects.create(
+                name=f'Product {i % 5}-{i}',
+                description='Description',
+                price=Decimal(10 + i % 4),
+                stock=1,
+                size='M',
+            )
+        self.url = reverse('product-list')
+
+    def assertWalksInOrder(self, ordering, expected):
+        ids, pages, last = self.walk(f'{self.url}?page_size=5&ordering={ordering}')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 5)
+        self.assertEqual(self.walk_back(last), expected)
+
+    def test_default_ordering_is_newest_first(self):
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, pages, _ = self.walk(f'{self.url}?page_size=5')
+        self.assertEqual(ids, expected)
+
+    def test_price_ordering_is_stable(self):
+        self.assertWalksInOrder('price', list(Product.objects.order_by('price', 'id').values_list('id', flat=True)))
+        self.assertWalksInOrder('-price', list(Product.objects.order_by('-price', '-id').values_list('id', flat=True)))
+
+    def test_name_ordering_is_stable(self):
+        self.assertWalksInOrder('name', list(Product.objects.order_by('name', 'id').values_list('id', flat=True)))
+
+    def test_page_does_not_use_offset(self):
+        response = self.client.get(f'{self.url}?page_size=5&ordering=price')
+        # id strony + pełne wiersze i tagi dla produktów spoza cache'u fragmentów
+        with self.assertNumQueries(3) as context:
+            self.client.get(response.data['next'])
+        self.assertNotIn('OFFSET', context.captured_queries[0]['sql'].upper())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # Poprawnie zakodowany kursor z wartością, której nie da się porównać z polem sortowania
+        for ordering, cursor in (('price', {'v': 'abc', 'id': 1}), ('created_at', {'v': 'yesterday', 'id': 1}),
+                                 ('price', {'v': '10.00', 'id': 'x'})):
+            encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+            response = self.client.get(self.url, {'ordering': ordering, 'cursor': encoded})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(f'{self.url}?page_size=1000')
+        self.assertEqual(len(response.data['results']), 23)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+
+class OrderPaginationTest(KeysetPaginationTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            Order.objects.create(
+                name=f'Customer {i}',
+                email='customer@example.com',
+                address='Address',
+                city='City',
+                postal_code='00-001',
+                country='PL',
+                total_amount=None if i % 4 == 0 else Decimal(i % 3),
+            )
+        self.url = reverse('orders')
+
+    def test_orders_are_paginated(self):
+        response = self.client.get(f'{self.url}?page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, pages, last = self.walk(f'{self.url}?page_size=5')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+        self.assertEqual(self.walk_back(last), expected)
+
+    def test_nullable_total_amount_ordering(self):
+        from shop.views import OrderViewSet
+        from rest_framework.test import APIRequestFactory # type: ignore
+        from rest_framework.test import force_authenticate # type: ignore
+
+        view = OrderViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+
+        def fetch(url):
+            request = factory.get(url)
+            force_authenticate(request, user=self.user)
+            return view(request).render()
+
+        for ordering, direction in (('total_amount', 'asc'), ('-total_amount', 'desc')):
+            non_null = Order.objects.exclude(total_amount=None)
+            non_null = non_null.order_by('total_amount', 'id') if direction == 'asc' else non_null.order_by('-total_amount', '-id')
+            nulls = Order.objects.filter(total_amount=None).order_by('id' if direction == 'asc' else '-id')
+            expected = list(non_null.values_list('id', flat=True)) + list(nulls.values_list('id', flat=True))
+
+            ids, url, back = [], f'/api/orders/?page_size=4&ordering={ordering}', None
+            while url:
+                response = fetch(url)
+                ids.extend(item['id'] for item in response.data['results'])
+                back, url = response, response.data['next']
+            self.assertEqual(ids, expected)
+            self.assertEqual(len(ids), 12)
+
+            ids, url = [item['id'] for item in back.data['results']], back.data['previous']
+            while url:
+                response = fetch(url)
+                ids = [item['id'] for item in response.data['results']] + ids
+                url = response.data['previous']
+            self.assertEqual(ids, expected)
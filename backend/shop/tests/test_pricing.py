@@ -0,0 +1,75 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from shop.analytics import rebuild_sales_rollups, record_order_sales
+from shop.models import Order, OrderItem, SalesRollup
+from shop.pricing import (
+    audit_order_totals, expected_totals, from_cents, line_total, money, order_total, to_cents, totals_in_cents,
+)
+from .test_stock import create_products
+
+
+class PricingTest(TestCase):
+    def test_money_rounding(self):
+        self.assertEqual(money('0.125'), Decimal('0.13'))
+        self.assertEqual(money(19.99), Decimal('19.99'))
+        self.assertEqual(money(0.1 + 0.2), Decimal('0.30'))
+        with override_settings(SHOP_PRICE_ROUNDING='ROUND_HALF_EVEN'):
+            self.assertEqual(money('0.125'), Decimal('0.12'))
+
+    def test_order_total_is_exact(self):
+        self.assertEqual(line_total('19.99', 3), Decimal('59.97'))
+        lines = [(1, Decimal('0.10'))] * 1000 + [(3, 19.99)]
+        self.assertEqual(order_total(lines, '15.00'), Decimal('174.97'))
+        self.assertEqual((to_cents('19.99'), from_cents(1999)), (1999, Decimal('19.99')))
+
+    def test_totals_in_cents_without_numpy(self):
+        args = ([0, 1, 0, 2], [2, 1, 3, 5], [1999, 10, 1, 250], [1500, 0, 999])
+        self.assertEqual(totals_in_cents(*args), [5501, 10, 2249])
+        with mock.patch('shop.pricing.np', None):
+            self.assertEqual(totals_in_cents(*args), [5501, 10, 2249])
+
+
+class OrderTotalsTest(TestCase):
+    def setUp(self):
+        self.products = create_products(2)
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(name='Ann', email='ann@example.com', address='a', city='c', postal_code='p',
+                                         country='PL', shipping_cost=Decimal('9.99'))
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=self.products[0], quantity=i + 1, unit_price=Decimal('0.10')),
+                OrderItem(order=order, product=self.products[1], quantity=3, unit_price=Decimal('19.99')),
+            ])
+            order.update_total()
+            record_order_sales(order)
+            self.orders.append(order)
+
+    def test_update_total(self):
+        self.assertEqual([order.total_amount for order in self.orders], [Decimal('70.06') + Decimal('0.10') * i for i in range(5)])
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).total_amount, Decimal('70.06'))
+        self.assertEqual(expected_totals([(self.orders[1].pk, Decimal('0')), (999999, Decimal('5'))]),
+                         {self.orders[1].pk: Decimal('60.17'), 999999: Decimal('5.00')})
+
+    def test_audit_and_fix(self):
+        Order.objects.filter(pk=self.orders[1].pk).update(total_amount=Decimal('70.15'))
+        Order.objects.filter(pk=self.orders[3].pk).update(total_amount=None)
+        rebuild_sales_rollups()
+        mismatches = audit_order_totals(chunk_size=2)
+        self.assertEqual(mismatches, [
+            (self.orders[1].pk, Decimal('70.15'), Decimal('70.16')),
+            (self.orders[3].pk, None, Decimal('70.36')),
+        ])
+        self.assertIsNone(Order.objects.get(pk=self.orders[3].pk).total_amount)
+
+        out = StringIO()
+        call_command('audit_order_totals', fix=True, chunk_size=2, stdout=out)
+        self.assertIn('Checked 5 orders, 2 fixed', out.getvalue())
+        self.assertEqual(audit_order_totals(), [])
+        # Rollupy sprzedaży idą za poprawionymi sumami
+        self.assertEqual(
+            SalesRollup.objects.get(period='day').revenue, Order.objects.aggregate(total=Sum('total_amount'))['total'],
+        )
@@ -0,0 +1,140 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Category, Tag
+from shop.search import get_search_index, reset_search_index
+from shop.fragments import fragment_cache_stats, reset_fragment_cache_stats
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class QueryCountTestCase(APITestCase):
+    # Liczba zapytań dla endpointu nie może zależeć od liczby zwracanych produktów
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Dresses')
+        self.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+
+    def create_products(self, count, **kwargs):
+        start = Product.objects.count()
+        products = []
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f'Red Dress {i}',
+                description='Upcycled cotton dress',
+                price=Decimal('49.99'),
+                stock=10,
+                size='M',
+                category=self.category,
+                **kwargs
+            )
+            product.tags.set(self.tags)
+            products.append(product)
+        return products
+
+    def assertQueriesForSizes(self, url, num, sizes=(2, 20), **product_kwargs):
+        for size in sizes:
+            self.create_products(size - Product.objects.count(), **product_kwargs)
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+
+class ProductQueryCountTest(QueryCountTestCase):
+    # Zimny cache fragmentów: id strony + pełne wiersze + tagi
+    def test_list_query_count(self):
+        response = self.assertQueriesForSizes(reverse('product-list'), 3)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(response.data['results'][0]['category_name'], 'Dresses')
+        self.assertEqual(len(response.data['results'][0]['tags']), 3)
+
+    def test_featured_query_count(self):
+        response = self.assertQueriesForSizes(reverse('product-featured'), 3, is_featured=True)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_cached_fragments_query_count(self):
+        cache.clear()
+        self.create_products(20)
+        expected = self.client.get(reverse('product-list')).data['results']
+        reset_fragment_cache_stats()
+        # Inny zestaw filtrów to nowa odpowiedź, ale te same fragmenty produktów - tylko zapytanie o id
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('product-list') + '?min_price=1')
+        self.assertEqual(response.data['results'], expected)
+        self.assertEqual(fragment_cache_stats(), {'hits': 20, 'misses': 0, 'hit_ratio': 1.0})
+
+    def test_search_query_count(self):
+        reset_search_index()
+        get_search_index()
+        # dopasowanie filtrów + produkty + tagi
+        response = self.assertQueriesForSizes(reverse('product-search') + '?q=dress', 3)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_filtered_list_query_count(self):
+        url = reverse('product-list') + f'?categories={self.category.slug}&min_price=10'
+        self.assertQueriesForSizes(url, 3)
+
+
+class ProductDetailQueryCountTest(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_retrieve_query_count(self):
+        products = self.create_products(10)
+        url = reverse('product-detail', kwargs={'slug': products[0].slug})
+        # product + tagi + products_count kategorii + top N w kategorii + tagi powiązanych
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['related_products']), 4)
+        self.assertNotIn(products[0].id, [p['id'] for p in response.data['related_products']])
+        self.assertEqual(response.data['category']['products_count'], 10)
+
+        # Druga wizyta to gotowa odpowiedź z cache'u
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        # Inny produkt z tej samej kategorii korzysta z mapy powiązanych produktów w cache
+        with self.assertNumQueries(3):
+            self.client.get(reverse('product-detail', kwargs={'slug': products[1].slug}))
+
+    def test_related_products_invalidated_on_change(self):
+        products = self.create_products(3)
+        url = reverse('product-detail', kwargs={'slug': products[0].slug})
+        self.assertEqual(len(self.client.get(url).data['related_products']), 2)
+
+        newest = self.create_products(1)[0]
+        related = self.client.get(url).data['related_products']
+        self.assertEqual(related[0]['id'], newest.id)
+
+        newest.name = 'Renamed Dress'
+        newest.save()
+        related = self.client.get(url).data['related_products']
+        self.assertEqual(related[0]['name'], 'Renamed Dress')
+
+        newest.tags.clear()
+        related = self.client.get(url).data['related_products']
+        self.assertEqual(related[0]['tags'], [])
+
+        other = Category.objects.create(name='Shirts')
+        newest.category = other
+        newest.save()
+        related = self.client.get(url).data['related_products']
+        self.assertNotIn(newest.id, [p['id'] for p in related])
+
+
+class CategoryQueryCountTest(QueryCountTestCase):
+    def test_category_list_query_count(self):
+        for i in range(5):
+            Category.objects.create(name=f'Category {i}')
+        self.create_products(3)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {c['slug']: c['products_count'] for c in response.data}
+        self.assertEqual(counts['dresses'], 3)
+        self.assertEqual(counts['category-0'], 0)
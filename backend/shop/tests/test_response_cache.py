@@ -0,0 +1,118 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Category, Tag
+from shop.serializers import OrderSerializer
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Dresses')
+        self.tag = Tag.objects.create(name='Vintage')
+        self.product = Product.objects.create(
+            name='Red Dress',
+            description='Upcycled cotton dress',
+            price=Decimal('49.99'),
+            stock=10,
+            size='M',
+            category=self.category,
+            is_featured=True,
+        )
+        self.list_url = reverse('product-list')
+        self.detail_url = reverse('product-detail', kwargs={'slug': self.product.slug})
+
+    def assertCached(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.data, first.data)
+        return second
+
+    def test_catalogue_endpoints_are_cached(self):
+        for url in (self.list_url, reverse('product-featured'), self.detail_url, reverse('category-list')):
+            self.assertCached(url)
+
+    def test_query_params_are_normalized(self):
+        self.client.get(f'{self.list_url}?min_price=10&ordering=price')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'{self.list_url}?ordering=price&min_price=10')
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(f'{self.list_url}?ordering=price&min_price=100')
+        self.assertEqual(response.data['results'], [])
+
+    def test_product_change_invalidates(self):
+        self.assertCached(self.list_url)
+        self.product.name = 'Blue Dress'
+        self.product.save()
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['name'], 'Blue Dress')
+
+        self.product.delete()
+        self.assertEqual(self.client.get(self.list_url).data['results'], [])
+
+    def test_category_and_tag_changes_invalidate(self):
+        self.assertCached(self.list_url)
+        self.assertCached(reverse('category-list'))
+
+        self.category.name = 'Gowns'
+        self.category.save()
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['category_name'], 'Gowns')
+
+        self.product.tags.add(self.tag)
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['tags'][0]['name'], 'Vintage')
+
+        self.tag.name = 'Retro'
+        self.tag.save()
+        self.assertEqual(self.client.get(self.list_url).data['results'][0]['tags'][0]['name'], 'Retro')
+
+        Category.objects.create(name='Shirts')
+        self.assertEqual(len(self.client.get(reverse('category-list')).data), 2)
+
+    def test_stock_reservation_invalidates_only_product_detail(self):
+        self.assertCached(self.detail_url)
+        self.assertCached(self.list_url)
+        etag = self.client.get(self.detail_url)['ETag']
+        serializer = OrderSerializer(data={
+            'name': 'Customer', 'email': 'customer@example.com', 'address': 'Address',
+            'city': 'City', 'postal_code': '00-001', 'country': 'PL',
+            'items': [{'product_id': self.product.id, 'quantity': 3, 'price': '49.99'}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(self.client.get(self.detail_url).data['stock'], 7)
+        self.assertCached(self.detail_url)
+        # Reszta katalogu zostaje w cache'u
+        with self.assertNumQueries(0):
+            self.client.get(self.list_url)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_returns_not_modified(self):
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.product.price = Decimal('59.99')
+        self.product.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_last_modified_returns_not_modified(self):
+        response = self.client.get(self.detail_url)
+        last_modified = response['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_errors_are_not_cached(self):
+        url = reverse('product-detail', kwargs={'slug': 'missing'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        Product.objects.filter(pk=self.product.pk).update(slug='missing')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,123 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Category, Tag
+from shop.search import InvertedIndex, get_search_index, reset_search_index
+from shop.local_index import SharedIndex
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+class InvertedIndexTest(APITestCase):
+    def test_prefix_and_semantics(self):
+        index = InvertedIndex()
+        index.add(1, 'Red Dress', 'cotton summer')
+        index.add(2, 'Blue Shirt', 'cotton dress shirt')
+        index.add(3, 'Green Skirt', 'wool')
+        self.assertEqual([pid for pid, _ in index.search('dres')], [1, 2])
+        self.assertEqual([pid for pid, _ in index.search('cotton shirt')], [2])
+        self.assertEqual(index.search('silk'), [])
+
+    def test_remove_and_inactive(self):
+        index = InvertedIndex()
+        index.add(1, 'Red Dress', '')
+        index.add(2, 'Red Skirt', '')
+        index.remove(1)
+        index.add(2, 'Red Skirt', '', is_active=False)
+        self.assertEqual(index.search('red'), [])
+
+
+class ProductSearchTest(APITestCase):
+    def setUp(self):
+        reset_search_index()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.dresses = Category.objects.create(name='Dresses')
+        self.vintage = Tag.objects.create(name='Vintage')
+        self.url = reverse('product-search')
+
+    def create_product(self, name, **kwargs):
+        defaults = {'description': 'Upcycled piece', 'price': Decimal('20.00'), 'stock': 1, 'size': 'M'}
+        defaults.update(kwargs)
+        return Product.objects.create(name=name, **defaults)
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def ids(self, response):
+        return [item['id'] for item in response.data['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        in_description = self.create_product('Linen Top', description='Pairs well with a dress')
+        in_name = self.create_product('Summer Dress')
+        self.assertEqual(self.ids(self.search('dress')), [in_name.id, in_description.id])
+
+    def test_matches_category_and_tag_names(self):
+        product = self.create_product('Floral Midi', category=self.dresses)
+        other = self.create_product('Denim Jacket')
+        other.tags.add(self.vintage)
+        self.assertEqual(self.ids(self.search('dresses')), [product.id])
+        self.assertEqual(self.ids(self.search('vintage')), [other.id])
+
+    def test_document_follows_tag_and_category_changes(self):
+        product = self.create_product('Denim Jacket')
+        self.search('jacket')  # indeks zbudowany, dalej aktualizowany sygnałami
+        product.tags.add(self.vintage)
+        self.assertEqual(self.ids(self.search('vintage')), [product.id])
+
+        self.vintage.name = 'Retro'
+        self.vintage.save()
+        self.assertEqual(self.ids(self.search('vintage')), [])
+        self.assertEqual(self.ids(self.search('retro')), [product.id])
+
+        self.vintage.product_set.clear()
+        self.assertEqual(self.ids(self.search('retro')), [])
+
+        product.category = self.dresses
+        product.save()
+        self.assertEqual(self.ids(self.search('dresses')), [product.id])
+        self.dresses.delete()
+        self.assertEqual(self.ids(self.search('dresses')), [])
+
+        product.refresh_from_db()
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.ids(self.search('jacket')), [])
+
+    def test_changes_from_other_processes_are_applied(self):
+        product = self.create_product('Denim Jacket')
+        removed = self.create_product('Denim Skirt')
+        self.search('jacket')
+        index = get_search_index()
+        # Inny proces zapisał nowy dokument i dopisał zmianę do dziennika w cache'u
+        Product.objects.filter(pk=product.pk).update(name='Quilted Vest')
+        Product.objects.filter(pk=removed.pk).delete()
+        SharedIndex('search', InvertedIndex, None).publish([('product', product.pk), ('product', removed.pk)])
+        self.assertEqual(self.ids(self.search('quilted')), [product.id])
+        self.assertEqual(self.ids(self.search('denim')), [])
+        self.assertIs(get_search_index(), index)
+
+    def test_respects_list_filters(self):
+        cheap = self.create_product('Cheap Dress', price=Decimal('10.00'))
+        self.create_product('Pricey Dress', price=Decimal('90.00'))
+        self.assertEqual(self.ids(self.search('dress', max_price='50')), [cheap.id])
+
+    def test_pagination(self):
+        for i in range(7):
+            self.create_product(f'Dress {i}')
+        first = self.search('dress', page_size=3)
+        self.assertEqual(len(first.data['results']), 3)
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        self.assertEqual(len(third.data['results']), 1)
+        self.assertIsNone(third.data['next'])
+        seen = self.ids(first) + self.ids(second) + self.ids(third)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_empty_query_lists_products(self):
+        self.create_product('Summer Dress')
+        response = self.search('')
+        self.assertEqual(len(response.data['results']), 1)
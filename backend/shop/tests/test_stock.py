@@ -0,0 +1,151 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase # type: ignore
+from rest_framework import status # type: ignore
+from shop.models import Product, Order, OrderItem
+from django.db.models import Sum
+from shop.serializers import OrderSerializer
+from decimal import Decimal
+from django.contrib.auth.models import User
+
+
+def order_data(*lines):
+    return {
+        'name': 'Test Customer',
+        'email': 'test@example.com',
+        'address': 'Test Address',
+        'city': 'Warsaw',
+        'postal_code': '00-001',
+        'country': 'PL',
+        'items': [
+            {'product_id': product.id, 'quantity': quantity, 'price': str(product.price)}
+            for product, quantity in lines
+        ],
+    }
+
+
+def create_products(count, stock=10):
+    return [
+        Product.objects.create(
+            name=f'Product {i}', description='Description', price=Decimal('25.00'), stock=stock, size='M'
+        )
+        for i in range(count)
+    ]
+
+
+class StockReservationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('orders')
+
+    def test_order_reserves_stock(self):
+        first, second = create_products(2)
+        response = self.client.post(self.url, order_data((first, 2), (second, 3), (first, 1)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.stock, second.stock), (7, 7))
+        self.assertEqual(Order.objects.get().total_amount, Decimal('150.00'))
+
+    def test_price_comes_from_product(self):
+        product, = create_products(1)
+        data = order_data((product, 2))
+        data['items'][0]['price'] = '0.01'
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['items'][0]['price'], '25.00')
+        self.assertEqual(Order.objects.get().total_amount, Decimal('50.00'))
+
+    def test_insufficient_stock_changes_nothing(self):
+        first, second = create_products(2, stock=2)
+        response = self.client.post(self.url, order_data((first, 1), (second, 3)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Not enough stock', str(response.data['items']))
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 2)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_unknown_product(self):
+        data = order_data()
+        data['items'] = [{'product_id': 999, 'quantity': 1, 'price': '1.00'}]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_depend_on_items(self):
+        products = create_products(10)
+
+        def count_queries(lines):
+            serializer = OrderSerializer(data=order_data(*lines))
+            with CaptureQueriesContext(connection) as context:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                serializer.save()
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries([(products[0], 1)]), count_queries([(p, 1) for p in products]))
+
+    def test_reservation_is_rolled_back_if_order_fails(self):
+        product, = create_products(1)
+        serializer = OrderSerializer(data=order_data((product, 4)))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.validated_data['name'] = None  # NOT NULL - INSERT zamówienia się nie uda
+        with self.assertRaises(Exception):
+            serializer.save()
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    stock = 50
+    orders = 200
+
+    def place_order(self, product_id):
+        # Każdy wątek ma własne połączenie - tak jak osobne żądania na serwerze
+        try:
+            # Bez limitu prób: każda blokada kończy się czyimś zamówieniem, więc wątek w końcu
+            # zamówi albo zostanie odrzucony, gdy zapas się wyczerpie - wynik nie zależy od czasu
+            while True:
+                try:
+                    product = Product.objects.get(pk=product_id)
+                    serializer = OrderSerializer(data=order_data((product, 1)))
+                    if not serializer.is_valid():
+                        return 'rejected'
+                    serializer.save()
+                    return 'created'
+                except OperationalError:
+                    # SQLite zwraca "database table is locked" zamiast czekać na blokadę
+                    time.sleep(0.005)
+                except Exception as exc:
+                    if 'stock' in str(exc).lower():
+                        return 'rejected'
+                    raise
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def test_parallel_orders_do_not_oversell(self):
+        product, = create_products(1, stock=self.stock)
+        start = threading.Barrier(16)
+
+        def worker(_):
+            try:
+                start.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            return self.place_order(product.pk)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(worker, range(self.orders)))
+
+        product.refresh_from_db()
+        created = results.count('created')
+        self.assertEqual(results.count('rejected'), self.orders - self.stock)
+        self.assertEqual(created, self.stock)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), created)
+        self.assertEqual(OrderItem.objects.aggregate(units=Sum('quantity'))['units'], self.stock)
@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase # type: ignore
+from shop.models import Job, Order
+from shop.notifications import send_order_confirmation
+from shop.tasks import task, enqueue, claim_jobs, run_job, requeue_abandoned
+from .test_stock import order_data, create_products
+
+calls = []
+
+
+@task(name='tests.record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_claim_and_run(self):
+        enqueue(record, value='a')
+        enqueue(record, countdown=60, value='later')
+        jobs = claim_jobs(10)
+        self.assertEqual([job.payload for job in jobs], [{'value': 'a'}])
+        self.assertEqual((jobs[0].status, jobs[0].attempts), ('running', 1))
+        # Pobrane zadanie nie trafi do drugiego workera
+        self.assertEqual(claim_jobs(10), [])
+        self.assertTrue(run_job(jobs[0]))
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'value': 'later'}])
+
+    @override_settings(SHOP_TASKS_BACKOFF=10)
+    def test_retry_with_backoff_then_failed(self):
+        enqueue(explode)
+        job, = claim_jobs(1)
+        self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+
+        Job.objects.update(run_at=timezone.now())
+        job, = claim_jobs(1)
+        self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(claim_jobs(1), [])
+
+    def test_abandoned_jobs_are_requeued(self):
+        enqueue(record, value='a')
+        enqueue(explode)
+        claim_jobs(2)
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        Job.objects.filter(name='tests.explode').update(attempts=2)
+        self.assertEqual(requeue_abandoned(), (1, 1))
+        self.assertEqual(dict(Job.objects.values_list('name', 'status')), {'tests.record': 'queued', 'tests.explode': 'failed'})
+
+    @override_settings(SHOP_TASKS_EAGER=True)
+    def test_eager_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue(record, value='now'))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
+
+
+class OrderTaskHooksTest(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpass'))
+        self.product, = create_products(1)
+
+    def test_order_creation_enqueues_confirmation(self):
+        response = self.client.post(reverse('orders'), order_data((self.product, 2)), format='json')
+        self.assertEqual(response.status_code, 201)
+        # Odpowiedź nie czekała na mail - leży w kolejce
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload), ('orders.send_confirmation', {'order_id': response.data['id']}))
+
+        run_job(claim_jobs(1)[0])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        self.assertIn('2 x Product 0 - 25.00', mail.outbox[0].body)
+        self.assertIn('Total: 50.00', mail.outbox[0].body)
+
+    def test_failed_order_enqueues_nothing(self):
+        self.client.post(reverse('orders'), order_data((self.product, 50)), format='json')
+        self.assertFalse(Job.objects.exists())
+
+
+class RunWorkerCommandTest(TransactionTestCase):
+    def test_burst_worker_drains_queue(self):
+        orders = [
+            Order.objects.create(name='Ann', email=f'ann{i}@example.com', address='a', city='c', postal_code='p', country='PL')
+            for i in range(5)
+        ]
+        for order in orders:
+            enqueue(send_order_confirmation, order_id=order.pk)
+        out = StringIO()
+        call_command('run_worker', '--burst', '--threads', '2', '--poll-interval', '0.01', stdout=out)
+        self.assertIn('5 tasks run, 0 failed', out.getvalue())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(order.email for order in orders))
+        self.assertFalse(Job.objects.exists())
@@ -22,7 +22,7 @@ class ProductViewSetTest(APITestCase):
     def test_get_product_list(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_product(self):
         data = {
@@ -9,21 +9,41 @@ from .serializers import (
     CategorySerializer,
     OrderSerializer,
     TagSerializer,
-    ProductDetailSerializer
+    ProductDetailSerializer,
+    BulkOrderStatusSerializer,
+    SalesReportQuerySerializer,
 )
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView # type: ignore
-from django.db.models import Q
+from rest_framework.negotiation import BaseContentNegotiation # type: ignore
+from .pagination import ProductPagination, OrderPagination, SearchPagination
+from .search import search_products
+from .autocomplete import get_autocomplete_index, DEFAULT_LIMIT, MAX_LIMIT
+from .response_cache import cache_response, product_stock_key
+from .fragments import fragment_cache_stats
+from .facets import count_facets, stored_facets, is_filtered, facet_payload
+from .category_tree import category_tree
+from .idempotency import idempotent
+from .outbox import record_status_change
+from .fulfilment import BULK_ORDER_LIMIT, BULK_FIELDS, bulk_update_orders
+from .analytics import record_status_sales, sales_report
+from .exports import EXPORT_FORMATS, OrderExportFilter
+from rest_framework.permissions import IsAdminUser # type: ignore
 
 def home(request):
     return HttpResponse("Welcome to the Loopstore!")
 	
 class OrderView(APIView):
+    pagination_class = OrderPagination
+
     def get(self, request):
-        orders = Order.objects.all()
+        paginator = self.pagination_class()
+        orders = paginator.paginate_queryset(Order.objects.prefetch_related('order_items'), request, view=self)
         serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
+    @idempotent('orders')
     def post(self, request):
         serializer = OrderSerializer(data=request.data)
         if serializer.is_valid():
@@ -31,32 +51,99 @@ class OrderView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    # Eksport sam wybiera format (?output=), nagłówek Accept nie może dać 406
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+class OrderExportView(APIView):
+    # Dane osobowe klientów - tylko obsługa sklepu
+    permission_classes = [IsAdminUser]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'output': [f'Choose one of: {", ".join(EXPORT_FORMATS)}']}, status=status.HTTP_400_BAD_REQUEST)
+        filterset = OrderExportFilter(request.query_params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Strumień zamiast listy: pamięć nie rośnie z historią zamówień
+        stream, content_type, filename = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(stream(filterset.qs), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+    queryset = Category.objects.with_products_count()
     serializer_class = CategorySerializer
     lookup_field = 'slug'
 
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def tree(self, request):
+        return Response(category_tree())
+
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     lookup_field = 'slug'
 
+# Kolumny potrzebne do paginacji i klucza fragmentu - reszta wiersza tylko dla braków w cache'u
+LISTING_KEY_FIELDS = ('id', 'updated_at', 'created_at', 'price', 'name')
+
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.for_listing()
     serializer_class = ProductSerializer
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'tags', 'condition', 'size', 'is_featured']
+    filterset_fields = ['category', 'tags', 'condition', 'size', 'brand', 'is_featured']
     search_fields = ['name', 'description', 'brand', 'material']
     ordering_fields = ['price', 'created_at', 'name']
+    pagination_class = ProductPagination
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductDetailSerializer
         return ProductSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['reload_fragment_misses'] = self.action in ('list', 'featured')
+        return context
+
+    def fragment_queryset(self, queryset):
+        # id pasujące do filtrów -> get_many fragmentów -> serializacja tylko brakujących
+        return queryset.select_related(None).prefetch_related(None).only(*LISTING_KEY_FIELDS)
+
+    def fragment_page(self, queryset):
+        page = self.paginate_queryset(self.fragment_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return self.fragment_page(self.filter_queryset(self.get_queryset()))
+
+    @cache_response(scope=product_stock_key)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        queryset = Product.objects.for_listing()
         
         # Filtrowanie po zakresie cen
         min_price = self.request.query_params.get('min_price', None)
@@ -71,6 +158,12 @@ class ProductViewSet(viewsets.ModelViewSet):
         if categories:
             queryset = queryset.filter(category__slug__in=categories)
 
+        # Kategoria razem z podkategoriami (ścieżka w drzewie)
+        category_tree = self.request.query_params.get('category_tree')
+        if category_tree:
+            path = Category.objects.filter(slug=category_tree).values_list('path', flat=True).first()
+            queryset = queryset.in_category_tree(path) if path else queryset.none()
+
         # Filtrowanie po wielu tagach
         tags = self.request.query_params.getlist('tags', [])
         if tags:
@@ -79,50 +172,117 @@ class ProductViewSet(viewsets.ModelViewSet):
         return queryset
 
     @action(detail=False, methods=['get'])
+    @cache_response
     def featured(self, request):
-        featured = self.get_queryset().filter(is_featured=True)
-        serializer = self.get_serializer(featured, many=True)
-        return Response(serializer.data)
+        return self.fragment_page(self.get_queryset().filter(is_featured=True))
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def facets(self, request):
+        # Liczby przy opcjach filtrów: bez filtrów z utrzymywanej tabeli, z filtrami - GROUP BY na przefiltrowanym zbiorze
+        if is_filtered(request.query_params):
+            counts = count_facets(self.filter_queryset(self.get_queryset()))
+        else:
+            counts = stored_facets()
+        return Response(facet_payload(counts))
 
     @action(detail=False, methods=['get'])
     def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            page = self.paginate_queryset(self.get_queryset())
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        # Wyniki w kolejności trafności (tsvector na PostgreSQL, indeks w pamięci na SQLite)
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_products(self.get_queryset(), query), request, view=self)
+        if page and not isinstance(page[0], Product):
+            products = Product.objects.for_listing().in_bulk(page)
+            page = [products[pk] for pk in page if pk in products]
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        # Podpowiedzi z indeksu trigramów w pamięci procesu - bez zapytań do bazy
         query = request.query_params.get('q', '')
-        if query:
-            queryset = self.get_queryset().filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(brand__icontains=query) |
-                Q(material__icontains=query) |
-                Q(category__name__icontains=query) |
-                Q(tags__name__icontains=query)
-            ).distinct()
-        else:
-            queryset = self.get_queryset()
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        suggestions = get_autocomplete_index().suggest(query, max(limit, 1))
+        return Response({'query': query, 'results': suggestions})
+
+class FragmentCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(fragment_cache_stats())
+
+class SalesAnalyticsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = SalesReportQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        return Response(sales_report(query['date_from'], query['date_to'], query['interval'], query['limit']))
 
 class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
+    queryset = Order.objects.prefetch_related('order_items')
     serializer_class = OrderSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status', 'shipping_status']
     ordering_fields = ['created_at', 'total_amount']
+    pagination_class = OrderPagination
 
-    def perform_create(self, serializer):
-        order = serializer.save()
-        # Tu możemy dodać dodatkową logikę, np. wysłanie maila z potwierdzeniem
-
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def update_status(self, request, pk=None):
         order = self.get_object()
-        status = request.data.get('status')
-        if status and status in dict(Order.STATUS_CHOICES):
-            order.status = status
-            order.save()
+        new_status = request.data.get('status')
+        if new_status and new_status in dict(Order.STATUS_CHOICES):
+            previous_status, order.status = order.status, new_status
+            with transaction.atomic():
+                # Tylko kolumna statusu - równoległa zmiana płatności czy wysyłki nie zostanie nadpisana
+                order.save(update_fields=['status'])
+                record_status_change(order, previous_status)
+                record_status_sales([(order.pk, previous_status, order.status)])
             serializer = self.get_serializer(order)
             return Response(serializer.data)
         return Response(
             {'error': 'Invalid status'},
             status=status.HTTP_400_BAD_REQUEST
-        )
\ No newline at end of file
+        )
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_update_status(self, request):
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if 'ids' in data:
+            requested = list(dict.fromkeys(data['ids']))
+            queryset = Order.objects.filter(pk__in=requested)
+        else:
+            # Filtr ponownie w UPDATE pod blokadą - zamówienie zmienione w międzyczasie nie wpadnie do paczki
+            requested = list(data['filter'].order_by('pk').values_list('pk', flat=True)[:BULK_ORDER_LIMIT + 1])
+            if len(requested) > BULK_ORDER_LIMIT:
+                return Response(
+                    {'filter': [f'Matches more than {BULK_ORDER_LIMIT} orders, narrow it down.']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            queryset = data['filter'].filter(pk__in=requested)
+        changes = {field: data[field] for field in BULK_FIELDS if field in data}
+        states = bulk_update_orders(queryset, changes, data.get('tracking_numbers'))
+
+        results = []
+        for pk in requested:
+            if pk not in states:
+                results.append({'id': pk, 'result': 'not_found'})
+                continue
+            previous, current = states[pk]
+            results.append({'id': pk, 'result': 'updated' if current != previous else 'unchanged', **current})
+        return Response({
+            'updated': sum(result['result'] == 'updated' for result in results),
+            'results': results,
+        })
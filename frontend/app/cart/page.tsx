@@ -1,6 +1,6 @@
 'use client'
 
-import { useState } from 'react'
+import { useRef, useState } from 'react'
 import Image from 'next/image'
 import { useCart } from '@/context/CartContext'
 import { Trash2 } from 'lucide-react'
@@ -8,6 +8,8 @@ import { Trash2 } from 'lucide-react'
 export default function CartPage() {
   const { cartItems, removeFromCart, updateQuantity, total, clearCart } = useCart()
   const [isCheckingOut, setIsCheckingOut] = useState(false)
+  // Jeden klucz na próbę złożenia zamówienia - ponowienie po zerwanym połączeniu nie tworzy duplikatu
+  const idempotencyKey = useRef<string | null>(null)
   const [formData, setFormData] = useState({
     name: '',
     email: '',
@@ -30,10 +32,12 @@ export default function CartPage() {
 
   const handleCheckout = async () => {
     try {
+      idempotencyKey.current ??= crypto.randomUUID()
       const response = await fetch('http://localhost:8000/api/orders/', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify({
           name: formData.name,
@@ -52,6 +56,7 @@ export default function CartPage() {
       })
 
       if (!response.ok) throw new Error('Failed to create order')
+      idempotencyKey.current = null
 
       // Clear cart and show success message
       clearCart()
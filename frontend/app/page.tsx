@@ -7,7 +7,7 @@ export default async function Home() {
 	if (!res.ok) {
 		throw new Error("Failed to fetch data");
 	}
-	const products = await res.json();
+	const { results: products } = await res.json();
   
 	return (
 	  <div className="p-8">
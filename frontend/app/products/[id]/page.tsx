@@ -5,12 +5,20 @@ import Image from 'next/image'
 import { useParams } from 'next/navigation'
 import { useCart } from '@/context/CartContext'
 
+interface ImageVariant {
+  width: number
+  height: number
+  webp: string
+  jpeg: string
+}
+
 interface Product {
   id: number
   name: string
   description: string
   price: number
   image: string
+  image_variants?: Record<string, ImageVariant>
   category: {
     name: string
     slug: string
@@ -74,7 +82,7 @@ export default function ProductPage() {
         {/* Product Image */}
         <div className="relative h-96 md:h-[600px]">
           <Image
-            src={product.image}
+            src={product.image_variants?.detail?.webp ?? product.image}
             alt={product.name}
             fill
             className="object-cover rounded-lg"
@@ -169,7 +177,7 @@ export default function ProductPage() {
               >
                 <div className="relative h-48">
                   <Image
-                    src={relatedProduct.image}
+                    src={relatedProduct.image_variants?.card?.webp ?? relatedProduct.image}
                     alt={relatedProduct.name}
                     fill
                     className="object-cover"
@@ -4,12 +4,20 @@ import Image from 'next/image'
 import Link from 'next/link'
 import { useCart } from '@/context/CartContext'
 
+interface ImageVariant {
+  width: number
+  height: number
+  webp: string
+  jpeg: string
+}
+
 interface Product {
   id: number
   name: string
   description: string
   price: number
   image: string
+  image_variants?: Record<string, ImageVariant>
   category: string
   size: string
   condition: string
@@ -38,7 +46,7 @@ export default function ProductCard({ product }: ProductCardProps) {
       <Link href={`/products/${product.id}`}>
         <div className="relative h-64">
           <Image
-            src={product.image}
+            src={product.image_variants?.card?.webp ?? product.image}
             alt={product.name}
             fill
             className="object-cover"
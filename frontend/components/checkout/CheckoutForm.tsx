@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useCart } from '@/context/CartContext';
 import { useForm } from 'react-hook-form';
 import { zodResolver } from '@hookform/resolvers/zod';
@@ -26,6 +26,8 @@ export default function CheckoutForm() {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const { cartItems, clearCart, total } = useCart();
   const router = useRouter();
+  // Jeden klucz na próbę złożenia zamówienia - ponowienie po zerwanym połączeniu nie tworzy duplikatu
+  const idempotencyKey = useRef<string | null>(null);
   
   const {
     register,
@@ -50,9 +52,13 @@ export default function CheckoutForm() {
         total_amount: total,
       };
 
-      const response = await axios.post('http://localhost:8000/api/orders/', orderData);
+      idempotencyKey.current ??= crypto.randomUUID();
+      const response = await axios.post('http://localhost:8000/api/orders/', orderData, {
+        headers: { 'Idempotency-Key': idempotencyKey.current },
+      });
       
       if (response.status === 201) {
+        idempotencyKey.current = null;
         clearCart();
         router.push(`/order-confirmation/${response.data.id}`);
       }
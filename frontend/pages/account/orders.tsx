@@ -46,7 +46,7 @@ export default function OrdersHistory() {
   const fetchOrders = async () => {
     try {
       const response = await axios.get('http://localhost:8000/api/orders/');
-      setOrders(response.data);
+      setOrders(response.data.results);
     } catch (error) {
       setError('Nie udało się pobrać historii zamówień');
       console.error('Error fetching orders:', error);